@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple, TypeVar
+
+from fastapi import HTTPException
+
+# =====================================================
+# 중복 요청 차단용 멱등 토큰 저장소 (서버 메모리, TTL + 크기 제한)
+# - 세션 쿠키에는 현재 토큰 1개만 (사용 이력 목록 X)
+# - 모바일 이동 / 입고 / 출고 API 공용
+# =====================================================
+
+T = TypeVar("T")
+
+_PENDING = object()
+
+
+class IdempotencyStore:
+    """
+    key → 처리 결과 (처리 중: _PENDING)
+    - ttl 초 지난 항목 / max_size 초과 시 오래된 항목부터 제거
+    """
+
+    def __init__(self, max_size: int = 10_000, ttl: float = 6 * 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        items = self._items
+        while items:
+            key, (ts, value) = next(iter(items.items()))
+            if now - ts < self.ttl and len(items) <= self.max_size:
+                break
+            items.popitem(last=False)
+
+    def begin(self, key: str) -> Tuple[str, Any]:
+        """
+        → ("new", None): 처음 → 처리 진행 후 complete / release
+          ("busy", None): 같은 키 처리 중
+          ("done", 결과): 이미 처리됨
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            hit = self._items.get(key)
+            if hit is not None:
+                value = hit[1]
+                return ("busy", None) if value is _PENDING else ("done", value)
+            self._items[key] = (now, _PENDING)
+            return "new", None
+
+    def complete(self, key: str, result: Any = None) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic(), result)
+            self._items.move_to_end(key)
+            self._evict(time.monotonic())
+
+    def release(self, key: str) -> None:
+        """처리 실패 → 같은 키로 재시도 허용"""
+        with self._lock:
+            self._items.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+store = IdempotencyStore()
+
+
+def run_once(scope: str, key: Optional[str], fn: Callable[[], T]) -> T:
+    """
+    key 가 있으면 같은 scope 내 1회만 실행, 재요청은 첫 결과 그대로 반환
+    - 처리 중 재요청: 409
+    - fn 예외: 키 해제 (재시도 가능)
+    """
+    key = (key or "").strip()
+    if not key:
+        return fn()
+
+    full_key = f"{scope}:{key}"
+    state, cached = store.begin(full_key)
+    if state == "done":
+        return cached
+    if state == "busy":
+        raise HTTPException(status_code=409, detail="같은 요청을 처리 중입니다.")
+
+    try:
+        result = fn()
+    except BaseException:
+        store.release(full_key)
+        raise
+    store.complete(full_key, result)
+    return result
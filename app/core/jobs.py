@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import UploadFile
+
+from app.db import (
+    claim_upload, create_job, finish_job, get_job, start_job, stock_tx, update_job_progress,
+)
+
+# =====================================================
+# 인프로세스 백그라운드 작업 큐 (엑셀 대량 반영)
+# - 요청은 업로드만 임시 파일로 받고 job_id 즉시 반환
+# - 실제 처리는 워커 스레드, 진행 상황 / 행별 오류는 jobs / job_errors 테이블
+# - 동시 처리 수: JOB_WORKERS (기본 2)
+# =====================================================
+
+JOB_WORKERS = max(1, int(os.getenv("JOB_WORKERS", "2")))
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+
+_FLUSH_ROWS = 500        # 진행 상황 DB 반영 주기 (행)
+_FLUSH_SECONDS = 1.0     # 진행 상황 DB 반영 주기 (초)
+_SPOOL_CHUNK = 1024 * 1024
+
+
+class JobContext:
+    """
+    작업 함수에 전달되는 진행 기록기
+
+        ctx.set_total(n)
+        ctx.ok()                  # 성공 1행
+        ctx.fail(rownum, "사유")  # 실패 1행 (job_errors 에 저장)
+        ctx.reject(rownum, "사유")  # ok() 로 집계된 행을 나중에 실패로 전환
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.total: Optional[int] = None
+        self.processed = 0
+        self.failed = 0
+        self._errors: List[Tuple[Optional[int], str]] = []
+        self._dirty = 0
+        self._last_flush = time.monotonic()
+
+    def set_total(self, total: Optional[int]) -> None:
+        self.total = total
+        self.flush()
+
+    def ok(self, n: int = 1) -> None:
+        self.processed += n
+        self._tick(n)
+
+    def fail(self, row: Optional[int], error: str) -> None:
+        self.processed += 1
+        self.failed += 1
+        self._errors.append((row, error))
+        self._tick(1)
+
+    def reject(self, row: Optional[int], error: str) -> None:
+        self.failed += 1
+        self._errors.append((row, error))
+        self._tick(1)
+
+    def _tick(self, n: int) -> None:
+        self._dirty += n
+        if self._dirty >= _FLUSH_ROWS or time.monotonic() - self._last_flush >= _FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self) -> None:
+        update_job_progress(
+            self.job_id, self.processed, self.failed, self._errors, total=self.total,
+        )
+        self._errors = []
+        self._dirty = 0
+        self._last_flush = time.monotonic()
+
+
+def _run(job_id: str, fn: Callable[..., Dict[str, Any]], args: tuple, kwargs: dict, cleanup: Optional[str]) -> None:
+    ctx = JobContext(job_id)
+    try:
+        start_job(job_id)
+        result = fn(ctx, *args, **kwargs)
+        ctx.flush()
+        finish_job(job_id, "done", result=json.dumps(result, ensure_ascii=False, default=str))
+    except Exception as e:
+        ctx.flush()
+        finish_job(job_id, "failed", error=str(e))
+    finally:
+        if cleanup:
+            try:
+                os.unlink(cleanup)
+            except OSError:
+                pass
+
+
+def submit_job(kind: str, fn: Callable[..., Dict[str, Any]], *args, _cleanup: Optional[str] = None, **kwargs) -> str:
+    """fn(ctx, *args, **kwargs) → 결과 dict 를 워커에서 실행, job_id 반환"""
+    job_id = uuid.uuid4().hex
+    create_job(job_id, kind)
+    _executor.submit(_run, job_id, fn, args, kwargs, _cleanup)
+    return job_id
+
+
+def _spool_upload(file: UploadFile) -> Tuple[str, str, int]:
+    """업로드 → 임시 파일 복사 + SHA-256 (청크 단위, 전체 메모리 로드 없음)"""
+    suffix = os.path.splitext(file.filename or "")[1] or ".xlsx"
+    digest = hashlib.sha256()
+    size = 0
+    file.file.seek(0)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        while True:
+            chunk = file.file.read(_SPOOL_CHUNK)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+            tmp.write(chunk)
+    return tmp.name, digest.hexdigest(), size
+
+
+def submit_upload_job(
+    kind: str,
+    file: UploadFile,
+    fn: Callable[..., Dict[str, Any]],
+    *args,
+    batch_prefix: str,
+    reimport: bool = False,
+) -> Dict[str, Any]:
+    """
+    업로드 파일을 임시 파일로 옮긴 뒤 작업 등록 → 응답 dict
+    - 요청 종료 시 UploadFile 은 닫히므로 작업용 사본 필요
+    - fn(ctx, path, *args, batch_id), 작업 종료 후 임시 파일 삭제 (등록 실패 시 즉시 삭제)
+    - 파일 복사 / DB 쓰기 잠금 대기가 있으므로 동기(def) 엔드포인트에서 호출
+    - batch_id = batch_prefix + 파일 해시 앞 8자리 (+ 재반영 시 job_id 앞 6자리)
+    - 같은 kind 로 동일 내용 파일이 이미 반영(중)이면 재반영 없이 기존 작업 반환
+      (reimport=True: 의도적 재반영)
+    """
+    path, sha256, size = _spool_upload(file)
+    job_id = uuid.uuid4().hex
+    batch_id = f"{batch_prefix}_{sha256[:8]}"
+    if reimport:
+        batch_id += f"_{job_id[:6]}"  # 재반영: 원래 batch 와 구분 (롤백 단위 분리)
+
+    try:
+        with stock_tx():
+            prev = claim_upload(
+                kind=kind, sha256=sha256, filename=file.filename or "", size=size,
+                job_id=job_id, batch_id=batch_id, reimport=reimport,
+            )
+            if prev is None:
+                create_job(job_id, kind)
+    except Exception:
+        os.unlink(path)
+        raise
+
+    if prev is not None:
+        os.unlink(path)
+        job = job_status(prev["job_id"]) or {}
+        return {
+            **accepted(prev["job_id"]),
+            "batch_id": prev["batch_id"],
+            "duplicate": True,
+            "uploaded_at": prev["created_at"],
+            "status": job.get("status"),
+            "result": job.get("result"),
+        }
+
+    _executor.submit(_run, job_id, fn, (path, *args, batch_id), {}, path)
+    return {**accepted(job_id), "batch_id": batch_id, "duplicate": False}
+
+
+def accepted(job_id: str) -> Dict[str, Any]:
+    """작업 등록 응답 (업로드 엔드포인트 공용)"""
+    return {"ok": True, "job_id": job_id, "status_url": f"/api/jobs/{job_id}"}
+
+
+def job_status(job_id: str) -> Optional[Dict[str, Any]]:
+    """jobs 행 + 진행률 / 남은 시간 추정(eta_seconds)"""
+    job = get_job(job_id)
+    if job is None:
+        return None
+
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+
+    eta = None
+    total, processed = job["total"], job["processed"]
+    if job["status"] == "running" and job["started_at"] and total and processed:
+        elapsed = (datetime.now() - datetime.fromisoformat(job["started_at"])).total_seconds()
+        eta = round(elapsed / processed * max(total - processed, 0), 1)
+    job["eta_seconds"] = eta
+    job["progress"] = round(processed / total, 4) if total else None
+    return job
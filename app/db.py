@@ -1,22 +1,120 @@
+import json
 import sqlite3
-from datetime import datetime, timedelta
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
 from decimal import Decimal, ROUND_HALF_UP
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
 from app.core.paths import DB_PATH
+from app.utils.erp_verify import ERP_VERIFY_TTL_HOURS, CompareSide, compare_rows, row_kind
 
 
 # =====================================================
 # DB CONNECTION & UTILS
 # =====================================================
 
-def get_db() -> sqlite3.Connection:
-    conn = sqlite3.connect(str(DB_PATH))
+# 커넥션 튜닝 PRAGMA (WAL + 읽기 캐시)
+_PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",      # 약 16MB
+    "PRAGMA mmap_size = 134217728",    # 128MB
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+)
+
+_local = threading.local()
+
+
+def _connect(check_same_thread: bool = True) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(DB_PATH), timeout=5, check_same_thread=check_same_thread)
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
     return conn
 
 
+def get_db() -> sqlite3.Connection:
+    """
+    단독 커넥션 (호출자가 close 책임)
+    - 신규 코드는 db_conn() 사용
+    """
+    return _connect()
+
+
+@contextmanager
+def db_conn() -> Iterator[sqlite3.Connection]:
+    """
+    스레드별 커넥션 재사용
+    - 요청 스레드마다 커넥션 1개를 열어두고 계속 사용
+    - 중첩 호출 시 같은 커넥션 공유, 가장 바깥 블록에서만 commit / rollback
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = _connect()
+        _local.depth = 0
+
+    _local.depth += 1
+    try:
+        yield conn
+        if _local.depth == 1:
+            conn.commit()
+    except BaseException:
+        if _local.depth == 1:
+            conn.rollback()
+        raise
+    finally:
+        _local.depth -= 1
+
+
+@contextmanager
+def stock_tx() -> Iterator[sqlite3.Connection]:
+    """
+    재고 작업 단위 트랜잭션 (BEGIN IMMEDIATE … COMMIT)
+    - 쓰기 잠금을 먼저 잡고 재고 확인 → 증감 → 이력까지 1회 commit
+    - 내부의 upsert_inventory / add_history 등은 같은 트랜잭션에 합류
+    - 예외 발생 시 전체 rollback
+    """
+    with db_conn() as conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        yield conn
+
+
+def iter_query(sql: str, params: Sequence[Any] = (), batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """
+    대용량 다운로드용 결과 스트리밍 (fetchmany 단위)
+    - 전용 커넥션: StreamingResponse 가 청크마다 다른 워커 스레드에서 next() 호출
+    - 소비가 끝나거나 중단되면 커넥션 종료
+    """
+    conn = _connect(check_same_thread=False)
+    try:
+        cur = conn.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                return
+            for r in rows:
+                yield dict(r)
+    finally:
+        conn.close()
+
+
+class StockConflict(ValueError):
+    """재고 없음 / 재고 부족 (동시 작업으로 재고가 바뀐 경우 포함)"""
+
+
+def close_thread_db() -> None:
+    """현재 스레드의 재사용 커넥션 종료 (테스트/종료 시)"""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        _local.conn = None
+        conn.close()
+
+
 def _q3(val) -> float:
     if val is None:
         return 0.0
@@ -41,23 +139,343 @@ def _add_column_if_not_exists(cur, table: str, column: str, ddl: str):
 # =====================================================
 
 def reset_inventory_and_history():
-    conn = get_db()
-    try:
+    with db_conn() as conn:
         cur = conn.cursor()
         cur.execute("DELETE FROM inventory")
         cur.execute("DELETE FROM history")
-        conn.commit()
-    finally:
-        conn.close()
+
+
+# =====================================================
+# SCHEMA CAPABILITY (기동 시 1회 확인)
+# =====================================================
+
+_schema_cols: Dict[str, frozenset] = {}
+
+
+def _load_schema_caps(cur) -> None:
+    for table in ("inventory", "history", "inventory_fts"):
+        cur.execute(f"PRAGMA table_info({table})")
+        _schema_cols[table] = frozenset(r["name"] for r in cur.fetchall())
+
+
+def _has_column(table: str, column: str) -> bool:
+    if table not in _schema_cols:
+        with db_conn() as conn:
+            _load_schema_caps(conn.cursor())
+    return column in _schema_cols[table]
 
 
 # =====================================================
 # INIT / MIGRATION
 # =====================================================
 
+_INVENTORY_KEY_COLS = "warehouse, location, brand, item_code, lot, spec"
+
+
+def _ensure_inventory_unique_key(cur) -> None:
+    """
+    inventory 자연키 UNIQUE 보장 (1회성 마이그레이션)
+    - 기존 중복 행: 최소 id 행으로 수량 합산 후 나머지 삭제
+    - 합산 결과 0 이하: 삭제
+    - 구 비고유 인덱스(idx_inventory_key) 제거
+    """
+    cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='index' AND name='ux_inventory_key'"
+    )
+    if cur.fetchone():
+        return
+
+    cur.execute(f"""
+        SELECT MIN(id) AS keep_id, ROUND(SUM(qty), 3) AS qty, MAX(updated_at) AS updated_at
+        FROM inventory
+        GROUP BY {_INVENTORY_KEY_COLS}
+        HAVING COUNT(*) > 1
+    """)
+    dups = cur.fetchall()
+
+    for d in dups:
+        cur.execute(f"""
+            DELETE FROM inventory
+            WHERE id <> ?
+              AND ({_INVENTORY_KEY_COLS}) = (
+                  SELECT {_INVENTORY_KEY_COLS} FROM inventory WHERE id = ?
+              )
+        """, (d["keep_id"], d["keep_id"]))
+        cur.execute(
+            "UPDATE inventory SET qty=?, updated_at=? WHERE id=?",
+            (d["qty"], d["updated_at"], d["keep_id"]),
+        )
+
+    cur.execute("DELETE FROM inventory WHERE qty <= 0")
+
+    cur.execute("DROP INDEX IF EXISTS idx_inventory_key")
+    cur.execute(f"""
+        CREATE UNIQUE INDEX ux_inventory_key
+        ON inventory ({_INVENTORY_KEY_COLS})
+    """)
+
+
+_FTS_COLS = ("warehouse", "location", "brand", "item_code", "item_name", "lot", "spec")
+
+
+def _ensure_inventory_fts(cur) -> None:
+    """
+    inventory_fts: inventory 검색용 FTS5(trigram) 외부 콘텐츠 인덱스
+    - 부분 문자열(3자 이상) 검색을 인덱스로 처리 (LIKE '%x%' 전체 스캔 대체)
+    - 키 컬럼 변경 시에만 트리거로 동기화 (수량 변경은 인덱스 영향 없음)
+    - FTS5/trigram 미지원 SQLite: 생성 생략 → LIKE 검색 유지
+    """
+    cols = ", ".join(_FTS_COLS)
+    new_cols = ", ".join(f"new.{c}" for c in _FTS_COLS)
+    old_cols = ", ".join(f"old.{c}" for c in _FTS_COLS)
+
+    cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='inventory_fts'"
+    )
+    exists = cur.fetchone() is not None
+
+    if not exists:
+        try:
+            cur.execute(f"""
+                CREATE VIRTUAL TABLE inventory_fts USING fts5(
+                    {cols},
+                    content='inventory', content_rowid='id',
+                    tokenize='trigram'
+                )
+            """)
+        except sqlite3.OperationalError:
+            return
+        cur.execute("INSERT INTO inventory_fts(inventory_fts) VALUES ('rebuild')")
+
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_inventory_fts_ins
+        AFTER INSERT ON inventory
+        BEGIN
+            INSERT INTO inventory_fts (rowid, {cols}) VALUES (new.id, {new_cols});
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_inventory_fts_del
+        AFTER DELETE ON inventory
+        BEGIN
+            INSERT INTO inventory_fts (inventory_fts, rowid, {cols})
+            VALUES ('delete', old.id, {old_cols});
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_inventory_fts_upd
+        AFTER UPDATE OF {cols} ON inventory
+        BEGIN
+            INSERT INTO inventory_fts (inventory_fts, rowid, {cols})
+            VALUES ('delete', old.id, {old_cols});
+            INSERT INTO inventory_fts (rowid, {cols}) VALUES (new.id, {new_cols});
+        END
+    """)
+
+
+def _ensure_inventory_version(cur) -> None:
+    """
+    inventory_version: inventory 변경 카운터 (1행)
+    - 행 추가 / 삭제 / 수량·비교키 변경 시 트리거로 +1 (같은 트랜잭션 안에서 반영)
+    - 쓰기 경로(upsert / 일괄 반영 / 롤백 / 관리자 리셋 …)와 무관하게 항상 갱신
+    - ERP 검증의 WMS 집계 캐시 무효화 기준
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    """)
+    cur.execute("INSERT OR IGNORE INTO inventory_version (id, version) VALUES (1, 0)")
+
+    bump = "UPDATE inventory_version SET version = version + 1 WHERE id = 1;"
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_inventory_version_ins
+        AFTER INSERT ON inventory
+        BEGIN {bump} END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_inventory_version_del
+        AFTER DELETE ON inventory
+        BEGIN {bump} END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_inventory_version_upd
+        AFTER UPDATE OF item_code, lot, spec, qty ON inventory
+        BEGIN {bump} END
+    """)
+
+
+def _ensure_inventory_snapshot(cur) -> None:
+    """
+    inventory_snapshot: snap_date 마감 시점 그룹별 입고/출고 누계
+    inventory_snapshot_days: 생성 완료된 마감일 (그룹 0건인 날 포함)
+
+    history 변경(INSERT/DELETE/집계 컬럼 UPDATE) 시
+    해당 created_at 일자 이후 스냅샷은 트리거로 무효화 → 다음 조회 때 재생성
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_snapshot (
+            snap_date TEXT NOT NULL,
+            warehouse TEXT,
+            location TEXT,
+            brand TEXT,
+            item_code TEXT,
+            item_name TEXT,
+            lot TEXT,
+            spec TEXT,
+            inbound_qty REAL NOT NULL,
+            outbound_qty REAL NOT NULL
+        )
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_inventory_snapshot_date
+        ON inventory_snapshot (snap_date)
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_snapshot_days (
+            snap_date TEXT PRIMARY KEY,
+            built_at TEXT NOT NULL
+        )
+    """)
+
+    invalidate = """
+            DELETE FROM inventory_snapshot WHERE snap_date >= substr({col}, 1, 10);
+            DELETE FROM inventory_snapshot_days WHERE snap_date >= substr({col}, 1, 10);
+    """
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_history_snapshot_ins
+        AFTER INSERT ON history
+        BEGIN
+            {invalidate.format(col="NEW.created_at")}
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_history_snapshot_del
+        AFTER DELETE ON history
+        BEGIN
+            {invalidate.format(col="OLD.created_at")}
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_history_snapshot_upd
+        AFTER UPDATE OF type, warehouse, brand, item_code, item_name, lot, spec,
+                        from_location, to_location, qty, created_at
+        ON history
+        BEGIN
+            {invalidate.format(col="MIN(OLD.created_at, NEW.created_at)")}
+        END
+    """)
+
+
+_IO_IN_TYPES = "('IN', 'INBOUND', '입고')"
+_IO_OUT_TYPES = "('OUT', 'OUTBOUND', '출고', 'CS_OUT')"
+
+
+def _io_class_sql(col: str) -> str:
+    return (
+        f"CASE WHEN {col} IN {_IO_IN_TYPES} THEN 'IN' "
+        f"WHEN {col} IN {_IO_OUT_TYPES} THEN 'OUT' END"
+    )
+
+
+def _rebuild_history_daily_rollup(cur) -> None:
+    cur.execute("DELETE FROM history_daily_rollup")
+    cur.execute(f"""
+        INSERT INTO history_daily_rollup
+        (day, io_type, brand, item_code, item_name, spec, qty, cnt)
+        SELECT
+            substr(created_at, 1, 10), {_io_class_sql("type")},
+            brand, item_code, item_name, spec,
+            SUM(qty), COUNT(*)
+        FROM history
+        WHERE type IN {_IO_IN_TYPES} OR type IN {_IO_OUT_TYPES}
+        GROUP BY 1, 2, 3, 4, 5, 6
+    """)
+
+
+def _ensure_history_daily_rollup(cur) -> None:
+    """
+    history_daily_rollup: (일자, 입/출고 구분, 브랜드, 품번, 품명, 규격)별 수량/건수
+    - history INSERT/DELETE/UPDATE 트리거로 증분 유지
+      (add_history / bulk_inbound / rollback_history / 전체 리셋 모두 포함)
+    - 테이블 최초 생성 시 기존 이력으로 1회 재집계
+    """
+    cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='history_daily_rollup'"
+    )
+    exists = cur.fetchone() is not None
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS history_daily_rollup (
+            day TEXT NOT NULL,
+            io_type TEXT NOT NULL,
+            brand TEXT NOT NULL,
+            item_code TEXT NOT NULL,
+            item_name TEXT NOT NULL,
+            spec TEXT NOT NULL,
+            qty REAL NOT NULL DEFAULT 0,
+            cnt INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, io_type, brand, item_code, item_name, spec)
+        )
+    """)
+
+    if not exists:
+        _rebuild_history_daily_rollup(cur)
+
+    key_where = """
+        day = substr({r}.created_at, 1, 10) AND io_type = {cls}
+        AND brand = {r}.brand AND item_code = {r}.item_code
+        AND item_name = {r}.item_name AND spec = {r}.spec
+    """
+
+    def add(r: str) -> str:
+        return f"""
+            INSERT INTO history_daily_rollup
+            (day, io_type, brand, item_code, item_name, spec, qty, cnt)
+            VALUES (
+                substr({r}.created_at, 1, 10), {_io_class_sql(r + ".type")},
+                {r}.brand, {r}.item_code, {r}.item_name, {r}.spec, {r}.qty, 1
+            )
+            ON CONFLICT (day, io_type, brand, item_code, item_name, spec)
+            DO UPDATE SET qty = qty + excluded.qty, cnt = cnt + 1;
+        """
+
+    def sub(r: str) -> str:
+        where = key_where.format(r=r, cls=_io_class_sql(r + ".type"))
+        return f"""
+            UPDATE history_daily_rollup
+            SET qty = qty - {r}.qty, cnt = cnt - 1
+            WHERE {where};
+            DELETE FROM history_daily_rollup
+            WHERE {where} AND cnt <= 0;
+        """
+
+    triggers = {
+        "trg_history_rollup_ins": ("AFTER INSERT ON history", "NEW", add("NEW")),
+        "trg_history_rollup_del": ("AFTER DELETE ON history", "OLD", sub("OLD")),
+        "trg_history_rollup_upd_old": (
+            "AFTER UPDATE OF type, brand, item_code, item_name, spec, qty, created_at ON history",
+            "OLD", sub("OLD"),
+        ),
+        "trg_history_rollup_upd_new": (
+            "AFTER UPDATE OF type, brand, item_code, item_name, spec, qty, created_at ON history",
+            "NEW", add("NEW"),
+        ),
+    }
+    for name, (event, r, body) in triggers.items():
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {name}
+            {event}
+            WHEN {_io_class_sql(r + ".type")} IS NOT NULL
+            BEGIN
+                {body}
+            END
+        """)
+
+
 def init_db() -> None:
-    conn = get_db()
-    try:
+    with db_conn() as conn:
         cur = conn.cursor()
 
         # =====================
@@ -78,10 +496,17 @@ def init_db() -> None:
                 updated_at TEXT NOT NULL
             )
         """)
+        _ensure_inventory_unique_key(cur)
+        _ensure_inventory_fts(cur)
+        _ensure_inventory_version(cur)
+        # 목록 정렬/키셋 페이지네이션용 (brand, item_code, location, lot, spec, id)
         cur.execute("""
-            CREATE INDEX IF NOT EXISTS idx_inventory_key
-            ON inventory (warehouse, location, brand, item_code, lot, spec)
+            CREATE INDEX IF NOT EXISTS idx_inventory_browse
+            ON inventory (brand, item_code, location, lot, spec)
         """)
+        # 정확 / 접두 일치 조회 (스캐너 로케이션 / 품번 단독 조회)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_inventory_location ON inventory (location)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_inventory_item_code ON inventory (item_code, lot, spec)")
 
         # =====================
         # USERS
@@ -135,6 +560,22 @@ def init_db() -> None:
 
         cur.execute("CREATE INDEX IF NOT EXISTS idx_history_created ON history (created_at)")
         cur.execute("CREATE INDEX IF NOT EXISTS idx_history_batch ON history (batch_id)")
+        # 중복 방지 조회용 (등호 컬럼 → created_at 범위) : 이력 건수와 무관하게 인덱스 seek
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_history_dedup
+            ON history (item_code, type, warehouse, lot, spec,
+                        from_location, to_location, qty, created_at)
+        """)
+
+        # =====================
+        # INVENTORY SNAPSHOT (일별 마감 재고, 기준일 재고 조회용)
+        # =====================
+        _ensure_inventory_snapshot(cur)
+
+        # =====================
+        # HISTORY DAILY ROLLUP (입·출고 통계용 일별 집계)
+        # =====================
+        _ensure_history_daily_rollup(cur)
 
         # =====================
         # DAMAGE CODES
@@ -224,9 +665,97 @@ def init_db() -> None:
             )
         """)
 
+        # =====================
+        # JOBS (백그라운드 엑셀 처리)
+        # =====================
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                total INTEGER,
+                processed INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                created_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS job_errors (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                row INTEGER,
+                error TEXT NOT NULL,
+                FOREIGN KEY(job_id) REFERENCES jobs(id) ON DELETE CASCADE
+            )
+        """)
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_job_errors_job
+            ON job_errors (job_id, id)
+        """)
+        # 업로드 레지스트리 (파일 내용 SHA-256 → 최초 반영 작업)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS uploads (
+                kind TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                filename TEXT NOT NULL DEFAULT '',
+                size INTEGER NOT NULL DEFAULT 0,
+                job_id TEXT NOT NULL,
+                batch_id TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (kind, sha256)
+            )
+        """)
+        # ERP 재고 검증 결과 (verify_id 단위 보관, expires_at 지나면 삭제)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS erp_verify_sessions (
+                id TEXT PRIMARY KEY,
+                filename TEXT NOT NULL DEFAULT '',
+                summary TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                expires_at TEXT NOT NULL
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS erp_verify_rows (
+                verify_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                item_code TEXT NOT NULL,
+                lot TEXT NOT NULL DEFAULT '',
+                spec TEXT NOT NULL DEFAULT '',
+                erp_qty REAL NOT NULL DEFAULT 0,
+                wms_qty REAL NOT NULL DEFAULT 0,
+                diff REAL NOT NULL DEFAULT 0,
+                note TEXT NOT NULL DEFAULT '',
+                PRIMARY KEY (verify_id, seq),
+                FOREIGN KEY(verify_id) REFERENCES erp_verify_sessions(id) ON DELETE CASCADE
+            ) WITHOUT ROWID
+        """)
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_erp_verify_rows_kind
+            ON erp_verify_rows (verify_id, kind, seq)
+        """)
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_erp_verify_sessions_expires
+            ON erp_verify_sessions (expires_at)
+        """)
+
+        # 재시작으로 중단된 작업 정리 (인프로세스 큐 → 재개 불가)
+        cur.execute("""
+            UPDATE jobs
+            SET status = 'failed', error = '서버 재시작으로 중단됨', finished_at = ?
+            WHERE status IN ('queued', 'running')
+        """, (datetime.now().isoformat(timespec="seconds"),))
+
         conn.commit()
-    finally:
-        conn.close()
+
+        _load_schema_caps(cur)
 
 
 # =====================================================
@@ -236,8 +765,7 @@ def init_db() -> None:
 def resolve_inventory_brand_and_name(
     warehouse, location, item_code, lot, spec, brand=""
 ) -> Tuple[str, str]:
-    conn = get_db()
-    try:
+    with db_conn() as conn:
         cur = conn.cursor()
         brand_n = _norm(brand)
 
@@ -264,8 +792,6 @@ def resolve_inventory_brand_and_name(
         if not rows:
             return ("", "")
         raise ValueError("브랜드가 여러 개입니다. 브랜드를 지정해 주세요.")
-    finally:
-        conn.close()
 
 
 # =====================================================
@@ -275,8 +801,7 @@ def get_inventory_one(
     warehouse, location, brand,
     item_code, lot, spec
 ) -> Optional[Dict[str, Any]]:
-    conn = get_db()
-    try:
+    with db_conn() as conn:
         cur = conn.cursor()
         cur.execute("""
             SELECT * FROM inventory
@@ -288,8 +813,14 @@ def get_inventory_one(
         ))
         r = cur.fetchone()
         return dict(r) if r else None
-    finally:
-        conn.close()
+
+
+def get_inventory_by_id(inventory_id: int) -> Optional[Dict[str, Any]]:
+    """PK 조회 (스캔 선택 → 재확인)"""
+    with db_conn() as conn:
+        r = conn.execute("SELECT * FROM inventory WHERE id = ?", (int(inventory_id),)).fetchone()
+        return dict(r) if r else None
+
 
 def get_inventory_by_item_code(
     *, item_code: str, warehouse: str | None = None
@@ -300,8 +831,7 @@ def get_inventory_by_item_code(
     - qty > 0 인 현재고만
     - 로케이션/LOT/규격 선택용
     """
-    conn = get_db()
-    try:
+    with db_conn() as conn:
         cur = conn.cursor()
 
         where = ["item_code = ?", "qty > 0"]
@@ -347,155 +877,258 @@ def get_inventory_by_item_code(
             for r in rows
         ]
 
-    finally:
-        conn.close()
+
+_INVENTORY_UPSERT_SQL = f"""
+    INSERT INTO inventory
+    (warehouse, location, brand, item_code, item_name, lot, spec, qty, note, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT ({_INVENTORY_KEY_COLS}) DO UPDATE SET
+        qty = ROUND(qty + excluded.qty, 3),
+        note = excluded.note,
+        updated_at = excluded.updated_at
+"""
+
+_INVENTORY_DECREASE_SQL = """
+    UPDATE inventory
+    SET qty = ROUND(qty + ?, 3), note = ?, updated_at = ?
+    WHERE warehouse=? AND location=? AND brand=?
+      AND item_code=? AND lot=? AND spec=?
+"""
+
+_INVENTORY_CLEANUP_SQL = """
+    DELETE FROM inventory
+    WHERE warehouse=? AND location=? AND brand=?
+      AND item_code=? AND lot=? AND spec=?
+      AND qty <= 0
+"""
+
 
 def upsert_inventory(
     warehouse, location, brand, item_code, item_name,
     lot, spec, qty_delta, note=""
 ) -> bool:
-    conn = get_db()
-    try:
+    """
+    재고 증감 (단일 문장)
+    - 증가: INSERT … ON CONFLICT DO UPDATE (자연키 UNIQUE)
+    - 감소/0: 기존 행만 UPDATE (없으면 False)
+    - 결과 0 이하: 행 삭제
+    """
+    with db_conn() as conn:
         cur = conn.cursor()
         now = datetime.now().isoformat(timespec="seconds")
         delta = _q3(qty_delta)
-
-        cur.execute("""
-            SELECT id, qty FROM inventory
-            WHERE warehouse=? AND location=? AND brand=?
-              AND item_code=? AND lot=? AND spec=?
-        """, (_norm(warehouse), _norm(location), _norm(brand),
-              _norm(item_code), _norm(lot), _norm(spec)))
+        key = (_norm(warehouse), _norm(location), _norm(brand),
+               _norm(item_code), _norm(lot), _norm(spec))
+
+        if delta > 0:
+            w, l, b, c, lt, sp = key
+            cur.execute(
+                _INVENTORY_UPSERT_SQL + " RETURNING qty",
+                (w, l, b, c, _norm(item_name), lt, sp, delta, _norm(note), now),
+            )
+        else:
+            cur.execute(
+                _INVENTORY_DECREASE_SQL + " RETURNING qty",
+                (delta, _norm(note), now) + key,
+            )
         row = cur.fetchone()
 
-        if row:
-            new_qty = _q3(float(row["qty"]) + delta)
-            if new_qty <= 0:
-                cur.execute("DELETE FROM inventory WHERE id=?", (row["id"],))
-            else:
-                cur.execute("""
-                    UPDATE inventory
-                    SET qty=?, note=?, updated_at=?
-                    WHERE id=?
-                """, (new_qty, _norm(note), now, row["id"]))
-        else:
-            if delta <= 0:
-                return False
-            cur.execute("""
-                INSERT INTO inventory
-                (warehouse, location, brand, item_code, item_name, lot, spec, qty, note, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (_norm(warehouse), _norm(location), _norm(brand),
-                  _norm(item_code), _norm(item_name),
-                  _norm(lot), _norm(spec), delta, _norm(note), now))
+        if row is None:
+            return False
+        if row["qty"] <= 0:
+            cur.execute(_INVENTORY_CLEANUP_SQL, key)
 
-        conn.commit()
         return True
-    finally:
-        conn.close()
 
 
-def query_inventory(
-    warehouse=None, location=None, brand=None,
-    item_code=None, lot=None, spec=None,
-    limit: int = 500
-) -> list[dict]:
-    conn = get_db()
-    try:
-        cur = conn.cursor()
-        where, params = ["qty > 0"], []
+_FTS_MIN_LEN = 3  # trigram: 3자 미만은 인덱스 매칭 불가 → LIKE
 
-        if warehouse:
-            where.append("warehouse LIKE ?")
-            params.append(f"%{_norm(warehouse)}%")
 
-        if location:
-            where.append("location LIKE ?")
-            params.append(f"%{_norm(location)}%")
+def _fts_phrase(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
 
-        if brand:
-            where.append("brand = ?")
-            params.append(_norm(brand))
 
-        if item_code:
-            where.append("item_code LIKE ?")
-            params.append(f"%{_norm(item_code)}%")
+def _inventory_search_clause(
+    terms: List[Tuple[Optional[str], str]],
+) -> Tuple[str, str, List[Any]]:
+    """
+    부분 문자열 검색 조건 → (FROM 절, WHERE 조건, 파라미터)
+    terms: [(컬럼 또는 None=키 컬럼 전체, 검색어)]
+    - 3자 이상 + FTS 사용 가능: inventory_fts MATCH (컬럼 필터 / 전체 컬럼)
+    - 그 외: LIKE '%x%'
+    """
+    use_fts = _has_column("inventory_fts", "item_code")
+    match, where, params = [], [], []
+
+    for col, text in terms:
+        if use_fts and len(text) >= _FTS_MIN_LEN:
+            match.append(f"{col}:{_fts_phrase(text)}" if col else _fts_phrase(text))
+        elif col:
+            where.append(f"i.{col} LIKE ?")
+            params.append(f"%{text}%")
+        else:
+            where.append("(" + " OR ".join(f"i.{c} LIKE ?" for c in _FTS_COLS) + ")")
+            params.extend([f"%{text}%"] * len(_FTS_COLS))
+
+    if match:
+        return (
+            "inventory_fts f JOIN inventory i ON i.id = f.rowid",
+            " AND ".join(["inventory_fts MATCH ?"] + where),
+            [" AND ".join(match)] + params,
+        )
+    return "inventory i", " AND ".join(where) or "1", params
 
-        if lot:
-            where.append("lot LIKE ?")
-            params.append(f"%{_norm(lot)}%")
 
-        if spec:
-            where.append("spec LIKE ?")
-            params.append(f"%{_norm(spec)}%")
+_INVENTORY_ORDER_COLS = ("brand", "item_code", "location", "lot", "spec", "id")
 
-        sql = """
-            SELECT *
-            FROM inventory
-            WHERE {where}
-            ORDER BY
-                brand ASC,
-                item_code ASC,
-                location ASC,
-                lot ASC,
-                spec ASC
-            LIMIT ?
-        """.format(where=" AND ".join(where))
 
-        params.append(limit)
+def _inventory_after_clause(after: Optional[Sequence[Any]]) -> Tuple[str, List[Any]]:
+    """키셋: (brand, item_code, location, lot, spec, id) > 커서 값"""
+    if after is None:
+        return "", []
+    cols = ", ".join(f"i.{c}" for c in _INVENTORY_ORDER_COLS)
+    marks = ", ".join("?" for _ in _INVENTORY_ORDER_COLS)
+    return f" AND ({cols}) > ({marks})", list(after)
 
-        cur.execute(sql, params)
-        return [dict(r) for r in cur.fetchall()]
 
-    finally:
-        conn.close()
-def query_inventory_smart(q: str | None = None, limit: int = 1000):
-    conn = get_db()
-    try:
-        cur = conn.cursor()
+def _inventory_terms(warehouse=None, location=None, item_code=None, lot=None, spec=None):
+    return [
+        (col, _norm(v))
+        for col, v in (
+            ("warehouse", warehouse), ("location", location),
+            ("item_code", item_code), ("lot", lot), ("spec", spec),
+        )
+        if _norm(v)
+    ]
 
-        where = ["qty > 0"]
-        params = []
 
-        if q:
-            qn = _norm(q)
+INVENTORY_MATCH_MODES = ("contains", "exact", "prefix")
 
-            if "-" in qn:  # 로케이션
-                where.append("location LIKE ?")
-                params.append(f"%{qn}%")
 
-            elif qn.isdigit():  # 품번
-                where.append("item_code LIKE ?")
-                params.append(f"%{qn}%")
+def _inventory_key_clause(terms: List[Tuple[str, str]], match: str) -> Tuple[str, str, List[Any]]:
+    """
+    정확 / 접두 일치 조건 → (FROM 절, WHERE 조건, 파라미터)
+    - exact: col = ?  /  prefix: col >= ? AND col < 상한 (인덱스 범위 검색)
+    - location / item_code 단독 조회도 idx_inventory_location / idx_inventory_item_code seek
+    """
+    where, params = [], []
+    for col, text in terms:
+        if match == "exact":
+            where.append(f"i.{col} = ?")
+            params.append(text)
+        else:
+            where.append(f"i.{col} >= ? AND i.{col} < ?")
+            params.extend(_prefix_range(text))
+    return "inventory i", " AND ".join(where) or "1", params
 
-            elif any(c.isdigit() for c in qn):  # LOT
-                where.append("lot LIKE ?")
-                params.append(f"%{qn}%")
 
-            else:  # 브랜드
-                where.append("brand LIKE ?")
-                params.append(f"%{qn}%")
+def _inventory_select(
+    terms: List[Tuple[Optional[str], str]],
+    *,
+    brand=None,
+    ranked: bool = False,
+    after: Optional[Sequence[Any]] = None,
+    match: str = "contains",
+) -> Tuple[str, List[Any]]:
+    """재고 목록 SELECT (LIMIT 제외) → (sql, params)"""
+    if match not in INVENTORY_MATCH_MODES:
+        raise ValueError(f"알 수 없는 검색 방식: {match}")
+
+    if match == "contains":
+        source, where, params = _inventory_search_clause(terms)
+    else:
+        source, where, params = _inventory_key_clause(terms, match)
+
+    if brand:
+        where += " AND i.brand = ?"
+        params.append(_norm(brand))
+
+    rank = ""
+    if ranked and source.startswith("inventory_fts"):
+        rank = "bm25(inventory_fts), "
+
+    after_sql, after_params = _inventory_after_clause(after)
+    params.extend(after_params)
+
+    sql = f"""
+        SELECT i.*
+        FROM {source}
+        WHERE i.qty > 0 AND {where}{after_sql}
+        ORDER BY
+            {rank}
+            i.brand ASC,
+            i.item_code ASC,
+            i.location ASC,
+            i.lot ASC,
+            i.spec ASC,
+            i.id ASC
+    """
+    return sql, params
 
-        sql = f"""
-            SELECT *
-            FROM inventory
-            WHERE {" AND ".join(where)}
-            ORDER BY
-              brand ASC,
-              item_code ASC,
-              location ASC,
-              lot ASC,
-              spec ASC
-            LIMIT ?
-        """
-        params.append(limit)
 
-        cur.execute(sql, params)
+def query_inventory(
+    warehouse=None, location=None, brand=None,
+    item_code=None, lot=None, spec=None,
+    limit: int = 500,
+    after: Optional[Sequence[Any]] = None,
+    match: str = "contains",
+) -> list[dict]:
+    """
+    재고 목록 (brand, item_code, location, lot, spec, id 순)
+    - after: 이전 페이지 마지막 행의 정렬 키 (키셋 페이지네이션)
+    - match: 값이 있는 필드의 비교 방식 (brand 는 항상 정확 일치)
+      contains(부분 일치, 화면 검색) / exact(정확 일치, 스캐너·QR) / prefix(접두 일치)
+    """
+    terms = _inventory_terms(warehouse, location, item_code, lot, spec)
+    sql, params = _inventory_select(terms, brand=brand, after=after, match=match)
+
+    with db_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(sql + " LIMIT ?", params + [limit])
         return [dict(r) for r in cur.fetchall()]
-    finally:
-        conn.close()
 
 
+def query_inventory_smart(
+    q: str | None = None,
+    limit: int = 1000,
+    *,
+    ranked: bool = True,
+    after: Optional[Sequence[Any]] = None,
+):
+    """
+    통합 검색 (공백 구분 검색어 AND, 검색어별 키 컬럼 전체 부분 일치)
+    - ranked: FTS 매칭 시 관련도(bm25) 순 → 기존 정렬 (화면 검색용)
+    - ranked=False: query_inventory 와 같은 키 순서 → after 로 키셋 페이지네이션
+    """
+    if after is not None:
+        ranked = False
+
+    terms = [(None, t) for t in _norm(q).split()]
+    sql, params = _inventory_select(terms, ranked=ranked, after=after)
+
+    with db_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(sql + " LIMIT ?", params + [limit])
+        return [dict(r) for r in cur.fetchall()]
+
+
+def iter_inventory(
+    q: str | None = None,
+    warehouse=None, location=None, brand=None,
+    item_code=None, lot=None, spec=None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    재고 전체 스트리밍 (CSV 다운로드용, 행 수 제한 없음)
+    - q 있으면 통합 검색, 없으면 필드별 검색 (화면과 동일 우선순위)
+    """
+    if q:
+        terms = [(None, t) for t in _norm(q).split()]
+        brand = None
+    else:
+        terms = _inventory_terms(warehouse, location, item_code, lot, spec)
+    sql, params = _inventory_select(terms, brand=brand)
+    return iter_query(sql, params)
+
 
 # =====================================================
 # HISTORY
@@ -503,6 +1136,24 @@ def query_inventory_smart(q: str | None = None, limit: int = 1000):
 
 from datetime import datetime, timedelta
 
+_HISTORY_INSERT_SQL = """
+    INSERT INTO history
+    (type, warehouse, operator, brand, item_code, item_name,
+     lot, spec, from_location, to_location, qty, note,
+     batch_id, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# 중복 이력 확인 (idx_history_dedup 으로 seek)
+_HISTORY_DEDUP_SQL = """
+    SELECT 1 FROM history
+    WHERE item_code=? AND type=? AND warehouse=? AND lot=? AND spec=?
+      AND from_location=? AND to_location=? AND qty=?
+      AND created_at >= ?
+    LIMIT 1
+"""
+
+
 def add_history(
     type,
     warehouse,
@@ -520,8 +1171,7 @@ def add_history(
     dedup_seconds=5,
     created_at=None,          # 🔥 추가
 ):
-    conn = get_db()
-    try:
+    with db_conn() as conn:
         cur = conn.cursor()
 
         # =========================
@@ -530,65 +1180,48 @@ def add_history(
         base_dt = created_at if created_at else datetime.now()
         now = base_dt.isoformat(timespec="seconds")
 
-        # 중복 방지 기준 시간
-        threshold = (
-            base_dt - timedelta(seconds=dedup_seconds)
-        ).isoformat(timespec="seconds")
+        # =========================
+        # 중복 체크 (idx_history_dedup seek, dedup_seconds <= 0 이면 생략)
+        # =========================
+        if dedup_seconds > 0:
+            threshold = (
+                base_dt - timedelta(seconds=dedup_seconds)
+            ).isoformat(timespec="seconds")
+
+            cur.execute(_HISTORY_DEDUP_SQL, (
+                _norm(item_code),
+                _norm(type),
+                _norm(warehouse),
+                _norm(lot),
+                _norm(spec),
+                _norm(from_location),
+                _norm(to_location),
+                _q3(qty),
+                threshold,
+            ))
+            if cur.fetchone():
+                return
 
         # =========================
-        # 중복 체크
+        # INSERT
         # =========================
-        cur.execute("""
-            SELECT COUNT(*) FROM history
-            WHERE type=? AND warehouse=? AND item_code=? AND lot=? AND spec=?
-              AND from_location=? AND to_location=? AND qty=?
-              AND created_at >= ?
-        """, (
+        values = (
             _norm(type),
             _norm(warehouse),
+            _norm(operator),
+            _norm(brand),
             _norm(item_code),
+            _norm(item_name),
             _norm(lot),
             _norm(spec),
             _norm(from_location),
             _norm(to_location),
             _q3(qty),
-            threshold,
-        ))
-        if cur.fetchone()[0] > 0:
-            return
-
-        # =========================
-        # 컬럼 확인
-        # =========================
-        cur.execute("PRAGMA table_info(history)")
-        cols = {r["name"] for r in cur.fetchall()}
+            _norm(note),
+        )
 
-        # =========================
-        # INSERT
-        # =========================
-        if "batch_id" in cols:
-            cur.execute("""
-                INSERT INTO history
-                (type, warehouse, operator, brand, item_code, item_name,
-                 lot, spec, from_location, to_location, qty, note,
-                 batch_id, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                _norm(type),
-                _norm(warehouse),
-                _norm(operator),
-                _norm(brand),
-                _norm(item_code),
-                _norm(item_name),
-                _norm(lot),
-                _norm(spec),
-                _norm(from_location),
-                _norm(to_location),
-                _q3(qty),
-                _norm(note),
-                batch_id,
-                now,
-            ))
+        if _has_column("history", "batch_id"):
+            cur.execute(_HISTORY_INSERT_SQL, values + (batch_id, now))
         else:
             cur.execute("""
                 INSERT INTO history
@@ -596,26 +1229,7 @@ def add_history(
                  lot, spec, from_location, to_location, qty, note,
                  created_at)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                _norm(type),
-                _norm(warehouse),
-                _norm(operator),
-                _norm(brand),
-                _norm(item_code),
-                _norm(item_name),
-                _norm(lot),
-                _norm(spec),
-                _norm(from_location),
-                _norm(to_location),
-                _q3(qty),
-                _norm(note),
-                now,
-            ))
-
-        conn.commit()
-
-    finally:
-        conn.close()
+            """, values + (now,))
 
 
 # =====================================================
@@ -626,8 +1240,7 @@ def rollback_history(history_id: int, operator: str, note: str = ""):
     """
     입고 / 출고 / 이동 롤백
     """
-    conn = get_db()
-    try:
+    with stock_tx() as conn:
         cur = conn.cursor()
         now = datetime.now().isoformat(timespec="seconds")
 
@@ -708,73 +1321,551 @@ def rollback_history(history_id: int, operator: str, note: str = ""):
             now
         ))
 
-        conn.commit()
-    finally:
-        conn.close()
 
-def rollback_batch(batch_id: str, operator: str, note: str = "") -> int:
+def _rollback_effects(h: Dict[str, Any]) -> Optional[List[Tuple[str, float]]]:
     """
-    엑셀(batch) 전체 롤백
-    inventory는 품목별 합산 후 1회 처리
+    이력 1건 롤백 시 재고 증감 [(로케이션, 증감)] (롤백 대상 아님: None)
+    - 입고 / 초기재고: 입고 로케이션 차감
+    - 출고: 출고 로케이션 복원
+    - 이동: 도착 로케이션 차감 + 출발 로케이션 복원
     """
-    conn = get_db()
-    try:
+    qty = _q3(h["qty"])
+    t = h["type"]
+    if t in ("입고", "초기재고"):
+        return [(_norm(h["to_location"]), -qty)]
+    if t == "출고":
+        return [(_norm(h["from_location"]), qty)]
+    if t == "이동":
+        return [(_norm(h["to_location"]), -qty), (_norm(h["from_location"]), qty)]
+    return None
+
+
+def rollback_batch(batch_id: str, operator: str, note: str = "") -> Tuple[int, List[Tuple[int, str]]]:
+    """
+    batch_id 단위 일괄 롤백 (입고 / 출고 / 이동 / 초기재고)
+    - 대상: idx_history_batch 로 batch 이력만 조회 (rolled_back=0)
+    - 최근 이력부터 역순으로 현재고(쓰기 잠금 안에서 1회 조회)에 되돌림 적용
+      → 재고가 모자라거나 대상 유형이 아닌 이력은 해당 행만 제외, 나머지는 반영
+    - 재고: 키별 합산 후 1회 반영 / 원본 이력 rolled_back 표시 + 롤백 이력: 단일 트랜잭션
+    → (롤백 건수, 실패 [(history_id, 사유)]), 대상이 없으면 (0, [])
+    """
+    now = datetime.now().isoformat(timespec="seconds")
+    op = _norm(operator)
+    note = _norm(note)
+    inv_note = f"배치롤백:{batch_id}"
+
+    with stock_tx() as conn:
         cur = conn.cursor()
 
         cur.execute("""
             SELECT * FROM history
             WHERE batch_id = ?
               AND rolled_back = 0
-              AND type = '입고'
+            ORDER BY id DESC
         """, (batch_id,))
-        rows = cur.fetchall()
+        targets = [dict(r) for r in cur.fetchall()]
+        if not targets:
+            return 0, []
 
-        if not rows:
-            return 0
-
-        summary = {}
-        for r in rows:
-            key = (
-                r["warehouse"],
-                r["to_location"],
-                r["brand"],
-                r["item_code"],
-                r["item_name"],
-                r["lot"],
-                r["spec"],
+        # 관련 품번 현재고 1회 조회 (자연키 → 수량)
+        codes = sorted({_norm(h["item_code"]) for h in targets})
+        cur.execute("""
+            SELECT warehouse, location, brand, item_code, lot, spec, qty
+            FROM inventory
+            WHERE item_code IN (SELECT value FROM json_each(?))
+        """, (json.dumps(codes, ensure_ascii=False),))
+        stock = {_inventory_key(dict(r)): _q3(r["qty"]) for r in cur.fetchall()}
+
+        errors: List[Tuple[int, str]] = []
+        deltas: Dict[tuple, list] = {}
+        done_ids: List[Tuple[str, str, str, int]] = []
+        history_rows = []
+
+        for h in targets:
+            effects = _rollback_effects(h)
+            if effects is None:
+                errors.append((h["id"], f"롤백 대상이 아닌 이력입니다. ({h['type']})"))
+                continue
+
+            # 행 단위 증감 (같은 키는 합산: 출발 = 도착 이동 등)
+            row_deltas: Dict[tuple, float] = {}
+            for location, delta in effects:
+                key = _inventory_key({**h, "location": location})
+                row_deltas[key] = _q3(row_deltas.get(key, 0) + delta)
+
+            short = next(
+                (
+                    (key, stock.get(key, 0))
+                    for key, delta in row_deltas.items()
+                    if delta < 0 and _q3(stock.get(key, 0) + delta) < 0
+                ),
+                None,
             )
-            summary[key] = summary.get(key, 0) + r["qty"]
-
-        for (
-            warehouse, location, brand,
-            item_code, item_name, lot, spec
-        ), total_qty in summary.items():
+            if short is not None:
+                (_, location, _, item_code, _, _), have = short
+                errors.append((
+                    h["id"],
+                    f"재고 부족: {location} / {item_code} 현재고 {have} < 롤백 수량 {_q3(h['qty'])}",
+                ))
+                continue
+
+            for key, delta in row_deltas.items():
+                stock[key] = _q3(stock.get(key, 0) + delta)
+                d = deltas.get(key)
+                if d is None:
+                    deltas[key] = [delta, _norm(h["item_name"]), inv_note]
+                else:
+                    d[0] += delta
 
-            ok = upsert_inventory(
-                warehouse, location, brand,
-                item_code, item_name,
-                lot, spec,
-                -total_qty,
-                note=f"배치롤백:{batch_id}"
-            )
-            if not ok:
-                raise ValueError("배치 재고 롤백 실패")
+            done_ids.append((now, op, note, h["id"]))
+            history_rows.append((
+                "롤백", h["warehouse"], op, h["brand"], h["item_code"], h["item_name"],
+                h["lot"], h["spec"], h["to_location"], h["from_location"], _q3(h["qty"]),
+                f"원본ID:{h['id']} {note}", None, now,
+            ))
 
-        now = datetime.now().isoformat(timespec="seconds")
-        cur.execute("""
+        _apply_inventory_deltas(cur, deltas, now)
+        cur.executemany("""
             UPDATE history
             SET rolled_back = 1,
                 rollback_at = ?,
                 rollback_by = ?,
                 rollback_note = ?
-            WHERE batch_id = ?
-        """, (now, operator, note, batch_id))
+            WHERE id = ?
+        """, done_ids)
+        cur.executemany(_HISTORY_INSERT_SQL, history_rows)
 
-        conn.commit()
-        return len(rows)
+    return len(done_ids), errors
+
+
+# =====================================================
+# STOCK OPERATIONS (재고 증감 + 이력 = 1 트랜잭션)
+# =====================================================
+
+def _locked_qty(cur, warehouse, location, brand, item_code, lot, spec) -> float:
+    """stock_tx 안에서 호출 (쓰기 잠금 상태의 현재고)"""
+    cur.execute("""
+        SELECT qty FROM inventory
+        WHERE warehouse=? AND location=? AND brand=?
+          AND item_code=? AND lot=? AND spec=?
+    """, (_norm(warehouse), _norm(location), _norm(brand),
+          _norm(item_code), _norm(lot), _norm(spec)))
+    r = cur.fetchone()
+    return _q3(r["qty"]) if r else 0.0
+
+
+def stock_inbound(
+    *, warehouse, location, brand, item_code, item_name,
+    lot, spec, qty, operator="", note=""
+) -> float:
+    """
+    입고: 재고 가산 + 이력 (1 commit)
+    """
+    qty = _q3(qty)
+    with stock_tx():
+        if not upsert_inventory(
+            warehouse, location, brand, item_code, item_name,
+            lot, spec, qty, note=note
+        ):
+            raise ValueError("입고 처리에 실패했습니다.")
+
+        add_history(
+            "입고", warehouse, operator, brand, item_code, item_name,
+            lot, spec, "입고", location, qty, note,
+        )
+    return qty
+
+
+def stock_outbound(
+    *, warehouse, location, brand, item_code, item_name,
+    lot, spec, qty, operator="", note=""
+) -> Dict[str, Any]:
+    """
+    출고: 브랜드/품명 보정 → 현재고 확인 → 차감 → 이력 (1 commit)
+    - 재고 없음/부족: StockConflict
+    - 브랜드 다중: ValueError
+    """
+    qty = _q3(qty)
+    with stock_tx() as conn:
+        cur = conn.cursor()
+
+        resolved_brand, resolved_name = resolve_inventory_brand_and_name(
+            warehouse, location, item_code, lot, spec, brand
+        )
+        final_brand = resolved_brand or _norm(brand)
+        final_name = _norm(item_name) or resolved_name
+
+        available = _locked_qty(cur, warehouse, location, final_brand, item_code, lot, spec)
+        if available <= 0:
+            raise StockConflict("선택한 재고가 존재하지 않습니다. 새로고침 후 다시 선택하세요.")
+        if qty > available:
+            raise StockConflict(f"출고 수량({qty})이 현재고({available})를 초과했습니다.")
+
+        upsert_inventory(
+            warehouse, location, final_brand, item_code, final_name,
+            lot, spec, -qty, note=note
+        )
+        add_history(
+            "출고", warehouse, operator, final_brand, item_code, final_name,
+            lot, spec, location, "출고", qty, note,
+        )
+
+    return {
+        "brand": final_brand,
+        "item_name": final_name,
+        "remain_qty": _q3(available - qty),
+    }
+
+
+def stock_move(
+    *, warehouse, from_location, to_location, brand, item_code, item_name,
+    lot, spec, qty, operator="", note=""
+) -> Dict[str, Any]:
+    """
+    이동: 브랜드/품명 보정(출발지 기준) → 출발지 차감 → 도착지 가산 → 이력 (1 commit)
+    - 출발지 재고 부족: StockConflict
+    - 브랜드 다중: ValueError
+    """
+    qty = _q3(qty)
+    with stock_tx() as conn:
+        cur = conn.cursor()
+
+        resolved_brand, resolved_name = resolve_inventory_brand_and_name(
+            warehouse, from_location, item_code, lot, spec, brand
+        )
+        final_brand = resolved_brand or _norm(brand)
+        final_name = _norm(item_name) or resolved_name
+
+        available = _locked_qty(cur, warehouse, from_location, final_brand, item_code, lot, spec)
+        if qty > available:
+            raise StockConflict(f"출발지 재고가 부족하여 이동할 수 없습니다. (현재 {available})")
+
+        upsert_inventory(
+            warehouse, from_location, final_brand, item_code, final_name,
+            lot, spec, -qty, note=note
+        )
+        upsert_inventory(
+            warehouse, to_location, final_brand, item_code, final_name,
+            lot, spec, qty, note=note
+        )
+        add_history(
+            "이동", warehouse, operator, final_brand, item_code, final_name,
+            lot, spec, from_location, to_location, qty, note,
+        )
+
+    return {
+        "brand": final_brand,
+        "item_name": final_name,
+        "remain_qty": _q3(available - qty),
+    }
+
+
+def stock_move_by_id(
+    *, inventory_id: int, to_location, qty, operator="", note="",
+    from_location: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    이동 (재고 행 id 기준): 쓰기 잠금 안에서 id 로 출발 재고 조회 → 차감 → 도착지 가산 → 이력 (1 commit)
+    - from_location: 지정 시 선택 당시 출발지와 다르면 StockConflict
+    - 재고 없음/부족: StockConflict
+    """
+    qty = _q3(qty)
+    to_location = _norm(to_location)
+    if qty <= 0:
+        raise ValueError("수량은 0보다 커야 합니다.")
+
+    with stock_tx() as conn:
+        r = conn.execute("SELECT * FROM inventory WHERE id = ?", (int(inventory_id),)).fetchone()
+        if r is None or (from_location is not None and r["location"] != _norm(from_location)):
+            raise StockConflict("선택한 재고가 존재하지 않습니다. 새로고침 후 다시 선택하세요.")
+        if r["location"] == to_location:
+            raise ValueError("출발지와 도착지가 동일합니다.")
+
+        available = _q3(r["qty"])
+        if qty > available:
+            raise StockConflict(f"출발지 재고가 부족하여 이동할 수 없습니다. (현재 {available})")
+
+        upsert_inventory(
+            r["warehouse"], r["location"], r["brand"], r["item_code"], r["item_name"],
+            r["lot"], r["spec"], -qty, note=note
+        )
+        upsert_inventory(
+            r["warehouse"], to_location, r["brand"], r["item_code"], r["item_name"],
+            r["lot"], r["spec"], qty, note=note
+        )
+        add_history(
+            "이동", r["warehouse"], operator, r["brand"], r["item_code"], r["item_name"],
+            r["lot"], r["spec"], r["location"], to_location, qty, note,
+        )
+
+    return {
+        "brand": r["brand"],
+        "item_name": r["item_name"],
+        "from_location": r["location"],
+        "remain_qty": _q3(available - qty),
+    }
+
+
+# =====================================================
+# BULK (엑셀 일괄 반영)
+# =====================================================
+
+def _inventory_key(r: Dict[str, Any]) -> Tuple[str, str, str, str, str, str]:
+    return (
+        _norm(r.get("warehouse")), _norm(r.get("location")), _norm(r.get("brand")),
+        _norm(r.get("item_code")), _norm(r.get("lot")), _norm(r.get("spec")),
+    )
+
+
+def _apply_inventory_deltas(cur, deltas: Dict[tuple, list], now: str) -> None:
+    """
+    키별 합산 증감 일괄 반영 (stock_tx 안에서 호출)
+    deltas: {(warehouse, location, brand, item_code, lot, spec): [qty_delta, item_name, note]}
+    - 증가: UPSERT (신규 행 INSERT / 기존 행 가산)
+    - 감소: 기존 행만 차감
+    - 결과 0 이하 행 삭제
+    """
+    upserts, decreases = [], []
+
+    for key, (delta, item_name, note) in deltas.items():
+        delta = _q3(delta)
+        if delta > 0:
+            warehouse, location, brand, item_code, lot, spec = key
+            upserts.append((
+                warehouse, location, brand, item_code, item_name,
+                lot, spec, delta, note, now,
+            ))
+        else:
+            decreases.append((delta, note, now) + tuple(key))
+
+    cur.executemany(_INVENTORY_UPSERT_SQL, upserts)
+    cur.executemany(_INVENTORY_DECREASE_SQL, decreases)
+    cur.executemany(_INVENTORY_CLEANUP_SQL, [r[3:] for r in decreases])
+
+
+def bulk_inbound(
+    rows: List[Dict[str, Any]],
+    *,
+    operator: str = "",
+    batch_id: Optional[str] = None,
+    history_type: str = "입고",
+    from_location: str = "",
+    history_note: Optional[str] = None,
+) -> int:
+    """
+    입고 일괄 반영 (엑셀 업로드 / 초기재고)
+    - rows: [{warehouse, location, brand, item_code, item_name, lot, spec, qty, note, created_at}]
+    - 재고: 키별 합산 후 키당 1회 반영 / 이력: 행별 executemany
+    - 이력 유형 / 출발지 / 비고: history_type, from_location, history_note (None: 행 비고)
+    - 전체 단일 트랜잭션 (중간 실패 시 전체 rollback)
+    - 목표 처리량: 20,000행 기준 10,000 rows/sec 이상 (bench/bench_excel_inbound.py)
+    """
+    now_dt = datetime.now()
+    now = now_dt.isoformat(timespec="seconds")
+    op = _norm(operator)
+
+    deltas: Dict[tuple, list] = {}
+    history_rows = []
+
+    for r in rows:
+        key = _inventory_key(r)
+        warehouse, location, brand, item_code, lot, spec = key
+        item_name = _norm(r.get("item_name"))
+        note = _norm(r.get("note"))
+        qty = _q3(r.get("qty"))
+
+        if qty > 0:
+            d = deltas.get(key)
+            if d is None:
+                deltas[key] = [qty, item_name, note]
+            else:
+                d[0] += qty
+                d[2] = note
+
+        created_at = (r.get("created_at") or now_dt).isoformat(timespec="seconds")
+        history_rows.append((
+            history_type, warehouse, op, brand, item_code, item_name,
+            lot, spec, from_location, location, qty,
+            note if history_note is None else history_note,
+            batch_id, created_at,
+        ))
+
+    with stock_tx() as conn:
+        cur = conn.cursor()
+        _apply_inventory_deltas(cur, deltas, now)
+        cur.executemany(_HISTORY_INSERT_SQL, history_rows)
+
+    return len(history_rows)
+
+
+# 출고 할당 정책 (후보 재고 정렬 기준)
+OUTBOUND_POLICIES = ("location", "fifo", "fewest")
+
+
+def _allocation_order(cands: List[Dict[str, Any]], qty: float, policy: str) -> List[Dict[str, Any]]:
+    """
+    - location: 브랜드 → 품번 → 로케이션 → LOT → 규격 순 (기존 엑셀 출고 순서 = query_inventory 순서)
+    - fifo: updated_at 오래된 순
+    - fewest: 한 곳에서 충당 가능하면 그중 가장 적은 재고 1곳, 아니면 수량 큰 순 (피킹 횟수 최소)
+    """
+    if policy == "fifo":
+        return sorted(cands, key=lambda c: (c["updated_at"], c["id"]))
+    if policy == "fewest":
+        single = [c for c in cands if c["remain"] >= qty]
+        if single:
+            return [min(single, key=lambda c: (c["remain"], c["location"], c["id"]))]
+        return sorted(cands, key=lambda c: (-c["remain"], c["location"], c["id"]))
+    return sorted(cands, key=lambda c: (c["brand"], c["item_code"], c["location"], c["lot"], c["spec"], c["id"]))
+
+
+_OUTBOUND_MATCH_COLS = ("warehouse", "location", "brand", "item_code", "lot", "spec")
+
+
+def bulk_outbound(
+    rows: List[Dict[str, Any]],
+    *,
+    operator: str = "",
+    batch_id: Optional[str] = None,
+    policy: str = "location",
+) -> Tuple[int, List[Tuple[int, str]]]:
+    """
+    출고 일괄 할당 / 반영 (엑셀 업로드용)
+    - rows: [{rownum, warehouse, location, brand, item_code, item_name, lot, spec, qty, note, created_at}]
+      값이 있는 키 컬럼만 정확히 일치하는 재고가 후보 (품번 / 로케이션 / LOT / 규격 중 하나 필수)
+    - 후보 재고: 시트 전체 품번 / 로케이션 기준 1회 조회 (품번·로케이션 없이 LOT / 규격만 있는 행이
+      있으면 LOT / 규격 기준 1회 추가) → 메모리에서 행 순서대로 할당 (policy)
+    - 재고 부족 행: 해당 행 전체 제외 (부분 차감 없음) → errors [(rownum, 사유)]
+    - 재고 차감 + 이력: 단일 트랜잭션
+    → (반영 행 수, errors)
+    """
+    if policy not in OUTBOUND_POLICIES:
+        raise ValueError(f"알 수 없는 할당 정책: {policy}")
+
+    now_dt = datetime.now()
+    now = now_dt.isoformat(timespec="seconds")
+    op = _norm(operator)
+
+    reqs = []
+    for r in rows:
+        req = {c: _norm(r.get(c)) for c in _OUTBOUND_MATCH_COLS}
+        req.update(
+            rownum=r.get("rownum"),
+            item_name=_norm(r.get("item_name")),
+            note=_norm(r.get("note")),
+            qty=_q3(r.get("qty")),
+            created_at=(r.get("created_at") or now_dt).isoformat(timespec="seconds"),
+        )
+        reqs.append(req)
+
+    codes = sorted({q["item_code"] for q in reqs if q["qty"] > 0 and q["item_code"]})
+    locs = sorted({q["location"] for q in reqs if q["qty"] > 0 and not q["item_code"] and q["location"]})
+    rest = [q for q in reqs if q["qty"] > 0 and not q["item_code"] and not q["location"]]
+    lots = sorted({q["lot"] for q in rest if q["lot"]})
+    specs = sorted({q["spec"] for q in rest if q["spec"]})
+
+    errors: List[Tuple[int, str]] = []
+    deltas: Dict[tuple, list] = {}
+    history_rows = []
+
+    with stock_tx() as conn:
+        cur = conn.cursor()
+
+        # 후보 재고 1회 조회 (쓰기 잠금 안에서 → 할당 중 재고 변동 없음)
+        cur.execute("""
+            SELECT * FROM inventory
+            WHERE qty > 0
+              AND (item_code IN (SELECT value FROM json_each(?))
+                   OR location IN (SELECT value FROM json_each(?)))
+        """, (json.dumps(codes, ensure_ascii=False), json.dumps(locs, ensure_ascii=False)))
+        found = {r["id"]: r for r in cur.fetchall()}
+
+        # LOT / 규격만 있는 행 (드묾, lot / spec 인덱스 없음 → 있을 때만 조회)
+        if lots or specs:
+            cur.execute("""
+                SELECT * FROM inventory
+                WHERE qty > 0
+                  AND (lot IN (SELECT value FROM json_each(?))
+                       OR spec IN (SELECT value FROM json_each(?)))
+            """, (json.dumps(lots, ensure_ascii=False), json.dumps(specs, ensure_ascii=False)))
+            found.update((r["id"], r) for r in cur.fetchall())
+
+        # 같은 재고 행은 한 dict 공유 (풀이 달라도 remain 일관)
+        by_code: Dict[str, List[Dict[str, Any]]] = {}
+        by_loc: Dict[str, List[Dict[str, Any]]] = {}
+        by_lot: Dict[str, List[Dict[str, Any]]] = {}
+        by_spec: Dict[str, List[Dict[str, Any]]] = {}
+        for r in found.values():
+            c = dict(r)
+            c["remain"] = _q3(c["qty"])
+            by_code.setdefault(c["item_code"], []).append(c)
+            by_loc.setdefault(c["location"], []).append(c)
+            by_lot.setdefault(c["lot"], []).append(c)
+            by_spec.setdefault(c["spec"], []).append(c)
+
+        for q in reqs:
+            qty = q["qty"]
+
+            if qty == 0:
+                # 재고 변화 없음 → 이력만
+                history_rows.append((
+                    "출고", q["warehouse"], op, q["brand"], q["item_code"], q["item_name"],
+                    q["lot"], q["spec"], q["location"], "", 0, q["note"],
+                    batch_id, q["created_at"],
+                ))
+                continue
+
+            if q["item_code"]:
+                pool = by_code.get(q["item_code"], [])
+            elif q["location"]:
+                pool = by_loc.get(q["location"], [])
+            elif q["lot"]:
+                pool = by_lot.get(q["lot"], [])
+            elif q["spec"]:
+                pool = by_spec.get(q["spec"], [])
+            else:
+                errors.append((q["rownum"], "품번 / 로케이션 / LOT / 규격 중 하나가 필요합니다."))
+                continue
+
+            cands = [
+                c for c in pool
+                if c["remain"] > 0 and all(not q[k] or c[k] == q[k] for k in _OUTBOUND_MATCH_COLS)
+            ]
+            if not cands:
+                errors.append((q["rownum"], "출고 가능한 재고가 없습니다."))
+                continue
+
+            available = _q3(sum(c["remain"] for c in cands))
+            if qty > available:
+                errors.append((q["rownum"], f"출고 수량({qty})이 재고({available})보다 많습니다."))
+                continue
+
+            remain = qty
+            for c in _allocation_order(cands, qty, policy):
+                if remain <= 0:
+                    break
+                take = _q3(min(c["remain"], remain))
+                c["remain"] = _q3(c["remain"] - take)
+                remain = _q3(remain - take)
+
+                key = _inventory_key(c)
+                d = deltas.get(key)
+                if d is None:
+                    deltas[key] = [-take, c["item_name"], q["note"]]
+                else:
+                    d[0] -= take
+                    d[2] = q["note"]
+
+                history_rows.append((
+                    "출고", c["warehouse"], op, c["brand"], c["item_code"], c["item_name"],
+                    c["lot"], c["spec"], c["location"], "", take, q["note"],
+                    batch_id, q["created_at"],
+                ))
+
+        _apply_inventory_deltas(cur, deltas, now)
+        cur.executemany(_HISTORY_INSERT_SQL, history_rows)
+
+    return len(reqs) - len(errors), errors
 
-    finally:
-        conn.close()
 
 # =====================================================
 # DAMAGE / CS
@@ -787,8 +1878,7 @@ def list_damage_codes(
     situation: str = "",
     active_only: bool = True,
 ):
-    conn = get_db()
-    try:
+    with db_conn() as conn:
         cur = conn.cursor()
         where, params = [], []
 
@@ -808,8 +1898,6 @@ def list_damage_codes(
 
         cur.execute(sql, params)
         return [dict(r) for r in cur.fetchall()]
-    finally:
-        conn.close()
 
 
 def add_damage_history(
@@ -817,8 +1905,7 @@ def add_damage_history(
     item_code, item_name, lot, spec,
     qty, damage_code_id, detail="", deduct_inventory=False
 ):
-    conn = get_db()
-    try:
+    with stock_tx() as conn:
         cur = conn.cursor()
         now = datetime.now().isoformat(timespec="seconds")
 
@@ -849,7 +1936,7 @@ def add_damage_history(
                   _norm(item_code), _norm(lot), _norm(spec)))
             r = cur.fetchone()
             if not r or float(r["qty"]) < qty:
-                raise ValueError("차감할 재고가 부족합니다.")
+                raise StockConflict("차감할 재고가 부족합니다.")
 
             remain = _q3(float(r["qty"]) - qty)
             if remain <= 0:
@@ -860,29 +1947,41 @@ def add_damage_history(
                     (remain, now, r["id"])
                 )
 
-        conn.commit()
-    finally:
-        conn.close()
+
+
+def _damage_where(year=None, month=None, start_date=None, end_date=None):
+    where, params = [], []
+
+    if year and month:
+        where.append("dh.occurred_at LIKE ?")
+        params.append(f"{int(year):04d}-{int(month):02d}%")
+    elif year:
+        where.append("dh.occurred_at LIKE ?")
+        params.append(f"{int(year):04d}%")
+
+    if start_date:
+        where.append("dh.occurred_at >= ?")
+        params.append(date.fromisoformat(start_date).isoformat())
+    if end_date:
+        where.append("dh.occurred_at < ?")
+        params.append(_next_day(end_date))
+
+    return where, params
+
+
+_DAMAGE_HISTORY_SQL = """
+    SELECT dh.*, dc.category, dc.type, dc.situation
+    FROM damage_history dh
+    JOIN damage_codes dc ON dh.damage_code_id = dc.id
+"""
 
 
 def query_damage_history(year=None, month=None, limit=500):
-    conn = get_db()
-    try:
+    with db_conn() as conn:
         cur = conn.cursor()
-        where, params = [], []
-
-        if year and month:
-            where.append("dh.occurred_at LIKE ?")
-            params.append(f"{int(year):04d}-{int(month):02d}%")
-        elif year:
-            where.append("dh.occurred_at LIKE ?")
-            params.append(f"{int(year):04d}%")
+        where, params = _damage_where(year, month)
 
-        sql = """
-            SELECT dh.*, dc.category, dc.type, dc.situation
-            FROM damage_history dh
-            JOIN damage_codes dc ON dh.damage_code_id = dc.id
-        """
+        sql = _DAMAGE_HISTORY_SQL
         if where:
             sql += " WHERE " + " AND ".join(where)
         sql += " ORDER BY dh.occurred_at DESC LIMIT ?"
@@ -890,22 +1989,24 @@ def query_damage_history(year=None, month=None, limit=500):
 
         cur.execute(sql, params)
         return [dict(r) for r in cur.fetchall()]
-    finally:
-        conn.close()
+
+
+def iter_damage_history(year=None, month=None, start_date=None, end_date=None):
+    """CS 이력 전체 스트리밍 (CSV 다운로드용, 행 수 제한 없음)"""
+    where, params = _damage_where(year, month, start_date, end_date)
+
+    sql = _DAMAGE_HISTORY_SQL
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY dh.occurred_at DESC"
+
+    return iter_query(sql, params)
 
 
 def query_damage_summary_by_category(year=None, month=None):
-    conn = get_db()
-    try:
+    with db_conn() as conn:
         cur = conn.cursor()
-        where, params = [], []
-
-        if year and month:
-            where.append("dh.occurred_at LIKE ?")
-            params.append(f"{int(year):04d}-{int(month):02d}%")
-        elif year:
-            where.append("dh.occurred_at LIKE ?")
-            params.append(f"{int(year):04d}%")
+        where, params = _damage_where(year, month)
 
         sql = """
             SELECT dc.category, COUNT(*) AS cnt
@@ -918,51 +2019,239 @@ def query_damage_summary_by_category(year=None, month=None):
 
         cur.execute(sql, params)
         return [dict(r) for r in cur.fetchall()]
-    finally:
-        conn.close()
 
 
 # =====================================================
 # HISTORY QUERY (PAGE / EXCEL 공용)
 # =====================================================
 
+def _prefix_range(prefix: str) -> Tuple[str, str]:
+    """LIKE 'prefix%' → created_at >= prefix AND created_at < 상한 (인덱스 범위 검색)"""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _history_where(
+    year: int | None = None,
+    month: int | None = None,
+    day: int | None = None,
+    start_date: str | None = None,
+    end_date: str | None = None,
+) -> Tuple[List[str], List[Any]]:
+    """
+    이력 기간 조건 (created_at 범위 → idx_history_created_at 사용)
+    - year / month / day: 해당 연 / 월 / 일
+    - start_date ~ end_date: YYYY-MM-DD, 양 끝 포함 (형식 오류: ValueError)
+    """
+    where, params = [], []
+
+    prefix = None
+    if year and month and day:
+        prefix = f"{year:04d}-{month:02d}-{day:02d}"
+    elif year and month:
+        prefix = f"{year:04d}-{month:02d}"
+    elif year:
+        prefix = f"{year:04d}"
+
+    if prefix:
+        where.append("created_at >= ? AND created_at < ?")
+        params.extend(_prefix_range(prefix))
+
+    if start_date:
+        where.append("created_at >= ?")
+        params.append(date.fromisoformat(start_date).isoformat())
+    if end_date:
+        where.append("created_at < ?")
+        params.append(_next_day(end_date))
+
+    return where, params
+
+
 def query_history(
     *,
     limit: int = 300,
     year: int | None = None,
     month: int | None = None,
     day: int | None = None,
+    after: Optional[Sequence[Any]] = None,
 ):
-    conn = get_db()
-    try:
+    """
+    이력 목록 (created_at DESC, id DESC)
+    - after: 이전 페이지 마지막 행의 (created_at, id) (키셋 페이지네이션)
+    """
+    with db_conn() as conn:
         cur = conn.cursor()
-        where, params = [], []
+        where, params = _history_where(year, month, day)
 
-        if year and month and day:
-            where.append("created_at LIKE ?")
-            params.append(f"{year:04d}-{month:02d}-{day:02d}%")
-        elif year and month:
-            where.append("created_at LIKE ?")
-            params.append(f"{year:04d}-{month:02d}%")
-        elif year:
-            where.append("created_at LIKE ?")
-            params.append(f"{year:04d}%")
+        if after is not None:
+            after_created, after_id = after
+            where.append("created_at <= ? AND (created_at < ? OR id < ?)")
+            params.extend([after_created, after_created, after_id])
 
         sql = "SELECT * FROM history"
         if where:
             sql += " WHERE " + " AND ".join(where)
 
-        sql += " ORDER BY created_at DESC LIMIT ?"
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
         params.append(limit)
 
         cur.execute(sql, params)
         return cur.fetchall()
-    finally:
-        conn.close()
 
 
+def iter_history(
+    *,
+    year: int | None = None,
+    month: int | None = None,
+    day: int | None = None,
+    start_date: str | None = None,
+    end_date: str | None = None,
+) -> Iterator[Dict[str, Any]]:
+    """이력 전체 스트리밍 (CSV 다운로드용, 행 수 제한 없음)"""
+    where, params = _history_where(year, month, day, start_date, end_date)
+
+    sql = "SELECT * FROM history"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY created_at DESC, id DESC"
+
+    return iter_query(sql, params)
+
+
+# =====================================================
+# INVENTORY AS-OF (일별 스냅샷 + 이후 변동분)
+# =====================================================
+
+_AS_OF_KEY_COLS = "warehouse, location, brand, item_code, item_name, lot, spec"
+
+
+def _history_legs_sql(where_clause: str) -> str:
+    """
+    이력 → (그룹키, 입고량, 출고량) 표준화
+    - 입고: 도착지(+) / 출고: 출발지(-) / 이동: 출발지(-) + 도착지(+)
+    - where_clause 는 4개 SELECT 에 반복 → 파라미터 4배
+    """
+    return f"""
+        -- 1. 입고 데이터 (IN)
+        SELECT
+            warehouse, to_location AS location, brand, item_code, item_name, lot, spec,
+            qty AS inbound_qty, 0 AS outbound_qty
+        FROM history
+        {where_clause} AND type IN ('입고', 'IN')
+
+        UNION ALL
+
+        -- 2. 출고 데이터 (OUT)
+        SELECT
+            warehouse, from_location AS location, brand, item_code, item_name, lot, spec,
+            0 AS inbound_qty, qty AS outbound_qty
+        FROM history
+        {where_clause} AND type IN ('출고', 'OUT')
+
+        UNION ALL
+
+        -- 3. 이동 데이터 - 출발지 (재고 감소)
+        SELECT
+            warehouse, from_location AS location, brand, item_code, item_name, lot, spec,
+            0 AS inbound_qty, qty AS outbound_qty
+        FROM history
+        {where_clause} AND type IN ('이동', 'MOVE')
+
+        UNION ALL
+
+        -- 4. 이동 데이터 - 도착지 (재고 증가)
+        SELECT
+            warehouse, to_location AS location, brand, item_code, item_name, lot, spec,
+            qty AS inbound_qty, 0 AS outbound_qty
+        FROM history
+        {where_clause} AND type IN ('이동', 'MOVE')
+    """
+
+
+def _next_day(d: str) -> str:
+    return (date.fromisoformat(d) + timedelta(days=1)).isoformat()
+
+
+def _inventory_as_of_replay(cur, as_of_date: str, keyword: str | None = None) -> List[Dict[str, Any]]:
+    """
+    전체 이력 재생 (키워드 검색용 / 스냅샷 검증 기준)
+    - created_at < 기준일+1 (문자열 비교 → idx_history_created 사용)
+    """
+    where_clause = "WHERE created_at < ?"
+    params: List[Any] = [_next_day(as_of_date)]
+
+    if keyword:
+        kw = f"%{keyword}%"
+        where_clause += """
+            AND (
+                warehouse LIKE ? OR from_location LIKE ? OR to_location LIKE ?
+                OR brand LIKE ? OR item_code LIKE ? OR item_name LIKE ?
+                OR lot LIKE ? OR spec LIKE ?
+            )
+        """
+        params.extend([kw] * 8)
+
+    cur.execute(f"""
+        SELECT
+            {_AS_OF_KEY_COLS},
+            ROUND(SUM(inbound_qty), 3) AS inbound_qty,   -- 입고 누계
+            ROUND(SUM(outbound_qty), 3) AS outbound_qty, -- 출고 누계
+            ROUND(SUM(inbound_qty) - SUM(outbound_qty), 3) AS current_qty -- 현재고
+        FROM ({_history_legs_sql(where_clause)})
+        GROUP BY {_AS_OF_KEY_COLS}
+        HAVING current_qty != 0
+        ORDER BY warehouse, location, item_code, brand, item_name, lot, spec
+    """, params * 4)
+    return [dict(r) for r in cur.fetchall()]
+
+
+def build_inventory_snapshot(snap_date: str | None = None) -> str:
+    """
+    snap_date(기본: 어제) 마감 스냅샷 생성 (이미 있으면 생략)
+    - 가장 가까운 이전 스냅샷 + 그 다음날 ~ snap_date 이력만 합산
+    - 오늘 이후 날짜는 마감 전이므로 어제로 보정
+    반환: 실제 스냅샷 날짜
+    """
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    snap_date = min(snap_date or yesterday, yesterday)
+
+    with stock_tx() as conn:
+        cur = conn.cursor()
+
+        cur.execute(
+            "SELECT MAX(snap_date) FROM inventory_snapshot_days WHERE snap_date <= ?",
+            (snap_date,),
+        )
+        base = cur.fetchone()[0]
+        if base == snap_date:
+            return snap_date
+
+        lo = _next_day(base) if base else ""
+        where_clause = "WHERE created_at >= ? AND created_at < ?"
+
+        cur.execute(f"""
+            INSERT INTO inventory_snapshot
+            (snap_date, {_AS_OF_KEY_COLS}, inbound_qty, outbound_qty)
+            SELECT
+                ?, {_AS_OF_KEY_COLS},
+                ROUND(SUM(inbound_qty), 3), ROUND(SUM(outbound_qty), 3)
+            FROM (
+                SELECT {_AS_OF_KEY_COLS}, inbound_qty, outbound_qty
+                FROM inventory_snapshot
+                WHERE snap_date = ?
+                UNION ALL
+                {_history_legs_sql(where_clause)}
+            )
+            GROUP BY {_AS_OF_KEY_COLS}
+        """, [snap_date, base or ""] + [lo, _next_day(snap_date)] * 4)
+
+        cur.execute(
+            "INSERT INTO inventory_snapshot_days (snap_date, built_at) VALUES (?, ?)",
+            (snap_date, datetime.now().isoformat(timespec="seconds")),
+        )
+
+    return snap_date
+
 
-        
 def query_inventory_as_of(
     *,
     as_of_date: str,
@@ -972,297 +2261,170 @@ def query_inventory_as_of(
     기준일(as_of_date) 기준 재고 현황
     - history 테이블의 입고, 출고, 이동 데이터를 모두 반영
     - 이동 데이터는 출발지(-)와 도착지(+)로 분리하여 계산
+    - 키워드 없음: 기준일 이전 마감 스냅샷 + 이후 변동분 (스냅샷은 첫 조회 시 생성)
+    - 키워드 있음: 이력 행 단위 필터라 스냅샷과 호환 불가 → 전체 재생
     """
-
-    conn = get_db()
     try:
-        cur = conn.cursor()
+        as_of_date = date.fromisoformat(_norm(as_of_date)).isoformat()
+    except ValueError:
+        return []
 
-        # 검색 필터 조건 설정
-        where_clause = "WHERE datetime(created_at) <= datetime(?)"
-        params = [f"{as_of_date} 23:59:59"]
+    if keyword:
+        with db_conn() as conn:
+            return _inventory_as_of_replay(conn.cursor(), as_of_date, keyword)
 
-        keyword_filter = ""
-        if keyword:
-            kw = f"%{keyword}%"
-            keyword_filter = """
-                AND (
-                    warehouse LIKE ? OR from_location LIKE ? OR to_location LIKE ? 
-                    OR brand LIKE ? OR item_code LIKE ? OR item_name LIKE ? 
-                    OR lot LIKE ? OR spec LIKE ?
-                )
-            """
-            params.extend([kw] * 8)
+    snap_date = build_inventory_snapshot(as_of_date)
 
-        # ✅ 핵심 로직: UNION ALL을 통해 입고/출고/이동을 표준화된 형태로 통합
-        sql = f"""
-        WITH expanded_history AS (
-            -- 1. 입고 데이터 (IN)
-            SELECT 
-                warehouse, to_location AS location, brand, item_code, item_name, lot, spec,
-                qty AS inbound_qty, 0 AS outbound_qty
-            FROM history 
-            {where_clause} AND type IN ('입고', 'IN') {keyword_filter}
-
-            UNION ALL
-
-            -- 2. 출고 데이터 (OUT)
-            SELECT 
-                warehouse, from_location AS location, brand, item_code, item_name, lot, spec,
-                0 AS inbound_qty, qty AS outbound_qty
-            FROM history 
-            {where_clause} AND type IN ('출고', 'OUT') {keyword_filter}
-
-            UNION ALL
-
-            -- 3. 이동 데이터 - 출발지 (재고 감소)
-            SELECT 
-                warehouse, from_location AS location, brand, item_code, item_name, lot, spec,
-                0 AS inbound_qty, qty AS outbound_qty
-            FROM history 
-            {where_clause} AND type IN ('이동', 'MOVE') {keyword_filter}
-
-            UNION ALL
-
-            -- 4. 이동 데이터 - 도착지 (재고 증가)
-            SELECT 
-                warehouse, to_location AS location, brand, item_code, item_name, lot, spec,
-                qty AS inbound_qty, 0 AS outbound_qty
-            FROM history 
-            {where_clause} AND type IN ('이동', 'MOVE') {keyword_filter}
-        )
-        SELECT
-            warehouse,
-            location,
-            brand,
-            item_code,
-            item_name,
-            lot,
-            spec,
-            SUM(inbound_qty) AS inbound_qty,   -- 입고 누계
-            SUM(outbound_qty) AS outbound_qty, -- 출고 누계
-            SUM(inbound_qty) - SUM(outbound_qty) AS current_qty -- 현재고
-        FROM expanded_history
-        GROUP BY 
-            warehouse, location, brand, item_code, item_name, lot, spec
-        HAVING current_qty != 0
-        ORDER BY 
-            warehouse, location, item_code
-        """
+    with db_conn() as conn:
+        cur = conn.cursor()
+        where_clause = "WHERE created_at >= ? AND created_at < ?"
+
+        cur.execute(f"""
+            SELECT
+                {_AS_OF_KEY_COLS},
+                ROUND(SUM(inbound_qty), 3) AS inbound_qty,
+                ROUND(SUM(outbound_qty), 3) AS outbound_qty,
+                ROUND(SUM(inbound_qty) - SUM(outbound_qty), 3) AS current_qty
+            FROM (
+                SELECT {_AS_OF_KEY_COLS}, inbound_qty, outbound_qty
+                FROM inventory_snapshot
+                WHERE snap_date = ?
+                UNION ALL
+                {_history_legs_sql(where_clause)}
+            )
+            GROUP BY {_AS_OF_KEY_COLS}
+            HAVING current_qty != 0
+            ORDER BY warehouse, location, item_code, brand, item_name, lot, spec
+        """, [snap_date] + [_next_day(snap_date), _next_day(as_of_date)] * 4)
 
-        # params가 4개의 SELECT문에 반복해서 들어가므로 4배로 확장
-        all_params = params * 4
-        cur.execute(sql, all_params)
-        
         return [dict(r) for r in cur.fetchall()]
 
-    finally:
-        conn.close()
 
+# =====================================================
+# ERP VERIFY (ERP 재고 ↔ WMS 재고 대조)
+# =====================================================
 
+# WMS 집계 캐시: (DB 경로, inventory_version) → CompareSide
+_wms_compare_cache: Optional[Tuple[Tuple[str, int], CompareSide]] = None
+_wms_compare_lock = threading.Lock()
 
 
+def inventory_version() -> int:
+    """inventory 변경 카운터 (트리거로 갱신)"""
+    with db_conn() as conn:
+        row = conn.execute("SELECT version FROM inventory_version WHERE id = 1").fetchone()
+        return int(row[0]) if row else 0
 
 
+def _wms_compare_side() -> CompareSide:
+    """
+    WMS 재고 (item_code, lot, spec) 합산 → 대조 입력
+    - inventory_version 이 그대로면 이전 집계 재사용 (재고 스캔 생략)
+    - 버전을 먼저 읽고 스캔 → 스캔 도중 쓰기가 있어도 다음 호출에서 다시 집계
+    """
+    global _wms_compare_cache
+    stamp = (str(DB_PATH), inventory_version())
+
+    with _wms_compare_lock:
+        cached = _wms_compare_cache
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        with db_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                SELECT item_code, lot, spec, SUM(qty) AS qty
+                FROM inventory
+                WHERE qty > 0
+                GROUP BY item_code, lot, spec
+                """
+            )
+            side = CompareSide([dict(r) for r in cur.fetchall()])
 
-# app/db.py 맨 아래에 추가
+        _wms_compare_cache = (stamp, side)
+        return side
 
-from app.utils.erp_verify import make_compare_key
 
 def get_inventory_compare_rows(erp_rows: list[dict]) -> dict:
     """
+    ERP 재고 ↔ WMS 재고 대조 (app.utils.erp_verify.compare_rows, NumPy 있으면 일괄 집계)
+    - WMS 쪽은 재고 변경이 없으면 캐시된 집계 / 전처리 결과 사용
     Returns:
       {
         "summary": {total, match, diff, wms_missing, erp_missing, rollup},
         "rows": [ {status, mode, item_code, lot, spec, erp_qty, wms_qty, diff, note} ... ]
       }
     """
-    # 1) WMS inventory (합산)
-    conn = get_db()
-    try:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT item_code, lot, spec, SUM(qty) AS qty
-            FROM inventory
-            WHERE qty > 0
-            GROUP BY item_code, lot, spec
-            """
-        )
-        wms_raw = [dict(r) for r in cur.fetchall()]
-    finally:
-        conn.close()
+    return compare_rows(erp_rows or [], _wms_compare_side())
 
-    key_types = ["L3", "L2_LOT", "L2_SPEC", "L1"]
-    erp_maps = {k: {} for k in key_types}
-    wms_maps = {k: {} for k in key_types}
-    erp_present: dict[str, set[str]] = {}
-    wms_present: dict[str, set[str]] = {}
-
-    def _add(maps, present, item_code: str, lot: str, spec: str, qty: float):
-        item_code = _norm(item_code)
-        lot = _norm(lot)
-        spec = _norm(spec)
-        if not item_code:
-            return
 
-        kt, key = make_compare_key(item_code, lot, spec)
-        maps[kt][key] = float(maps[kt].get(key, 0.0)) + float(qty)
-        present.setdefault(item_code, set()).add(kt)
-
-        # rollup들 추가
-        maps["L1"][(item_code,)] = float(maps["L1"].get((item_code,), 0.0)) + float(qty)
-        present.setdefault(item_code, set()).add("L1")
-
-        if lot:
-            maps["L2_LOT"][(item_code, lot)] = float(maps["L2_LOT"].get((item_code, lot), 0.0)) + float(qty)
-            present.setdefault(item_code, set()).add("L2_LOT")
-        if spec:
-            maps["L2_SPEC"][(item_code, spec)] = float(maps["L2_SPEC"].get((item_code, spec), 0.0)) + float(qty)
-            present.setdefault(item_code, set()).add("L2_SPEC")
-        if lot and spec:
-            maps["L3"][(item_code, lot, spec)] = float(maps["L3"].get((item_code, lot, spec), 0.0)) + float(qty)
-            present.setdefault(item_code, set()).add("L3")
-
-    for r in erp_rows or []:
-        _add(erp_maps, erp_present, r.get("item_code",""), r.get("lot",""), r.get("spec",""), float(r.get("qty") or 0))
-
-    for r in wms_raw or []:
-        _add(wms_maps, wms_present, r.get("item_code",""), r.get("lot",""), r.get("spec",""), float(r.get("qty") or 0))
-
-    all_codes = sorted(set(erp_present.keys()) | set(wms_present.keys()))
-
-    def choose_mode(code: str) -> str:
-        e = erp_present.get(code, set())
-        w = wms_present.get(code, set())
-        if "L3" in e and "L3" in w:
-            return "L3"
-        if "L2_LOT" in e and "L2_LOT" in w:
-            return "L2_LOT"
-        if "L2_SPEC" in e and "L2_SPEC" in w:
-            return "L2_SPEC"
-        return "L1"
-
-    summary = {"total": 0, "match": 0, "diff": 0, "wms_missing": 0, "erp_missing": 0, "rollup": 0}
-    out_rows = []
-
-    for code in all_codes:
-        mode = choose_mode(code)
-        e_types = erp_present.get(code, set())
-        w_types = wms_present.get(code, set())
-
-        did_rollup = (mode == "L1" and (e_types - {"L1"} or w_types - {"L1"}) and (e_types and w_types))
-
-        # 해당 code에 대한 key set 추출
-        def keys_for_code(m, mode_t):
-            return {k for k in m[mode_t].keys() if k and k[0] == code}
-
-        keys = keys_for_code(erp_maps, mode) | keys_for_code(wms_maps, mode)
-        if not keys:
-            continue
-
-        for key in sorted(keys):
-            erp_qty = float(erp_maps[mode].get(key, 0.0))
-            wms_qty = float(wms_maps[mode].get(key, 0.0))
-            diff = erp_qty - wms_qty
-
-            lot = ""
-            spec = ""
-            if mode == "L3":
-                _, lot, spec = key
-            elif mode == "L2_LOT":
-                _, lot = key
-            elif mode == "L2_SPEC":
-                _, spec = key
-
-            if erp_qty > 0 and wms_qty > 0:
-                if abs(diff) < 1e-9:
-                    status = "✅ 일치"; summary["match"] += 1
-                else:
-                    status = "⚠️ 차이"; summary["diff"] += 1
-            elif erp_qty > 0 and wms_qty == 0:
-                status = "❌ WMS 없음"; summary["wms_missing"] += 1
-            elif erp_qty == 0 and wms_qty > 0:
-                status = "❌ ERP 없음"; summary["erp_missing"] += 1
-            else:
-                status = "—"
+# =====================================================
+# 출고 통계 (연 / 월 / 일) - history_daily_rollup 기준
+# =====================================================
 
-            note = "관리단위(LOT/규격) 불일치로 품번 단위 합산 비교" if did_rollup else ""
-            if did_rollup:
-                summary["rollup"] += 1
+def _month_range(year: int, month: int) -> Tuple[str, str]:
+    start = date(int(year), int(month), 1)
+    end = date(start.year + (start.month == 12), start.month % 12 + 1, 1)
+    return start.isoformat(), end.isoformat()
 
-            out_rows.append({
-                "status": status, "mode": mode, "item_code": code,
-                "lot": lot, "spec": spec,
-                "erp_qty": round(erp_qty, 3), "wms_qty": round(wms_qty, 3),
-                "diff": round(diff, 3), "note": note
-            })
-            summary["total"] += 1
 
-    return {"summary": summary, "rows": out_rows}
-# =====================================================
-# 출고 통계 (연 / 월 / 일)
-# =====================================================
-from datetime import datetime
+def rebuild_history_daily_rollup() -> int:
+    """
+    history_daily_rollup 전체 재집계 (관리자 복구용)
+    반환: 집계 행 수
+    """
+    with stock_tx() as conn:
+        cur = conn.cursor()
+        _rebuild_history_daily_rollup(cur)
+        cur.execute("SELECT COUNT(*) FROM history_daily_rollup")
+        return int(cur.fetchone()[0])
 
 
 def query_outbound_summary(year: int, month: int):
     """
     출고 통계 (일자별)
-    - history 테이블 기준
+    - history_daily_rollup 기준
     - 출고 유형 모두 포함
     - MOVE 자동 제외
     """
 
-    conn = get_db()
-    try:
-        # ✅ dict 반환 보장
-        conn.row_factory = sqlite3.Row
+    with db_conn() as conn:
         cur = conn.cursor()
 
-        sql = """
-        SELECT
-            DATE(h.created_at) AS day,
-            SUM(h.qty) AS total_qty
-        FROM history h
-        WHERE
-            h.type IN ('OUT', 'OUTBOUND', 'CS_OUT')
-            AND strftime('%Y', h.created_at) = ?
-            AND strftime('%m', h.created_at) = ?
-        GROUP BY DATE(h.created_at)
-        ORDER BY day
-        """
-
-        cur.execute(sql, (str(year), f"{month:02d}"))
+        cur.execute("""
+            SELECT
+                day,
+                SUM(qty) AS total_qty
+            FROM history_daily_rollup
+            WHERE io_type = 'OUT'
+              AND day >= ? AND day < ?
+            GROUP BY day
+            ORDER BY day
+        """, _month_range(year, month))
         return [dict(r) for r in cur.fetchall()]
 
-    finally:
-        conn.close()
-
-
-
 
 def query_outbound_monthly_and_brand(*, year: int, month: int):
     """
     1️⃣ 월별 누적 출고
     2️⃣ 브랜드별 출고 집계
-    - history 기준
+    - history_daily_rollup 기준
     - 출고 유형만 포함
     """
 
-    conn = get_db()
-    try:
+    with db_conn() as conn:
         cur = conn.cursor()
+        day_from, day_to = _month_range(year, month)
 
         # 1️⃣ 월 누적 출고
         cur.execute("""
             SELECT
                 SUM(qty) AS total_qty
-            FROM history
-            WHERE type IN ('OUT', 'OUTBOUND', '출고', 'CS_OUT')
-              AND strftime('%Y', created_at) = ?
-              AND strftime('%m', created_at) = ?
-        """, (str(year), f"{month:02d}"))
+            FROM history_daily_rollup
+            WHERE io_type = 'OUT'
+              AND day >= ? AND day < ?
+        """, (day_from, day_to))
 
         monthly_total = cur.fetchone()["total_qty"] or 0
 
@@ -1271,13 +2433,12 @@ def query_outbound_monthly_and_brand(*, year: int, month: int):
             SELECT
                 brand,
                 SUM(qty) AS total_qty
-            FROM history
-            WHERE type IN ('OUT', 'OUTBOUND', '출고', 'CS_OUT')
-              AND strftime('%Y', created_at) = ?
-              AND strftime('%m', created_at) = ?
+            FROM history_daily_rollup
+            WHERE io_type = 'OUT'
+              AND day >= ? AND day < ?
             GROUP BY brand
             ORDER BY total_qty DESC
-        """, (str(year), f"{month:02d}"))
+        """, (day_from, day_to))
 
         brand_rows = [dict(r) for r in cur.fetchall()]
 
@@ -1286,50 +2447,30 @@ def query_outbound_monthly_and_brand(*, year: int, month: int):
             "by_brand": brand_rows,
         }
 
-    finally:
-        conn.close()
-
-
 
 # =========================================
-# 입·출고 통계 (실제 history.type 기준)
+# 입·출고 통계 (history_daily_rollup 기준)
 # =========================================
-import sqlite3
 
 def query_io_stats(start_date: str, end_date: str):
-    conn = get_db()
-    try:
-        conn.row_factory = sqlite3.Row
+    with db_conn() as conn:
         cur = conn.cursor()
 
         cur.execute(
             """
             SELECT
-                DATE(created_at) AS day,
-                CASE
-                    WHEN type IN ('IN', 'INBOUND', '입고') THEN 'IN'
-                    WHEN type IN ('OUT', 'OUTBOUND', '출고', 'CS_OUT') THEN 'OUT'
-                END AS io_type,
+                day,
+                io_type,
                 SUM(qty) AS total_qty
-            FROM history
-            WHERE created_at BETWEEN ? AND ?
-              AND type IN ('IN','INBOUND','입고','OUT','OUTBOUND','출고','CS_OUT')
+            FROM history_daily_rollup
+            WHERE day BETWEEN DATE(?) AND DATE(?)
             GROUP BY day, io_type
             ORDER BY day
             """,
-            (
-                f"{start_date} 00:00:00",
-                f"{end_date} 23:59:59",
-            ),
+            (start_date, end_date),
         )
 
         return [dict(r) for r in cur.fetchall()]
-    finally:
-        conn.close()
-
-
-
-
 
 
 # =========================
@@ -1342,52 +2483,48 @@ def query_io_group_stats(
     keyword: str = "",
     brand: str = "",
 ):
-    conn = get_db()
-    try:
-        conn.row_factory = sqlite3.Row
+    with db_conn() as conn:
         cur = conn.cursor()
 
         if group == "brand":
-            select_cols = "h.brand AS brand"
-            group_by = "h.brand"
+            select_cols = "r.brand AS brand"
+            group_by = "r.brand"
         elif group == "item":
             select_cols = """
-                h.brand AS brand,
-                h.item_code AS item_code,
-                h.item_name AS item_name,
-                h.spec AS spec
+                r.brand AS brand,
+                r.item_code AS item_code,
+                r.item_name AS item_name,
+                r.spec AS spec
             """
-            group_by = "h.brand, h.item_code, h.item_name, h.spec"
+            group_by = "r.brand, r.item_code, r.item_name, r.spec"
         else:
             raise ValueError("Invalid group type")
 
         where = []
         params = []
 
-        where.append("DATE(h.created_at) BETWEEN DATE(?) AND DATE(?)")
+        where.append("r.day BETWEEN DATE(?) AND DATE(?)")
         params.extend([start_date, end_date])
 
-        where.append("h.type IN ('IN','INBOUND','입고','OUT','OUTBOUND','출고','CS_OUT')")
-
         if brand:
-            where.append("h.brand = ?")
+            where.append("r.brand = ?")
             params.append(brand)
 
         if keyword:
             kw = f"%{keyword}%"
             where.append(
-                "(h.brand LIKE ? OR h.item_code LIKE ? OR h.item_name LIKE ? OR h.spec LIKE ?)"
+                "(r.brand LIKE ? OR r.item_code LIKE ? OR r.item_name LIKE ? OR r.spec LIKE ?)"
             )
             params.extend([kw, kw, kw, kw])
 
         sql = f"""
         SELECT
             {select_cols},
-            SUM(CASE WHEN h.type IN ('IN','INBOUND','입고') THEN h.qty ELSE 0 END) AS in_qty,
-            SUM(CASE WHEN h.type IN ('OUT','OUTBOUND','출고','CS_OUT') THEN h.qty ELSE 0 END) AS out_qty,
-            SUM(CASE WHEN h.type IN ('IN','INBOUND','입고') THEN h.qty ELSE 0 END)
-              - SUM(CASE WHEN h.type IN ('OUT','OUTBOUND','출고','CS_OUT') THEN h.qty ELSE 0 END) AS net_qty
-        FROM history h
+            SUM(CASE WHEN r.io_type = 'IN' THEN r.qty ELSE 0 END) AS in_qty,
+            SUM(CASE WHEN r.io_type = 'OUT' THEN r.qty ELSE 0 END) AS out_qty,
+            SUM(CASE WHEN r.io_type = 'IN' THEN r.qty ELSE 0 END)
+              - SUM(CASE WHEN r.io_type = 'OUT' THEN r.qty ELSE 0 END) AS net_qty
+        FROM history_daily_rollup r
         WHERE {" AND ".join(where)}
         GROUP BY {group_by}
         ORDER BY out_qty DESC, in_qty DESC
@@ -1395,13 +2532,248 @@ def query_io_group_stats(
 
         cur.execute(sql, params)
         return [dict(r) for r in cur.fetchall()]
-    finally:
-        conn.close()
 
 
+# =====================================================
+# JOBS (백그라운드 엑셀 처리 상태 / 행별 오류)
+# =====================================================
 
+def create_job(job_id: str, kind: str) -> None:
+    with db_conn() as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, kind, status, created_at) VALUES (?, ?, 'queued', ?)",
+            (job_id, kind, datetime.now().isoformat(timespec="seconds")),
+        )
 
 
+def start_job(job_id: str) -> None:
+    with db_conn() as conn:
+        conn.execute(
+            "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+            (datetime.now().isoformat(timespec="seconds"), job_id),
+        )
+
+
+def update_job_progress(
+    job_id: str,
+    processed: int,
+    failed: int,
+    errors: Sequence[Tuple[Optional[int], str]] = (),
+    total: Optional[int] = None,
+) -> None:
+    """진행 상황 + 누적된 행별 오류 (row, error) 기록"""
+    with db_conn() as conn:
+        conn.execute(
+            "UPDATE jobs SET processed = ?, failed = ?, total = COALESCE(?, total) WHERE id = ?",
+            (processed, failed, total, job_id),
+        )
+        if errors:
+            conn.executemany(
+                "INSERT INTO job_errors (job_id, row, error) VALUES (?, ?, ?)",
+                [(job_id, row, err) for row, err in errors],
+            )
+
 
+def finish_job(job_id: str, status: str, result: str | None = None, error: str | None = None) -> None:
+    with db_conn() as conn:
+        conn.execute(
+            """
+            UPDATE jobs
+            SET status = ?, result = ?, error = ?, finished_at = ?
+            WHERE id = ?
+            """,
+            (status, result, error, datetime.now().isoformat(timespec="seconds"), job_id),
+        )
 
 
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    with db_conn() as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+
+def query_job_errors(job_id: str, limit: int = 200, offset: int = 0) -> List[Dict[str, Any]]:
+    with db_conn() as conn:
+        cur = conn.execute(
+            """
+            SELECT row, error FROM job_errors
+            WHERE job_id = ?
+            ORDER BY id
+            LIMIT ? OFFSET ?
+            """,
+            (job_id, limit, offset),
+        )
+        return [dict(r) for r in cur.fetchall()]
+
+
+# =====================================================
+# UPLOAD REGISTRY (동일 파일 재업로드 방지)
+# =====================================================
+
+def claim_upload(
+    *,
+    kind: str,
+    sha256: str,
+    filename: str,
+    size: int,
+    job_id: str,
+    batch_id: str,
+    reimport: bool = False,
+) -> Optional[Dict[str, Any]]:
+    """
+    파일 해시 등록 (BEGIN IMMEDIATE 로 동시 업로드 직렬화)
+    - 같은 kind + sha256 이 이미 있고 그 작업이 실패하지 않았으면: 기존 등록 행 반환 (반영 안 함)
+    - 처음이거나, 이전 작업 실패, 또는 reimport: 새 job_id / batch_id 로 등록 후 None
+    """
+    with stock_tx() as conn:
+        prev = conn.execute(
+            """
+            SELECT u.*, j.status
+            FROM uploads u
+            LEFT JOIN jobs j ON j.id = u.job_id
+            WHERE u.kind = ? AND u.sha256 = ?
+            """,
+            (kind, sha256),
+        ).fetchone()
+
+        if prev is not None and not reimport and prev["status"] != "failed":
+            return dict(prev)
+
+        conn.execute(
+            """
+            INSERT INTO uploads (kind, sha256, filename, size, job_id, batch_id, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (kind, sha256) DO UPDATE SET
+                filename = excluded.filename,
+                size = excluded.size,
+                job_id = excluded.job_id,
+                batch_id = excluded.batch_id,
+                created_at = excluded.created_at
+            """,
+            (kind, sha256, filename, size, job_id, batch_id,
+             datetime.now().isoformat(timespec="seconds")),
+        )
+        return None
+
+
+# =====================================================
+# ERP VERIFY SESSIONS (검증 결과 서버 보관)
+# - 결과 행은 verify_id 로 조회 / 필터 / 다운로드 (클라이언트 왕복 없음)
+# - kind: match / diff / wms_missing / erp_missing / none (필터용)
+# =====================================================
+
+_ERP_VERIFY_COLUMNS = (
+    "seq, kind, status, mode, item_code, lot, spec, erp_qty, wms_qty, diff, note"
+)
+
+
+def _erp_verify_kind_clause(kinds: Optional[Sequence[str]]) -> Tuple[str, List[Any]]:
+    if not kinds:
+        return "", []
+    return f" AND kind IN ({','.join('?' * len(kinds))})", list(kinds)
+
+
+def save_erp_verify(
+    verify_id: str,
+    result: Dict[str, Any],
+    kinds: Sequence[str],
+    *,
+    filename: str = "",
+    ttl_hours: float = 24,
+) -> str:
+    """
+    검증 결과 저장 (만료된 이전 결과 정리 포함)
+    kinds: result["rows"] 와 같은 순서의 행별 kind
+    반환: expires_at
+    """
+    now = datetime.now()
+    created_at = now.isoformat(timespec="seconds")
+    expires_at = (now + timedelta(hours=ttl_hours)).isoformat(timespec="seconds")
+
+    with db_conn() as conn:
+        conn.execute("DELETE FROM erp_verify_sessions WHERE expires_at < ?", (created_at,))
+        conn.execute(
+            """
+            INSERT INTO erp_verify_sessions (id, filename, summary, created_at, expires_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (verify_id, filename, json.dumps(result["summary"], ensure_ascii=False),
+             created_at, expires_at),
+        )
+        conn.executemany(
+            f"""
+            INSERT INTO erp_verify_rows (verify_id, {_ERP_VERIFY_COLUMNS})
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                (verify_id, seq, kind, r["status"], r["mode"], r["item_code"], r["lot"],
+                 r["spec"], r["erp_qty"], r["wms_qty"], r["diff"], r["note"])
+                for seq, (r, kind) in enumerate(zip(result["rows"], kinds), start=1)
+            ),
+        )
+    return expires_at
+
+
+def get_erp_verify(verify_id: str) -> Optional[Dict[str, Any]]:
+    """검증 결과 헤더 (summary 포함), 없거나 만료: None"""
+    with db_conn() as conn:
+        row = conn.execute(
+            "SELECT * FROM erp_verify_sessions WHERE id = ? AND expires_at >= ?",
+            (verify_id, datetime.now().isoformat(timespec="seconds")),
+        ).fetchone()
+    if row is None:
+        return None
+    session = dict(row)
+    session["summary"] = json.loads(session["summary"])
+    return session
+
+
+def query_erp_verify_rows(
+    verify_id: str,
+    kinds: Optional[Sequence[str]] = None,
+    *,
+    limit: int = 500,
+    after: Optional[Sequence[Any]] = None,
+) -> List[Dict[str, Any]]:
+    """검증 결과 한 페이지 (seq 키셋, kinds: 필터 / None = 전체)"""
+    kind_sql, params = _erp_verify_kind_clause(kinds)
+    after_sql = ""
+    if after:
+        after_sql = " AND seq > ?"
+        params.append(int(after[0]))
+
+    with db_conn() as conn:
+        cur = conn.execute(
+            f"""
+            SELECT {_ERP_VERIFY_COLUMNS} FROM erp_verify_rows
+            WHERE verify_id = ?{kind_sql}{after_sql}
+            ORDER BY seq
+            LIMIT ?
+            """,
+            [verify_id, *params, limit],
+        )
+        return [dict(r) for r in cur.fetchall()]
+
+
+def create_erp_verify(erp_rows: list[dict], *, filename: str = "") -> Dict[str, Any]:
+    """ERP 행 대조 → 결과 저장 → {verify_id, summary, expires_at}"""
+    result = get_inventory_compare_rows(erp_rows)
+    verify_id = uuid.uuid4().hex
+    expires_at = save_erp_verify(
+        verify_id, result, [row_kind(r) for r in result["rows"]],
+        filename=filename, ttl_hours=ERP_VERIFY_TTL_HOURS,
+    )
+    return {"verify_id": verify_id, "summary": result["summary"], "expires_at": expires_at}
+
+
+def iter_erp_verify_rows(verify_id: str, kinds: Optional[Sequence[str]] = None) -> Iterator[Dict[str, Any]]:
+    """검증 결과 전체 스트리밍 (다운로드용)"""
+    kind_sql, params = _erp_verify_kind_clause(kinds)
+    return iter_query(
+        f"""
+        SELECT {_ERP_VERIFY_COLUMNS} FROM erp_verify_rows
+        WHERE verify_id = ?{kind_sql}
+        ORDER BY seq
+        """,
+        [verify_id, *params],
+    )
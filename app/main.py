@@ -139,6 +139,7 @@ from app.routers.api_damage import router as api_damage_router
 from app.routers.api_damage_codes import router as api_damage_codes_router
 from app.routers.excel_inbound import router as api_excel_inbound_router
 from app.routers.excel_outbound import router as api_excel_outbound_router
+from app.routers.api_jobs import router as api_jobs_router
 from app.routers.api_labels import router as api_labels_router
 from app.routers.api_admin import router as api_admin_router
 from app.routers.api_rollback import router as api_rollback_router
@@ -156,6 +157,7 @@ app.include_router(api_damage_router)
 app.include_router(api_damage_codes_router)
 app.include_router(api_excel_inbound_router)
 app.include_router(api_excel_outbound_router)
+app.include_router(api_jobs_router)
 app.include_router(api_labels_router)
 app.include_router(api_admin_router)
 app.include_router(api_rollback_router)
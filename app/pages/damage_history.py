@@ -1,14 +1,32 @@
-from fastapi import APIRouter, Request
-from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 
 from app.core.paths import TEMPLATES_DIR
-from app.db import query_damage_history, query_damage_summary_by_category
-from app.utils.excel_export import rows_to_xlsx_bytes
+from app.db import iter_damage_history, query_damage_history, query_damage_summary_by_category
+from app.utils.csv_export import csv_response
+from app.utils.excel_export import xlsx_response
 
 router = APIRouter(prefix="/page/damage-history", tags=["page-damage-history"])
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
 
+# 엑셀 / CSV 다운로드 공용 컬럼
+COLUMNS = [
+    ("occurred_at", "발생일"),
+    ("warehouse", "창고"),
+    ("location", "로케이션"),
+    ("brand", "브랜드"),
+    ("item_code", "품번"),
+    ("item_name", "품명"),
+    ("lot", "LOT"),
+    ("spec", "규격"),
+    ("qty", "수량"),
+    ("category", "대분류"),
+    ("type", "유형"),
+    ("situation", "상황"),
+    ("detail", "상세내용"),
+]
+
 
 def _to_int(v: str | None):
     if not v:
@@ -47,28 +65,28 @@ def page(
 def download_excel():
     rows = query_damage_history(limit=5000)
 
-    columns = [
-        ("occurred_at", "발생일"),
-        ("warehouse", "창고"),
-        ("location", "로케이션"),
-        ("brand", "브랜드"),
-        ("item_code", "품번"),
-        ("item_name", "품명"),
-        ("lot", "LOT"),
-        ("spec", "규격"),
-        ("qty", "수량"),
-        ("category", "대분류"),
-        ("type", "유형"),
-        ("situation", "상황"),
-        ("detail", "상세내용"),
-    ]
+    return xlsx_response(rows, COLUMNS, filename="cs_history.xlsx", sheet_name="CS현황")
 
-    data = rows_to_xlsx_bytes(rows, columns, sheet_name="CS현황")
 
-    return StreamingResponse(
-        iter([data]),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": 'attachment; filename="cs_history.xlsx"'
-        },
-    )
+@router.get("/csv")
+def download_csv(
+    year: str | None = None,
+    month: str | None = None,
+    start_date: str | None = None,
+    end_date: str | None = None,
+):
+    """
+    CS 이력 CSV 다운로드 (UTF-8 BOM, 행 수 제한 없음)
+    - year / month 또는 start_date ~ end_date (YYYY-MM-DD, 양 끝 포함)
+    """
+    try:
+        rows = iter_damage_history(
+            year=_to_int(year),
+            month=_to_int(month),
+            start_date=start_date,
+            end_date=end_date,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="날짜 형식은 YYYY-MM-DD 입니다.")
+
+    return csv_response(rows, COLUMNS, filename="cs_history.csv")
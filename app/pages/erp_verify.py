@@ -5,21 +5,60 @@ from fastapi.templating import Jinja2Templates
 
 from app.core.paths import TEMPLATES_DIR
 from app.core.auth import require_login
-from app.utils.erp_verify import parse_erp_excel_bytes
-from app.db import get_inventory_compare_rows
+from app.utils.cursor import ERP_VERIFY_CURSOR_KEYS, decode_cursor, next_cursor
+from app.utils.erp_verify import VERIFY_FILTERS, parse_erp_excel
+from app.db import create_erp_verify, get_erp_verify, query_erp_verify_rows
 
 router = APIRouter(prefix="/page/erp-verify", tags=["page-erp-verify"])
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
 
+PAGE_SIZE = 500
+
 
 @router.get("", response_class=HTMLResponse)
-def erp_verify_page(request: Request):
+def erp_verify_page(
+    request: Request,
+    verify_id: str = "",
+    filter: str = "all",
+    cursor: str = "",
+):
+    """
+    verify_id 가 있으면 저장된 검증 결과 표시 (필터 / 다음 페이지)
+    """
     try:
         require_login(request)
     except:
         return RedirectResponse("/login", status_code=303)
 
-    return templates.TemplateResponse("erp_verify.html", {"request": request})
+    if not verify_id:
+        return templates.TemplateResponse("erp_verify.html", {"request": request})
+
+    session = get_erp_verify(verify_id)
+    if session is None:
+        return templates.TemplateResponse(
+            "erp_verify.html",
+            {"request": request, "error": "검증 결과가 없거나 만료되었습니다. 다시 검증해 주세요."},
+        )
+
+    if filter not in VERIFY_FILTERS:
+        filter = "all"
+    try:
+        after = decode_cursor(cursor, len(ERP_VERIFY_CURSOR_KEYS))
+    except ValueError:
+        after = None
+
+    rows = query_erp_verify_rows(verify_id, VERIFY_FILTERS[filter], limit=PAGE_SIZE, after=after)
+    return templates.TemplateResponse(
+        "erp_verify.html",
+        {
+            "request": request,
+            "result": {"summary": session["summary"], "rows": rows},
+            "verify_id": verify_id,
+            "expires_at": session["expires_at"],
+            "filter": filter,
+            "next_cursor": next_cursor(rows, PAGE_SIZE, ERP_VERIFY_CURSOR_KEYS),
+        },
+    )
 
 
 @router.post("", response_class=HTMLResponse)
@@ -29,11 +68,11 @@ async def erp_verify_run(request: Request, file: UploadFile = File(...)):
     except:
         return RedirectResponse("/login", status_code=303)
 
-    data = await file.read()
     try:
-        erp_rows = parse_erp_excel_bytes(data)
+        erp_rows = parse_erp_excel(file.file)
     except ValueError as e:
         return templates.TemplateResponse("erp_verify.html", {"request": request, "error": str(e)})
 
-    result = get_inventory_compare_rows(erp_rows)
-    return templates.TemplateResponse("erp_verify.html", {"request": request, "result": result})
+    # 결과는 서버에 보관 → 조회 페이지로 이동 (새로고침 시 재검증 없음)
+    created = create_erp_verify(erp_rows, filename=file.filename)
+    return RedirectResponse(f"/page/erp-verify?verify_id={created['verify_id']}", status_code=303)
@@ -6,6 +6,7 @@ from app.core.paths import TEMPLATES_DIR
 from app.db import query_history
 from app.core.qty import display_qty
 from app.utils.excel_export import rows_to_xlsx_bytes
+from app.utils.cursor import HISTORY_CURSOR_KEYS, decode_cursor, next_cursor
 
 router = APIRouter(prefix="/page/history", tags=["page-history"])
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
@@ -57,12 +58,19 @@ def page(
     month: str | None = None,
     day: str | None = None,
     limit: int = 300,
+    cursor: str = "",
 ):
+    try:
+        after = decode_cursor(cursor, len(HISTORY_CURSOR_KEYS))
+    except ValueError:
+        after = None
+
     rows = query_history(
         limit=limit,
         year=_to_int(year),
         month=_to_int(month),
         day=_to_int(day),
+        after=after,
     )
 
     return templates.TemplateResponse(
@@ -74,5 +82,6 @@ def page(
             "month": month or "",
             "day": day or "",
             "limit": limit,
+            "next_cursor": next_cursor(rows, limit, HISTORY_CURSOR_KEYS),
         },
     )
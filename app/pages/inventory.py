@@ -1,32 +1,50 @@
 from fastapi import APIRouter, Request
-from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 
 from app.core.paths import TEMPLATES_DIR
-from app.db import query_inventory, query_inventory_smart
+from app.db import iter_inventory, query_inventory, query_inventory_smart
 from app.core.qty import display_qty
-from app.utils.excel_export import rows_to_xlsx_bytes
+from app.utils.csv_export import csv_response
+from app.utils.cursor import INVENTORY_CURSOR_KEYS, decode_cursor, iter_pages, next_cursor
+from app.utils.excel_export import xlsx_response
 
 router = APIRouter(prefix="/page/inventory", tags=["page-inventory"])
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
 
+# 엑셀 / CSV 다운로드 공용 컬럼
+COLUMNS = [
+    ("warehouse", "창고"),
+    ("location", "로케이션"),
+    ("brand", "브랜드"),
+    ("item_code", "품번"),
+    ("item_name", "품명"),
+    ("lot", "LOT"),
+    ("spec", "규격"),
+    ("qty", "수량"),
+    ("note", "비고"),
+    ("updated_at", "수정일시"),
+]
+
+
+def _format_row(r):
+    d = dict(r)
+    d["qty"] = display_qty(d.get("qty"))
+    return d
+
 
 def _format_rows(rows):
     """
     화면/엑셀 공용 수량 표시 포맷 적용
     """
-    view_rows = []
-    for r in rows:
-        d = dict(r)
-        d["qty"] = display_qty(d.get("qty"))
-        view_rows.append(d)
-    return view_rows
+    return [_format_row(r) for r in rows]
 
 
 # =====================================================
 # 📄 재고현황 페이지 (PC / 모바일 공용)
 # - v1.6: 다중 필드 검색
 # - v1.7: q 한 줄 통합 검색 추가
+# - limit 건 초과 시 키셋 커서로 다음 페이지 (잘림 없음)
 # =====================================================
 @router.get("", response_class=HTMLResponse)
 def page(
@@ -38,10 +56,20 @@ def page(
     item_code: str = "",
     lot: str = "",
     spec: str = "",
+    limit: int = 5000,
+    cursor: str = "",
 ):
+    try:
+        after = decode_cursor(cursor, len(INVENTORY_CURSOR_KEYS))
+    except ValueError:
+        after = None
+
     # ✅ 우선순위: 통합 검색 q → 기존 검색
     if q:
-        rows = query_inventory_smart(q=q, limit=5000)
+        rows = query_inventory_smart(q=q, limit=limit, after=after)
+        if after is None and len(rows) >= limit:
+            # 한 페이지 초과: 관련도 순으로는 이어 볼 수 없으므로 키 순서로 다시 조회
+            rows = query_inventory_smart(q=q, limit=limit, ranked=False)
     else:
         rows = query_inventory(
             warehouse=warehouse,
@@ -50,7 +78,8 @@ def page(
             item_code=item_code,
             lot=lot,
             spec=spec,
-            limit=5000,
+            limit=limit,
+            after=after,
         )
 
     view_rows = _format_rows(rows)
@@ -67,6 +96,8 @@ def page(
             "item_code": item_code,
             "lot": lot,
             "spec": spec,
+            "limit": limit,
+            "next_cursor": next_cursor(rows, limit, INVENTORY_CURSOR_KEYS),
         },
     )
 
@@ -86,45 +117,54 @@ def download_excel(
     lot: str = "",
     spec: str = "",
 ):
-    # ✅ 화면과 동일 로직
+    # ✅ 화면과 동일 조건 (전체 행, 키셋 페이지 단위 조회 → 스트리밍)
     if q:
-        rows = query_inventory_smart(q=q, limit=10000)
+        def fetch(after, size):
+            return query_inventory_smart(q=q, limit=size, ranked=False, after=after)
     else:
-        rows = query_inventory(
-            warehouse=warehouse,
-            location=location,
-            brand=brand,
-            item_code=item_code,
-            lot=lot,
-            spec=spec,
-            limit=10000,
-        )
-
-    view_rows = _format_rows(rows)
+        def fetch(after, size):
+            return query_inventory(
+                warehouse=warehouse,
+                location=location,
+                brand=brand,
+                item_code=item_code,
+                lot=lot,
+                spec=spec,
+                limit=size,
+                after=after,
+            )
 
-    columns = [
-        ("warehouse", "창고"),
-        ("location", "로케이션"),
-        ("brand", "브랜드"),
-        ("item_code", "품번"),
-        ("item_name", "품명"),
-        ("lot", "LOT"),
-        ("spec", "규격"),
-        ("qty", "수량"),
-        ("note", "비고"),
-        ("updated_at", "수정일시"),
-    ]
-
-    data = rows_to_xlsx_bytes(
-        view_rows,
-        columns,
-        sheet_name="재고현황",
+    view_rows = (
+        _format_row(r) for r in iter_pages(fetch, INVENTORY_CURSOR_KEYS)
     )
 
-    return StreamingResponse(
-        iter([data]),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": 'attachment; filename="inventory.xlsx"'
-        },
+    return xlsx_response(view_rows, COLUMNS, filename="inventory.xlsx", sheet_name="재고현황")
+
+
+# =====================================================
+# 📥 재고현황 CSV 다운로드
+# - 화면과 동일 조건, 행 수 제한 없음
+# - DB 커서 fetchmany 단위 스트리밍 (UTF-8 BOM)
+# =====================================================
+@router.get("/csv")
+def download_csv(
+    q: str = "",
+    warehouse: str = "",
+    location: str = "",
+    brand: str = "",
+    item_code: str = "",
+    lot: str = "",
+    spec: str = "",
+):
+    rows = iter_inventory(
+        q=q,
+        warehouse=warehouse,
+        location=location,
+        brand=brand,
+        item_code=item_code,
+        lot=lot,
+        spec=spec,
     )
+    view_rows = (_format_row(r) for r in rows)
+
+    return csv_response(view_rows, COLUMNS, filename="inventory.csv")
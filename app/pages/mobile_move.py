@@ -6,8 +6,9 @@ from fastapi import APIRouter, Form, Request, HTTPException, Query
 from fastapi.responses import RedirectResponse, HTMLResponse
 from fastapi.templating import Jinja2Templates
 
+from app.core import idempotency
 from app.core.paths import TEMPLATES_DIR
-from app.db import query_inventory, upsert_inventory, add_history
+from app.db import StockConflict, get_inventory_by_id, query_inventory, stock_move_by_id
 from app.utils.qr_format import extract_location_only
 
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
@@ -43,9 +44,9 @@ def from_scan(request: Request):
 def from_submit(request: Request, qrtext: str = Form(...)):
     from_location = extract_location_only(qrtext)
 
-    # 이동 프로세스 시작 시 토큰/사용토큰 초기화(선택)
+    # 이동 프로세스 시작 시 토큰 초기화 (구버전 사용토큰 목록도 정리 → 쿠키 축소)
     request.session.pop("move_token", None)
-    request.session.setdefault("used_move_tokens", [])
+    request.session.pop("used_move_tokens", None)
 
     return RedirectResponse(
         url=f"/m/move/select?from_location={from_location}",
@@ -58,7 +59,7 @@ def from_submit(request: Request, qrtext: str = Form(...)):
 # =====================================================
 @router.get("/select", response_class=HTMLResponse)
 def select_item(request: Request, from_location: str):
-    rows = query_inventory(location=from_location)
+    rows = query_inventory(location=from_location, match="exact")
     rows = [r for r in rows if float(r.get("qty", 0) or 0) > 0]
 
     return templates.TemplateResponse(
@@ -88,23 +89,22 @@ def select_submit(
     if qty <= 0:
         raise HTTPException(400, "수량은 0보다 커야 합니다")
 
-    # 재고 재확인 (id 필터는 query_inventory가 지원 안하므로 location에서 찾기)
-    rows = query_inventory(location=from_location)
-    row = next((r for r in rows if int(r.get("id", 0)) == int(inventory_id)), None)
+    # 재고 재확인 (PK 조회)
+    row = get_inventory_by_id(inventory_id)
 
-    if not row:
+    if not row or row["location"] != from_location:
         raise HTTPException(404, "재고를 찾을 수 없습니다")
 
     available = float(row.get("qty", 0) or 0)
     if qty > available:
         raise HTTPException(400, f"수량이 재고({available})를 초과했습니다")
 
-    # ✅ 1회용 토큰 생성 후 세션 저장
-    token = str(uuid.uuid4())
+    # ✅ 1회용 토큰 생성 후 세션 저장 (사용 여부는 서버 저장소에서 관리)
+    token = uuid.uuid4().hex
     request.session["move_token"] = token
-    request.session.setdefault("used_move_tokens", [])
 
     params = {
+        "inventory_id": row["id"],
         "warehouse": row.get("warehouse", ""),
         "from_location": from_location,
         "brand": row.get("brand", ""),
@@ -127,6 +127,7 @@ def select_submit(
 @router.get("/to", response_class=HTMLResponse)
 def to_scan(
     request: Request,
+    inventory_id: int,
     warehouse: str,
     from_location: str,
     brand: str,
@@ -140,6 +141,7 @@ def to_scan(
     note: Optional[str] = Query(""),
 ):
     hidden = {
+        "inventory_id": str(inventory_id),
         "warehouse": warehouse,
         "from_location": from_location,
         "brand": brand,
@@ -172,15 +174,10 @@ def to_scan(
 def to_submit(
     request: Request,
     qrtext: str = Form(...),
-    warehouse: str = Form(...),
+    inventory_id: int = Form(...),
     from_location: str = Form(...),
-    brand: str = Form(...),
-    item_code: str = Form(...),
-    item_name: str = Form(...),
     qty: float = Form(...),
     token: str = Form(...),
-    lot: str = Form(""),
-    spec: str = Form(""),
     operator: str = Form(""),
     note: str = Form(""),
 ):
@@ -189,56 +186,38 @@ def to_submit(
     if from_location == to_location:
         raise HTTPException(400, "출발지와 도착지가 동일합니다")
 
-    # ✅ 세션 토큰 검증
-    session_token = request.session.get("move_token")
-    used_tokens = request.session.get("used_move_tokens", [])
+    # ✅ 토큰 검증 (서버 저장소: 이미 처리 / 처리 중이면 차단)
+    key = f"move:{token}"
+    state, _ = idempotency.store.begin(key)
+    if state != "new":
+        raise HTTPException(409, "이미 처리된 이동입니다(중복 요청 차단)")
 
-    if not session_token or session_token != token:
+    if request.session.get("move_token") != token:
+        idempotency.store.release(key)
         raise HTTPException(409, "유효하지 않은 이동 세션(토큰)입니다. 처음부터 다시 진행하세요.")
 
-    if token in used_tokens:
-        # 이미 처리됨 → 중복 실행 차단
-        raise HTTPException(409, "이미 처리된 이동입니다(중복 요청 차단)")
-
-    # 출발지 재고 재확인(안전)
-    rows = query_inventory(
-        warehouse=warehouse,
-        location=from_location,
-        brand=brand,
-        item_code=item_code,
-        lot=lot,
-        spec=spec,
-    )
-    available = float(rows[0].get("qty", 0) or 0) if rows else 0.0
-    if qty <= 0 or qty > available:
-        raise HTTPException(400, f"출발지 재고 부족(현재 {available})")
-
-    # ✅ 이동 실행
-    clean_lot = (lot or "").strip()
-    clean_spec = (spec or "").strip()
-
-    upsert_inventory(warehouse, from_location, brand, item_code, item_name, clean_lot, clean_spec, -qty)
-    upsert_inventory(warehouse, to_location, brand, item_code, item_name, clean_lot, clean_spec, qty)
-
-    add_history(
-        "이동",
-        warehouse,
-        operator,
-        brand,
-        item_code,
-        item_name,
-        clean_lot,
-        clean_spec,
-        from_location,
-        to_location,
-        qty,
-        note,
-    )
+    # ✅ 이동 실행 (id 로 출발 재고 잠금 조회 + 차감 + 도착지 가산 + 이력 = 단일 트랜잭션)
+    try:
+        stock_move_by_id(
+            inventory_id=inventory_id,
+            from_location=from_location,
+            to_location=to_location,
+            qty=qty,
+            operator=operator,
+            note=note,
+        )
+    except BaseException as e:
+        idempotency.store.release(key)   # 실패 → 같은 토큰으로 재시도 허용
+        if isinstance(e, StockConflict):
+            raise HTTPException(409, str(e))
+        if isinstance(e, ValueError):
+            raise HTTPException(400, str(e))
+        raise
 
     # ✅ 토큰 사용 처리 (이제 재전송해도 막힘)
-    used_tokens.append(token)
-    request.session["used_move_tokens"] = used_tokens
+    idempotency.store.complete(key)
     request.session.pop("move_token", None)
+    request.session.pop("used_move_tokens", None)
 
     return templates.TemplateResponse(
         "m/move_done.html",
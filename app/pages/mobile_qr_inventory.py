@@ -27,7 +27,7 @@ def by_location(
     location_norm = extract_location_only(location)
 
     # 🔍 재고 조회
-    rows = query_inventory(location=location_norm)
+    rows = query_inventory(location=location_norm, match="exact")
 
     return templates.TemplateResponse(
         "m/qr_inventory.html",
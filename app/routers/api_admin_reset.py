@@ -3,7 +3,7 @@
 from fastapi import APIRouter, Form, HTTPException
 from datetime import datetime
 
-from app.db import get_db
+from app.db import db_conn, rebuild_history_daily_rollup
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
@@ -25,24 +25,19 @@ def reset_inventory_and_history(
             detail="확인 문구가 올바르지 않습니다. 'RESET' 을 입력하세요."
         )
 
-    conn = get_db()
     try:
-        cur = conn.cursor()
+        with db_conn() as conn:
+            cur = conn.cursor()
 
-        # 🔥 전체 삭제
-        cur.execute("DELETE FROM inventory")
-        cur.execute("DELETE FROM history")
-
-        conn.commit()
+            # 🔥 전체 삭제
+            cur.execute("DELETE FROM inventory")
+            cur.execute("DELETE FROM history")
 
     except Exception as e:
-        conn.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"전체 리셋 중 오류 발생: {e}"
         )
-    finally:
-        conn.close()
 
     return {
         "ok": True,
@@ -50,3 +45,25 @@ def reset_inventory_and_history(
         "operator": operator,
         "timestamp": datetime.now().isoformat(timespec="seconds"),
     }
+
+
+@router.post("/rebuild-rollup")
+def rebuild_rollup(operator: str = Form("SYSTEM")):
+    """
+    입·출고 통계 일별 집계(history_daily_rollup) 전체 재집계
+    - 트리거로 증분 유지되므로 평상시 불필요 (복구/검증용)
+    """
+    try:
+        rows = rebuild_history_daily_rollup()
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"집계 재생성 중 오류 발생: {e}"
+        )
+
+    return {
+        "ok": True,
+        "rows": rows,
+        "operator": operator,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+    }
@@ -6,7 +6,7 @@ from typing import Dict, List
 
 from fastapi import APIRouter, Form, HTTPException
 
-from app.db import get_db
+from app.db import db_conn
 
 router = APIRouter(prefix="/api/calendar", tags=["calendar"])
 
@@ -21,8 +21,7 @@ def _ensure_tables():
     """
     db.py 수정 없이도 동작하도록 API 호출 시 테이블 보장
     """
-    conn = get_db()
-    try:
+    with db_conn() as conn:
         cur = conn.cursor()
         cur.execute(
             """
@@ -39,9 +38,6 @@ def _ensure_tables():
         cur.execute(
             "CREATE INDEX IF NOT EXISTS idx_calendar_memo_date ON calendar_memo (memo_date)"
         )
-        conn.commit()
-    finally:
-        conn.close()
 
 
 def _validate_date_str(s: str) -> str:
@@ -73,8 +69,7 @@ def get_day(date: str):
     _ensure_tables()
     d = _validate_date_str(date)
 
-    conn = get_db()
-    try:
+    with db_conn() as conn:
         cur = conn.cursor()
         cur.execute(
             """
@@ -92,8 +87,6 @@ def get_day(date: str):
             if 0 <= idx < 4:
                 lines[idx] = r["content"] or ""
         return {"ok": True, "date": d, "lines": lines}
-    finally:
-        conn.close()
 
 
 @router.get("/month")
@@ -118,8 +111,7 @@ def get_month(year: int, month: int):
     else:
         end = date(year, month + 1, 1)
 
-    conn = get_db()
-    try:
+    with db_conn() as conn:
         cur = conn.cursor()
         cur.execute(
             """
@@ -139,8 +131,6 @@ def get_month(year: int, month: int):
             if 0 <= idx < 4:
                 items[d][idx] = r["content"] or ""
         return {"ok": True, "year": year, "month": month, "items": items}
-    finally:
-        conn.close()
 
 
 @router.post("/save")
@@ -158,8 +148,7 @@ def save_day(
     op = (operator or "").strip()
     now = _now()
 
-    conn = get_db()
-    try:
+    with db_conn() as conn:
         cur = conn.cursor()
 
         # 1~4 라인 UPSERT
@@ -176,10 +165,7 @@ def save_day(
                 (d, i, content, now, op),
             )
 
-        conn.commit()
         return {"ok": True, "date": d, "lines": lines}
-    finally:
-        conn.close()
 
 
 @router.post("/delete")
@@ -189,11 +175,7 @@ def delete_day(
     _ensure_tables()
     d = _validate_date_str(date)
 
-    conn = get_db()
-    try:
+    with db_conn() as conn:
         cur = conn.cursor()
         cur.execute("DELETE FROM calendar_memo WHERE memo_date=?", (d,))
-        conn.commit()
         return {"ok": True, "date": d}
-    finally:
-        conn.close()
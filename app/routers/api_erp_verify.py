@@ -1,82 +1,100 @@
 # app/routers/api_erp_verify.py
 from __future__ import annotations
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile
 
-from app.db import get_inventory_compare_rows
-from app.utils.erp_verify import parse_erp_excel_bytes
+from app.db import create_erp_verify, get_erp_verify, iter_erp_verify_rows, query_erp_verify_rows
+from app.utils.cursor import ERP_VERIFY_CURSOR_KEYS, decode_cursor, page_payload
+from app.utils.erp_verify import VERIFY_FILTERS, parse_erp_excel
+from app.utils.excel_export import xlsx_response
 
 router = APIRouter(prefix="/api/erp", tags=["ERP 재고 검증"])
 
+COLUMNS = [
+    ("status", "상태"),
+    ("mode", "비교단위"),
+    ("item_code", "품번"),
+    ("lot", "LOT"),
+    ("spec", "규격"),
+    ("erp_qty", "ERP 수량"),
+    ("wms_qty", "WMS 수량"),
+    ("diff", "차이"),
+    ("note", "비고"),
+]
 
+
+def _session(verify_id: str) -> dict:
+    session = get_erp_verify(verify_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="검증 결과가 없거나 만료되었습니다. 다시 검증해 주세요.")
+    return session
+
+
+def _kinds(filter: str):
+    if filter not in VERIFY_FILTERS:
+        raise HTTPException(status_code=400, detail=f"filter 는 {', '.join(VERIFY_FILTERS)} 중 하나입니다.")
+    return VERIFY_FILTERS[filter]
+
+
+# =====================================================
+# 검증 실행 → 결과는 서버에 verify_id 로 보관
+# - 응답: summary + 첫 페이지 rows (+ next_cursor)
+# =====================================================
 @router.post("/verify")
-async def verify_erp_stock(file: UploadFile = File(...)):
+def verify_erp_stock(
+    file: UploadFile = File(...),
+    limit: int = Query(500, ge=1, le=5000),
+):
     if not file.filename.lower().endswith(".xlsx"):
         raise HTTPException(status_code=400, detail="엑셀(xlsx) 파일만 업로드 가능합니다.")
 
-    data = await file.read()
     try:
-        erp_rows = parse_erp_excel_bytes(data)
+        erp_rows = parse_erp_excel(file.file)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    created = create_erp_verify(erp_rows, filename=file.filename)
+    rows = query_erp_verify_rows(created["verify_id"], limit=limit)
+    return {**created, **page_payload(rows, limit, ERP_VERIFY_CURSOR_KEYS)}
+
+
+# =====================================================
+# 검증 결과 페이지 조회 (filter: all / mismatch / diff / missing)
+# =====================================================
+@router.get("/verify/{verify_id}")
+def verify_result(
+    verify_id: str,
+    filter: str = "all",
+    limit: int = Query(500, ge=1, le=5000),
+    cursor: str = "",
+):
+    kinds = _kinds(filter)
+    try:
+        after = decode_cursor(cursor, len(ERP_VERIFY_CURSOR_KEYS))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    result = get_inventory_compare_rows(erp_rows)
-    return result
-from fastapi.responses import StreamingResponse
-import io
-import openpyxl
-
-
-@router.post("/verify/download")
-def download_verify_excel(rows: list[dict]):
-    """
-    ERP 재고 검증 결과 엑셀 다운로드
-    프론트에서 verify 결과 rows 그대로 전달
-    """
-
-    if not rows:
-        raise HTTPException(status_code=400, detail="다운로드할 데이터가 없습니다.")
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "ERP 재고 검증 결과"
-
-    # 헤더
-    headers = [
-        "상태",
-        "비교단위",
-        "품번",
-        "LOT",
-        "규격",
-        "ERP 수량",
-        "WMS 수량",
-        "차이",
-        "비고",
-    ]
-    ws.append(headers)
-
-    # 데이터
-    for r in rows:
-        ws.append([
-            r.get("status", ""),
-            r.get("mode", ""),
-            r.get("item_code", ""),
-            r.get("lot", ""),
-            r.get("spec", ""),
-            r.get("erp_qty", 0),
-            r.get("wms_qty", 0),
-            r.get("diff", 0),
-            r.get("note", ""),
-        ])
-
-    stream = io.BytesIO()
-    wb.save(stream)
-    stream.seek(0)
-
-    return StreamingResponse(
-        stream,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": "attachment; filename=erp_verify_result.xlsx"
-        },
+    session = _session(verify_id)
+    rows = query_erp_verify_rows(verify_id, kinds, limit=limit, after=after)
+    return {
+        "verify_id": verify_id,
+        "summary": session["summary"],
+        "expires_at": session["expires_at"],
+        **page_payload(rows, limit, ERP_VERIFY_CURSOR_KEYS),
+    }
+
+
+# =====================================================
+# 검증 결과 엑셀 다운로드 (저장된 결과 스트리밍)
+# =====================================================
+@router.get("/verify/{verify_id}/download")
+def download_verify_excel(verify_id: str, filter: str = "all"):
+    kinds = _kinds(filter)
+    _session(verify_id)
+
+    suffix = "" if filter == "all" else f"_{filter}"
+    return xlsx_response(
+        iter_erp_verify_rows(verify_id, kinds), COLUMNS,
+        filename=f"erp_verify_result{suffix}.xlsx",
+        sheet_name="ERP 재고 검증 결과",
     )
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Query
-from fastapi.responses import StreamingResponse
 from datetime import datetime
+from itertools import islice
 from app.db import query_history
-from app.utils.excel_export import rows_to_xlsx_bytes
+from app.utils.cursor import HISTORY_CURSOR_KEYS, iter_pages
+from app.utils.excel_export import xlsx_response
 
 router = APIRouter(prefix="/api/excel/history", tags=["excel-history"])
 
@@ -25,27 +26,30 @@ def download_history_excel(
     year: str | None = Query(None),
     month: str | None = Query(None),
     day: str | None = Query(None),
-    limit: int = Query(300),
+    limit: int | None = Query(None),
 ):
     """
     📥 이력 엑셀 다운로드
     - 입고 / 출고 / 이동 / 롤백 전체 포함
     - 메인 이력 / 엑셀 센터 공용
+    - limit 미지정: 조건에 맞는 전체 (키셋 페이지 단위 조회 → 스트리밍)
     """
 
     year_i = _to_int(year)
     month_i = _to_int(month)
     day_i = _to_int(day)
 
-    rows = query_history(
-        year=year_i,
-        month=month_i,
-        day=day_i,
-        limit=limit,
+    rows = iter_pages(
+        lambda after, size: [
+            dict(r)
+            for r in query_history(
+                year=year_i, month=month_i, day=day_i, limit=size, after=after,
+            )
+        ],
+        HISTORY_CURSOR_KEYS,
     )
-
-    if not rows:
-        rows = []
+    if limit:
+        rows = islice(rows, limit)
 
     columns = [
         ("type", "구분"),
@@ -63,18 +67,6 @@ def download_history_excel(
         ("created_at", "일시"),
     ]
 
-    data = rows_to_xlsx_bytes(
-        rows,
-        columns,
-        sheet_name="이력",
-    )
-
     filename = f"history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
 
-    return StreamingResponse(
-        iter([data]),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": f'attachment; filename="{filename}"'
-        },
-    )
+    return xlsx_response(rows, columns, filename=filename, sheet_name="이력")
@@ -1,8 +1,7 @@
 from fastapi import APIRouter, Query
-from fastapi.responses import StreamingResponse
 from datetime import datetime
 from app.db import query_outbound_summary
-from app.utils.excel_export import rows_to_xlsx_bytes
+from app.utils.excel_export import xlsx_response
 
 router = APIRouter(prefix="/api/excel/outbound-summary", tags=["excel-outbound-summary"])
 
@@ -12,25 +11,14 @@ def download_outbound_summary_excel(
     year: int | None = Query(None),
     month: int | None = Query(None),
 ):
-    rows = query_outbound_summary(year=year, month=month)
+    today = datetime.now()
+    rows = query_outbound_summary(year=year or today.year, month=month or today.month)
 
     columns = [
-        ("period", "기간"),
+        ("day", "기간"),
         ("total_qty", "출고 수량"),
     ]
 
-    data = rows_to_xlsx_bytes(
-        rows,
-        columns,
-        sheet_name="출고통계",
-    )
-
     filename = f"outbound_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
 
-    return StreamingResponse(
-        iter([data]),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": f'attachment; filename="{filename}"'
-        },
-    )
+    return xlsx_response(rows, columns, filename=filename, sheet_name="출고통계")
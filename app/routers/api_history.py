@@ -1,5 +1,6 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
 from app.db import query_history
+from app.utils.cursor import HISTORY_CURSOR_KEYS, decode_cursor, page_payload
 
 router = APIRouter(prefix="/api/history", tags=["api-history"])
 
@@ -8,6 +9,20 @@ def history(
     year: int | None = None,
     month: int | None = None,
     day: int | None = None,
-    limit: int = 200,
+    limit: int = Query(200, ge=1, le=5000),
+    cursor: str = "",
 ):
-    return {"rows": query_history(limit=limit, year=year, month=month, day=day)}
+    """
+    이력 조회 (최신순, 키셋 페이지네이션)
+    - 응답 next_cursor 를 cursor 로 넘기면 다음 페이지
+    """
+    try:
+        after = decode_cursor(cursor, len(HISTORY_CURSOR_KEYS))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    rows = [
+        dict(r)
+        for r in query_history(limit=limit, year=year, month=month, day=day, after=after)
+    ]
+    return page_payload(rows, limit, HISTORY_CURSOR_KEYS)
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Form, HTTPException
 from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
 
+from app.core.idempotency import run_once
 from app.db import (
-    add_history,
-    upsert_inventory,
+    stock_inbound,
     rollback_history,
 )
 
@@ -61,6 +61,7 @@ def inbound(
     qty: float = Form(...),        # 🔥 수량만 필수
     note: str = Form(""),
     operator: str = Form(""),
+    idempotency_key: str = Form(""),
 ):
     """
     ✅ 수기 입고 처리
@@ -78,45 +79,35 @@ def inbound(
             detail="수량은 0보다 커야 합니다."
         )
 
-    # 1️⃣ 재고 반영
-    ok = upsert_inventory(
-        warehouse=warehouse,
-        location=location,
-        brand=brand,
-        item_code=item_code,
-        item_name=item_name,
-        lot=lot,
-        spec=spec,
-        qty_delta=qty_norm,   # 🔥 소수점 그대로
-        note=note,
-    )
-    if not ok:
-        raise HTTPException(
-            status_code=400,
-            detail="입고 처리에 실패했습니다."
-        )
-
-    # 2️⃣ 이력 기록
-    add_history(
-        type="입고",
-        warehouse=warehouse,
-        operator=operator,
-        brand=brand,
-        item_code=item_code,
-        item_name=item_name,
-        lot=lot,
-        spec=spec,
-        from_location="입고",
-        to_location=location,
-        qty=qty_norm,
-        note=note,
-    )
-
-    return {
-        "ok": True,
-        "type": "입고",
-        "qty": qty_norm,
-    }
+    # 재고 반영 + 이력 기록 (단일 트랜잭션)
+    def _apply():
+        try:
+            stock_inbound(
+                warehouse=warehouse,
+                location=location,
+                brand=brand,
+                item_code=item_code,
+                item_name=item_name,
+                lot=lot,
+                spec=spec,
+                qty=qty_norm,   # 🔥 소수점 그대로
+                note=note,
+                operator=operator,
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=400,
+                detail=str(e)
+            )
+
+        return {
+            "ok": True,
+            "type": "입고",
+            "qty": qty_norm,
+        }
+
+    # idempotency_key: 같은 키 재전송(네트워크 재시도 / 더블 탭) → 첫 결과 반환, 재반영 없음
+    return run_once("inbound", idempotency_key, _apply)
 
 
 # =====================================================
@@ -1,15 +1,15 @@
 # app/routers/api_init_inventory.py
 from __future__ import annotations
 
-import io
 from datetime import datetime
 from decimal import Decimal, ROUND_HALF_UP
 from typing import Any, Dict, List, Tuple
 
-import openpyxl
 from fastapi import APIRouter, File, Form, HTTPException, UploadFile
 
-from app.db import get_db, upsert_inventory, add_history
+from app.core.jobs import JobContext, submit_upload_job
+from app.db import bulk_inbound, db_conn
+from app.utils.excel_reader import ExcelRowStream, ExcelSource
 
 router = APIRouter(prefix="/api/init", tags=["초기재고 세팅"])
 
@@ -42,60 +42,48 @@ def _q3(v: Any) -> Decimal:
 # EXCEL PARSER (중복 키 → 수량 합산)
 # =====================================================
 
-def _read_excel_rows(data: bytes) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-    wb = openpyxl.load_workbook(filename=io.BytesIO(data), data_only=True)
-    ws = wb.active
+def _header_index(header_cells: List[Any]) -> Dict[str, int]:
+    return {h: i for i, h in enumerate(_norm(c) for c in header_cells) if h}
 
-    try:
-        header_cells = next(ws.iter_rows(min_row=1, max_row=1, values_only=True))
-    except StopIteration:
-        raise HTTPException(status_code=400, detail="엑셀에 데이터가 없습니다.")
-
-    headers = [_norm(h) for h in header_cells]
-    col_index = {h: i for i, h in enumerate(headers) if h}
-
-    missing = [c for c in REQUIRED_COLS if c not in col_index]
-    if missing:
-        raise HTTPException(
-            status_code=400,
-            detail=f"필수 컬럼 누락: {', '.join(missing)} (수량 컬럼 필수)",
-        )
 
+def _read_excel_rows(src: ExcelSource) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
     ok_rows: List[Dict[str, Any]] = []
     err_rows: List[Dict[str, Any]] = []
 
-    # -----------------------------
-    # 1차 파싱
-    # -----------------------------
-    for ridx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-        if row is None or all((_norm(x) == "" for x in row)):
-            continue
-
-        def get(col: str) -> str:
-            return _norm(row[col_index[col]]) if col in col_index else ""
-
-        raw = {h: ("" if i >= len(row) else _norm(row[i])) for h, i in col_index.items()}
-
-        qty = _q3(row[col_index["수량"]])
-        if qty <= 0:
-            err_rows.append({
-                "rownum": ridx,
-                "error": "수량은 0보다 커야 합니다.",
-                "raw": raw
+    with ExcelRowStream(src, header_map=_header_index) as sheet:
+        if not sheet.headers:
+            raise ValueError("엑셀에 데이터가 없습니다.")
+
+        missing = [c for c in REQUIRED_COLS if c not in sheet.idx]
+        if missing:
+            raise ValueError(f"필수 컬럼 누락: {', '.join(missing)} (수량 컬럼 필수)")
+
+        # -----------------------------
+        # 1차 파싱
+        # -----------------------------
+        for ridx, row in sheet:
+            raw = {h: _norm(v) for h, v in row.items()}
+
+            qty = _q3(row["수량"])
+            if qty <= 0:
+                err_rows.append({
+                    "rownum": ridx,
+                    "error": "수량은 0보다 커야 합니다.",
+                    "raw": raw
+                })
+                continue
+
+            ok_rows.append({
+                "warehouse": raw.get("창고", ""),
+                "location": raw.get("로케이션", ""),
+                "brand": raw.get("브랜드", ""),
+                "item_code": raw.get("품번", ""),
+                "item_name": raw.get("품명", ""),
+                "lot": raw.get("LOT", ""),
+                "spec": raw.get("규격", ""),
+                "qty": qty,
+                "note": raw.get("비고", ""),
             })
-            continue
-
-        ok_rows.append({
-            "warehouse": get("창고"),
-            "location": get("로케이션"),
-            "brand": get("브랜드"),
-            "item_code": get("품번"),
-            "item_name": get("품명"),
-            "lot": get("LOT"),
-            "spec": get("규격"),
-            "qty": qty,
-            "note": get("비고"),
-        })
 
     # -----------------------------
     # 2차 처리: 중복 키 → 수량 합산
@@ -130,29 +118,64 @@ def _read_excel_rows(data: bytes) -> Tuple[List[Dict[str, Any]], List[Dict[str,
 # =====================================================
 
 def _count_inventory() -> int:
-    conn = get_db()
-    try:
+    with db_conn() as conn:
         cur = conn.cursor()
         cur.execute("SELECT COUNT(*) FROM inventory")
         return int(cur.fetchone()[0])
-    finally:
-        conn.close()
 
 
 def _count_history() -> int:
-    conn = get_db()
-    try:
+    with db_conn() as conn:
         cur = conn.cursor()
         cur.execute("SELECT COUNT(*) FROM history")
         return int(cur.fetchone()[0])
-    finally:
-        conn.close()
 
 
 def _make_batch_id() -> str:
     return "INIT-" + datetime.now().strftime("%Y%m%d-%H%M%S")
 
 
+# =====================================================
+# COMMIT WORKER (백그라운드 작업)
+# =====================================================
+
+def _commit_rows(ctx: JobContext, path: str, operator: str, batch_id: str) -> Dict[str, Any]:
+    """
+    초기재고 반영 (워커)
+    - 재고 + 이력 단일 트랜잭션 (bulk_inbound) → 중간 실패 시 전체 미반영
+    """
+    ok_rows, err_rows = _read_excel_rows(path)
+
+    if not ok_rows:
+        raise ValueError("반영할 정상 데이터가 없습니다.")
+
+    ctx.set_total(len(ok_rows) + len(err_rows))
+    for e in err_rows:
+        ctx.fail(e["rownum"], e["error"])
+
+    applied = bulk_inbound(
+        [{**r, "qty": float(r["qty"]), "note": r.get("note") or "초기재고"} for r in ok_rows],
+        operator=operator,
+        batch_id=batch_id,
+        history_type="초기재고",
+        from_location="INIT",
+        history_note="초기재고(엑셀 합산)",
+    )
+    ctx.ok(applied)
+
+    return {
+        "batch_id": batch_id,
+        "summary": {
+            "total_rows": len(ok_rows),
+            "applied": applied,
+            "failed": 0,
+            "excel_errors": len(err_rows),
+        },
+        "failed_rows": [],
+        "message": f"초기재고 반영 완료 (합산 기준)",
+    }
+
+
 # =====================================================
 # APIs
 # =====================================================
@@ -170,8 +193,10 @@ async def init_preview(file: UploadFile = File(...)):
     if not file.filename.lower().endswith(".xlsx"):
         raise HTTPException(status_code=400, detail="엑셀(.xlsx) 파일만 업로드 가능합니다.")
 
-    data = await file.read()
-    ok_rows, err_rows = _read_excel_rows(data)
+    try:
+        ok_rows, err_rows = _read_excel_rows(file.file)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return {
         "ok": True,
@@ -187,11 +212,12 @@ async def init_preview(file: UploadFile = File(...)):
 
 
 @router.post("/commit")
-async def init_commit(
+def init_commit(
     file: UploadFile = File(...),
     operator: str = Form(...),
     confirm: str = Form(""),
     force: int = Form(0),
+    reimport: int = Form(0),
 ):
     if confirm.strip() != "INIT-CONFIRM":
         raise HTTPException(status_code=400, detail="confirm=INIT-CONFIRM 필요")
@@ -206,61 +232,8 @@ async def init_commit(
             detail=f"inventory {inv_cnt}건 존재 → force=1 필요",
         )
 
-    data = await file.read()
-    ok_rows, err_rows = _read_excel_rows(data)
-
-    if not ok_rows:
-        raise HTTPException(status_code=400, detail="반영할 정상 데이터가 없습니다.")
-
-    batch_id = _make_batch_id()
-    applied = 0
-    failed: List[Dict[str, Any]] = []
-
-    for r in ok_rows:
-        try:
-            upsert_inventory(
-                r["warehouse"],
-                r["location"],
-                r["brand"],
-                r["item_code"],
-                r["item_name"],
-                r["lot"],
-                r["spec"],
-                float(r["qty"]),
-                note=(r.get("note") or "초기재고"),
-            )
-
-            add_history(
-                "초기재고",
-                r["warehouse"],
-                operator,
-                r["brand"],
-                r["item_code"],
-                r["item_name"],
-                r["lot"],
-                r["spec"],
-                "INIT",
-                r["location"],
-                float(r["qty"]),
-                note="초기재고(엑셀 합산)",
-                batch_id=batch_id,
-                dedup_seconds=0,
-            )
-
-            applied += 1
-
-        except Exception as e:
-            failed.append({"row": r, "error": str(e)})
-
-    return {
-        "ok": True,
-        "batch_id": batch_id,
-        "summary": {
-            "total_rows": len(ok_rows),
-            "applied": applied,
-            "failed": len(failed),
-            "excel_errors": len(err_rows),
-        },
-        "failed_rows": failed[:200],
-        "message": f"초기재고 반영 완료 (합산 기준)",
-    }
+    return submit_upload_job(
+        "init_commit", file, _commit_rows, operator,
+        batch_prefix=_make_batch_id(),
+        reimport=bool(reimport),
+    )
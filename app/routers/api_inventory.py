@@ -1,35 +1,59 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query
 from app.db import (
+    INVENTORY_MATCH_MODES,
     query_inventory,
+    query_inventory_smart,
     get_inventory_by_item_code,
 )
+from app.utils.cursor import INVENTORY_CURSOR_KEYS, decode_cursor, page_payload
 from app.utils.qr_format import is_item_qr, extract_item_fields
 
 router = APIRouter(prefix="/api/inventory", tags=["api-inventory"])
 
 
 # =====================================================
-# 기본 재고 조회 (기존 유지)
+# 기본 재고 조회 (키셋 페이지네이션)
+# - q: 통합 검색 / 그 외: 컬럼별 검색
+# - match: 컬럼별 검색 비교 방식 (contains / exact / prefix)
+# - 응답 next_cursor 를 cursor 로 넘기면 다음 페이지
 # =====================================================
 @router.get("")
 def inventory(
+    q: str = "",
     warehouse: str = "",
     location: str = "",
     brand: str = "",
     item_code: str = "",
     lot: str = "",
     spec: str = "",
+    limit: int = Query(500, ge=1, le=5000),
+    cursor: str = "",
+    match: str = "contains",
 ):
-    return {
-        "rows": query_inventory(
+    if match not in INVENTORY_MATCH_MODES:
+        raise HTTPException(status_code=400, detail=f"match 는 {', '.join(INVENTORY_MATCH_MODES)} 중 하나입니다.")
+
+    try:
+        after = decode_cursor(cursor, len(INVENTORY_CURSOR_KEYS))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if q:
+        rows = query_inventory_smart(q=q, limit=limit, ranked=False, after=after)
+    else:
+        rows = query_inventory(
             warehouse=warehouse,
             location=location,
             brand=brand,
             item_code=item_code,
             lot=lot,
             spec=spec,
+            limit=limit,
+            after=after,
+            match=match,
         )
-    }
+
+    return page_payload(rows, limit, INVENTORY_CURSOR_KEYS)
 
 
 # =====================================================
@@ -50,11 +74,12 @@ def inventory_by_qr(code: str = ""):
             item_code=item_code,
             lot=lot,
             spec=spec,
+            match="exact",
         )
         return {"rows": rows}
 
     # 기본: 로케이션 QR
-    rows = query_inventory(location=code)
+    rows = query_inventory(location=code, match="exact")
     return {"rows": rows}
 
 
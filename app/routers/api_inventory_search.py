@@ -1,38 +1,15 @@
 from fastapi import APIRouter, Query
-from app.db import get_db
+from app.db import query_inventory_smart
 
 router = APIRouter(prefix="/api/inventory-search", tags=["inventory-search"])
 
+_FIELDS = ("warehouse", "location", "brand", "item_code", "item_name", "lot", "spec", "qty")
+
 
 @router.get("")
 def inventory_search(q: str = Query(..., min_length=1)):
     """
-    품번 검색 → 현재고 목록 반환
+    통합 검색(품번/로케이션/LOT/규격 등 부분 일치) → 현재고 목록 반환
     """
-    conn = get_db()
-    cur = conn.cursor()
-
-    cur.execute(
-        """
-        SELECT
-            warehouse,
-            location,
-            brand,
-            item_code,
-            item_name,
-            lot,
-            spec,
-            SUM(qty) as qty
-        FROM inventory
-        WHERE item_code LIKE ?
-          AND qty > 0
-        GROUP BY warehouse, location, brand, item_code, item_name, lot, spec
-        ORDER BY item_code, lot
-        LIMIT 20
-        """,
-        (f"%{q}%",)
-    )
-
-    rows = [dict(r) for r in cur.fetchall()]
-    conn.close()
-    return rows
+    rows = query_inventory_smart(q=q, limit=20)
+    return [{k: r[k] for k in _FIELDS} for r in rows]
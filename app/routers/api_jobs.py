@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException, Query
+
+from app.core.jobs import job_status
+from app.db import query_job_errors
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}")
+def get_job_status(job_id: str, errors: int = Query(50, ge=0, le=1000)):
+    """
+    백그라운드 작업 상태
+    - status: queued / running / done / failed
+    - processed / failed / total, progress(0~1), eta_seconds
+    - errors: 행별 오류 앞부분 (전체는 /api/jobs/{job_id}/errors)
+    """
+    job = job_status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+
+    job["errors"] = query_job_errors(job_id, limit=errors) if errors else []
+    return job
+
+
+@router.get("/{job_id}/errors")
+def get_job_errors(
+    job_id: str,
+    limit: int = Query(200, ge=1, le=5000),
+    offset: int = Query(0, ge=0),
+):
+    if job_status(job_id) is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+
+    return {"job_id": job_id, "rows": query_job_errors(job_id, limit=limit, offset=offset)}
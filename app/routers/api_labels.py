@@ -3,11 +3,8 @@ from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 
 from app.core.paths import TEMPLATES_DIR
-
-import openpyxl
-import qrcode
-import base64
-from io import BytesIO
+from app.utils.excel_reader import open_sheet
+from app.utils.qr_image import qr_base64, qr_base64_many, qr_cache
 
 router = APIRouter(prefix="/api/labels", tags=["라벨 API"])
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
@@ -26,44 +23,39 @@ def product_label_preview(
     if not file.filename.lower().endswith(".xlsx"):
         raise HTTPException(status_code=400, detail="엑셀(xlsx) 파일만 업로드 가능합니다.")
 
-    wb = openpyxl.load_workbook(file.file)
-    ws = wb.active
-
     items = []
 
     # 엑셀 컬럼
     # A: 브랜드 / B: 품번 / C: 품명 / D: LOT / E: 규격
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        if not row or not row[1]:
-            continue
-
-        brand, code, name, lot, size = row
-
-        brand = str(brand).strip()
-        code = str(code).strip()
-        name = str(name).strip()
-        lot = str(lot).strip()
-        size = str(size).strip()
-
-        qr_text = f"PRODUCT:{code}|LOT:{lot}"
-
-        qr = qrcode.make(qr_text)
-        buffer = BytesIO()
-        qr.save(buffer, format="PNG")
-        qr_base64 = base64.b64encode(buffer.getvalue()).decode()
-
-        items.append({
-            "brand": brand,
-            "code": code,
-            "name": name,
-            "lot": lot,
-            "spec": size,
-            "qr_base64": qr_base64,
-        })
+    with open_sheet(file.file) as ws:
+        for row in ws.iter_rows(min_row=2, values_only=True):
+            if not row or not row[1]:
+                continue
+
+            brand, code, name, lot, size = (tuple(row) + (None,) * 5)[:5]
+
+            brand = str(brand).strip()
+            code = str(code).strip()
+            name = str(name).strip()
+            lot = str(lot).strip()
+            size = str(size).strip()
+
+            items.append({
+                "brand": brand,
+                "code": code,
+                "name": name,
+                "lot": lot,
+                "spec": size,
+            })
 
     if not items:
         raise HTTPException(status_code=400, detail="출력할 제품 데이터가 없습니다.")
 
+    # QR 은 행 수집 후 한 번에 생성 (대량이면 프로세스 풀 병렬, 순서 유지)
+    qr_texts = [f"PRODUCT:{it['code']}|LOT:{it['lot']}" for it in items]
+    for it, qr_b64 in zip(items, qr_base64_many(qr_texts, spec)):
+        it["qr_base64"] = qr_b64
+
     return templates.TemplateResponse(
         "labels/product_preview.html",
         {
@@ -87,33 +79,25 @@ def location_label_excel_preview(
     if not file.filename.lower().endswith(".xlsx"):
         raise HTTPException(status_code=400, detail="엑셀(xlsx) 파일만 업로드 가능합니다.")
 
-    wb = openpyxl.load_workbook(file.file)
-    ws = wb.active
-
     locations = []
 
     # 엑셀 컬럼
     # A: LOCATION
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        if not row or not row[0]:
-            continue
-
-        location = str(row[0]).strip().upper()
-        qr_text = f"LOCATION:{location}"
-
-        qr = qrcode.make(qr_text)
-        buffer = BytesIO()
-        qr.save(buffer, format="PNG")
-        qr_base64 = base64.b64encode(buffer.getvalue()).decode()
+    with open_sheet(file.file) as ws:
+        for row in ws.iter_rows(min_row=2, values_only=True):
+            if not row or not row[0]:
+                continue
 
-        locations.append({
-            "location": location,
-            "qr_base64": qr_base64
-        })
+            location = str(row[0]).strip().upper()
+            locations.append({"location": location})
 
     if not locations:
         raise HTTPException(status_code=400, detail="출력할 로케이션 데이터가 없습니다.")
 
+    qr_texts = [f"LOCATION:{loc['location']}" for loc in locations]
+    for loc, qr_b64 in zip(locations, qr_base64_many(qr_texts, spec)):
+        loc["qr_base64"] = qr_b64
+
     return templates.TemplateResponse(
         "labels/location_preview.html",
         {
@@ -136,10 +120,7 @@ def location_single_preview(
     location = location.strip().upper()
 
     qr_text = f"LOCATION:{location}"
-    qr = qrcode.make(qr_text)
-    buffer = BytesIO()
-    qr.save(buffer, format="PNG")
-    qr_base64 = base64.b64encode(buffer.getvalue()).decode()
+    qr_b64 = qr_base64(qr_text, spec)
 
     return templates.TemplateResponse(
         "labels/location_preview.html",
@@ -147,8 +128,16 @@ def location_single_preview(
             "request": request,
             "locations": [{
                 "location": location,
-                "qr_base64": qr_base64
+                "qr_base64": qr_b64
             }],
             "label_spec": spec,
         }
     )
+
+
+# =====================================================
+# QR 이미지 캐시 상태 (적중 / 미적중)
+# =====================================================
+@router.get("/cache-stats")
+def qr_cache_stats():
+    return qr_cache.stats()
@@ -2,9 +2,7 @@ from fastapi import APIRouter, Form, HTTPException
 from decimal import Decimal, ROUND_HALF_UP
 
 from app.db import (
-    add_history,
-    resolve_inventory_brand_and_name,
-    upsert_inventory,
+    stock_move,
     rollback_history,
 )
 
@@ -80,15 +78,20 @@ def move(
             detail="출발/도착 로케이션이 동일합니다."
         )
 
-    # 1️⃣ 브랜드 / 품명 자동 보정 (출발지 기준)
+    # 브랜드/품명 보정 → 출발지 차감 → 도착지 가산 → 이력 (단일 트랜잭션)
     try:
-        resolved_brand, resolved_name = resolve_inventory_brand_and_name(
+        stock_move(
             warehouse=warehouse,
-            location=from_location,
+            from_location=from_location,
+            to_location=to_location,
+            brand=brand,
             item_code=item_code,
+            item_name=item_name,
             lot=lot,
             spec=spec,
-            brand=brand,
+            qty=qty_norm,
+            note=note,
+            operator=operator,
         )
     except ValueError as e:
         raise HTTPException(
@@ -96,56 +99,6 @@ def move(
             detail=str(e)
         )
 
-    final_brand = resolved_brand or (brand or "")
-    final_name = item_name or resolved_name or ""
-
-    # 2️⃣ 출발지 차감
-    ok = upsert_inventory(
-        warehouse=warehouse,
-        location=from_location,
-        brand=final_brand,
-        item_code=item_code,
-        item_name=final_name,
-        lot=lot,
-        spec=spec,
-        qty_delta=-qty_norm,
-        note=note,
-    )
-    if not ok:
-        raise HTTPException(
-            status_code=400,
-            detail="출발지 재고가 부족하여 이동할 수 없습니다."
-        )
-
-    # 3️⃣ 도착지 가산
-    upsert_inventory(
-        warehouse=warehouse,
-        location=to_location,
-        brand=final_brand,
-        item_code=item_code,
-        item_name=final_name,
-        lot=lot,
-        spec=spec,
-        qty_delta=qty_norm,
-        note=note,
-    )
-
-    # 4️⃣ 이력 기록
-    add_history(
-        type="이동",
-        warehouse=warehouse,
-        operator=operator,
-        brand=final_brand,
-        item_code=item_code,
-        item_name=final_name,
-        lot=lot,
-        spec=spec,
-        from_location=from_location,
-        to_location=to_location,
-        qty=qty_norm,
-        note=note,
-    )
-
     return {
         "ok": True,
         "type": "이동",
@@ -2,12 +2,11 @@ from fastapi import APIRouter, Form, HTTPException
 from decimal import Decimal, ROUND_HALF_UP
 from typing import Optional
 
+from app.core.idempotency import run_once
 from app.db import (
-    add_history,
-    resolve_inventory_brand_and_name,
-    upsert_inventory,
+    StockConflict,
+    stock_outbound,
     rollback_history,
-    get_inventory_one,   # ✅ STEP 3 핵심
 )
 
 router = APIRouter(prefix="/api/outbound", tags=["outbound"])
@@ -57,6 +56,7 @@ def outbound(
     qty: float = Form(...),         # 🔥 수량만 필수
     note: str = Form(""),
     operator: str = Form(""),
+    idempotency_key: str = Form(""),
 ):
     """
     ✅ 출고 처리 (STEP 3 반영)
@@ -75,89 +75,42 @@ def outbound(
             detail="수량은 0보다 커야 합니다."
         )
 
-    # 1️⃣ 브랜드 / 품명 자동 보정
-    try:
-        resolved_brand, resolved_name = resolve_inventory_brand_and_name(
-            warehouse=warehouse,
-            location=location,
-            item_code=item_code,
-            lot=lot,
-            spec=spec,
-            brand=brand,
-        )
-    except ValueError as e:
-        raise HTTPException(
-            status_code=400,
-            detail=str(e)
-        )
-
-    final_brand = resolved_brand or (brand or "")
-    final_name = item_name or resolved_name or ""
-
-    # 2️⃣ 🔐 서버 기준 재고 재확인 (STEP 3 핵심)
-    inv = get_inventory_one(
-        warehouse=warehouse,
-        location=location,
-        brand=final_brand,
-        item_code=item_code,
-        lot=lot,
-        spec=spec,
-    )
-
-    if not inv:
-        raise HTTPException(
-            status_code=409,
-            detail="선택한 재고가 존재하지 않습니다. 새로고침 후 다시 선택하세요."
-        )
-
-    current_qty = float(inv["qty"])
-    if qty_norm > current_qty:
-        raise HTTPException(
-            status_code=409,
-            detail=f"출고 수량({qty_norm})이 현재고({current_qty})를 초과했습니다."
-        )
-
-    # 3️⃣ 재고 차감
-    ok = upsert_inventory(
-        warehouse=warehouse,
-        location=location,
-        brand=final_brand,
-        item_code=item_code,
-        item_name=final_name,
-        lot=lot,
-        spec=spec,
-        qty_delta=-qty_norm,
-        note=note,
-    )
-    if not ok:
-        # 동시 출고 등 극단 상황
-        raise HTTPException(
-            status_code=409,
-            detail="재고가 변경되어 출고에 실패했습니다. 다시 시도하세요."
-        )
-
-    # 4️⃣ 이력 기록
-    add_history(
-        type="출고",
-        warehouse=warehouse,
-        operator=operator,
-        brand=final_brand,
-        item_code=item_code,
-        item_name=final_name,
-        lot=lot,
-        spec=spec,
-        from_location=location,
-        to_location="출고",
-        qty=qty_norm,
-        note=note,
-    )
-
-    return {
-        "ok": True,
-        "type": "출고",
-        "qty": qty_norm,
-        "remain_qty": round(current_qty - qty_norm, 3),
-    }
+    # 1️⃣ 브랜드/품명 보정 → 🔐 서버 기준 재고 재확인 → 차감 → 이력
+    #    (BEGIN IMMEDIATE 단일 트랜잭션, 동시 출고 방어)
+    def _apply():
+        try:
+            result = stock_outbound(
+                warehouse=warehouse,
+                location=location,
+                brand=brand,
+                item_code=item_code,
+                item_name=item_name,
+                lot=lot,
+                spec=spec,
+                qty=qty_norm,
+                note=note,
+                operator=operator,
+            )
+        except StockConflict as e:
+            raise HTTPException(
+                status_code=409,
+                detail=str(e)
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=400,
+                detail=str(e)
+            )
+
+        return {
+            "ok": True,
+            "type": "출고",
+            "qty": qty_norm,
+            "remain_qty": result["remain_qty"],
+        }
+
+    # idempotency_key: 같은 키 재전송(네트워크 재시도 / 더블 탭) → 첫 결과 반환, 재반영 없음
+    return run_once("outbound", idempotency_key, _apply)
 
 
 # =====================================================
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Form, HTTPException
-from app.db import rollback_history, query_history
+from app.db import rollback_batch
 
 router = APIRouter(prefix="/api/rollback", tags=["rollback"])
 
@@ -11,53 +11,34 @@ def rollback_batch_api(
     note: str = Form("")
 ):
     """
-    엑셀 업로드 batch_id 기준 전체 롤백
-    - 가능한 이력만 롤백
-    - 실패 건은 스킵
-    - 전체는 성공 처리
+    엑셀 업로드 batch_id 기준 전체 롤백 (입고 / 출고 / 이동 / 초기재고)
+    - batch_id 이력만 인덱스로 조회 (이력 건수 제한 없음)
+    - 재고 부족 등 실패 건은 스킵, 나머지는 1 트랜잭션으로 반영
+    - 전체는 성공 처리 (failed 에 건별 사유)
     """
 
+    batch_id = (batch_id or "").strip()
     if not batch_id:
         raise HTTPException(status_code=400, detail="batch_id는 필수입니다.")
 
-    # 🔹 batch_id에 해당하는 이력 중 아직 롤백 안 된 것만
-    rows = query_history(limit=10_000)
+    success, errors = rollback_batch(
+        batch_id,
+        operator=operator,
+        note=note or f"배치롤백:{batch_id}",
+    )
+    total = success + len(errors)
 
-    targets = [
-        r for r in rows
-        if r["batch_id"] == batch_id and (r["rolled_back"] or 0) == 0
-    ]
-
-    if not targets:
+    if total == 0:
         raise HTTPException(
             status_code=404,
             detail="롤백 대상 이력이 없습니다."
         )
 
-    success = 0
-    failed = []
-
-    for r in targets:
-        try:
-            rollback_history(
-                history_id=r["id"],
-                operator=operator,
-                note=note or f"배치롤백:{batch_id}"
-            )
-            success += 1
-
-        except Exception as e:
-            failed.append({
-                "history_id": r["id"],
-                "error": str(e)
-            })
-            continue
-
     return {
         "ok": True,
         "batch_id": batch_id,
-        "total": len(targets),
+        "total": total,
         "success": success,
-        "failed": failed,
-        "message": f"총 {len(targets)}건 중 {success}건 롤백 완료"
+        "failed": [{"history_id": hid, "error": err} for hid, err in errors],
+        "message": f"총 {total}건 중 {success}건 롤백 완료"
     }
@@ -1,70 +1,49 @@
-from fastapi import APIRouter
-from fastapi.responses import StreamingResponse
-from app.db import query_history
-import csv
-import io
+from fastapi import APIRouter, HTTPException
+from app.db import iter_history
+from app.utils.csv_export import csv_response
 
 router = APIRouter(
     prefix="/page/history/excel",
     tags=["history-excel"]
 )
 
+# ✅ 컬럼명 (엑셀용 한글)
+COLUMNS = [
+    ("created_at", "시간"),
+    ("type", "유형"),
+    ("warehouse", "창고"),
+    ("from_location", "출발지"),
+    ("to_location", "도착지"),
+    ("brand", "브랜드"),
+    ("item_code", "품번"),
+    ("item_name", "품명"),
+    ("lot", "LOT"),
+    ("spec", "규격"),
+    ("qty", "수량"),
+    ("note", "비고"),
+    ("operator", "작업자"),
+]
+
+
 @router.get("")
 def download_history_excel(
     year: int | None = None,
     month: int | None = None,
     day: int | None = None,
+    start_date: str | None = None,
+    end_date: str | None = None,
 ):
-    rows = query_history(year=year, month=month, day=day, limit=5000)
-
-    # 🔥 핵심: utf-8-sig (BOM 포함)
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    # ✅ 컬럼명 (엑셀용 한글)
-    writer.writerow([
-        "시간",
-        "유형",
-        "창고",
-        "출발지",
-        "도착지",
-        "브랜드",
-        "품번",
-        "품명",
-        "LOT",
-        "규격",
-        "수량",
-        "비고",
-        "작업자",
-    ])
-
-    for r in rows:
-        writer.writerow([
-            r["created_at"],
-            r["type"],
-            r["warehouse"],
-            r["from_location"],
-            r["to_location"],
-            r["brand"],
-            r["item_code"],
-            r["item_name"],
-            r["lot"],
-            r["spec"],
-            r["qty"],
-            r["note"],
-            r["operator"],
-        ])
-
-    csv_text = output.getvalue()
-    output.close()
-
-    # 🔥 BOM 붙이기
-    bom_csv = "\ufeff" + csv_text
-
-    return StreamingResponse(
-        io.BytesIO(bom_csv.encode("utf-8")),
-        media_type="text/csv; charset=utf-8",
-        headers={
-            "Content-Disposition": "attachment; filename=history_export.csv"
-        }
-    )
+    """
+    이력 CSV 다운로드 (UTF-8 BOM, 행 수 제한 없음)
+    - year / month / day 또는 start_date ~ end_date (YYYY-MM-DD, 양 끝 포함)
+    - DB 커서를 fetchmany 단위로 읽어 바로 스트리밍
+    """
+    try:
+        rows = iter_history(
+            year=year, month=month, day=day,
+            start_date=start_date, end_date=end_date,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="날짜 형식은 YYYY-MM-DD 입니다.")
+
+    return csv_response(rows, COLUMNS, filename="history_export.csv")
@@ -1,11 +1,10 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-import openpyxl
-import io
 from datetime import datetime, date
 from decimal import Decimal, InvalidOperation
 
-from app.db import upsert_inventory, add_history
-from app.utils.excel_kor_columns import build_col_index
+from app.core.jobs import JobContext, submit_upload_job
+from app.db import bulk_inbound
+from app.utils.excel_reader import ExcelRowStream
 
 router = APIRouter(prefix="/api/excel/inbound", tags=["excel-inbound"])
 
@@ -49,13 +48,90 @@ def _parse_excel_date(v):
         raise ValueError("입고일 형식 오류 (YYYY-MM-DD)")
 
 
+def _process(ctx: JobContext, path: str, operator: str, batch_id: str):
+    # 📄 read_only 스트리밍 (임시 파일, 전체 메모리 로드 없음)
+    with ExcelRowStream(path) as sheet:
+        idx = sheet.idx
+
+        # 🔥 필수 컬럼: 수량만
+        if "수량" not in idx:
+            raise ValueError("필수 컬럼 누락: 수량")
+
+        ctx.set_total(sheet.total)
+        valid_rows = []
+
+        # ===============================
+        # ROW LOOP (파싱 / 행별 검증만)
+        # ===============================
+        for r_i, row in sheet:
+            try:
+                # ---------------------------
+                # 값 추출 (전부 선택)
+                # ---------------------------
+                warehouse = str(row.get("창고") or "").strip()
+                location = str(row.get("로케이션") or "").strip()
+                item_code = str(row.get("품번") or "").strip()
+
+                brand = str(row.get("브랜드") or "").strip()
+                item_name = str(row.get("품명") or "").strip()
+                lot = str(row.get("LOT") or "").strip()
+                spec = str(row.get("규격") or "").strip()
+                note = str(row.get("비고") or "").strip()
+
+                qty_raw = row.get("수량")
+
+                # 📅 입고일 (선택)
+                in_date = None
+                if "입고일" in idx:
+                    in_date = _parse_excel_date(row.get("입고일"))
+
+                # ---------------------------
+                # 수량 처리
+                # ---------------------------
+                qty = _parse_qty(qty_raw)
+                if qty < 0:
+                    raise ValueError("수량은 0 이상만 허용")
+
+                valid_rows.append({
+                    "warehouse": warehouse,
+                    "location": location,
+                    "brand": brand,
+                    "item_code": item_code,
+                    "item_name": item_name,
+                    "lot": lot,
+                    "spec": spec,
+                    "qty": qty,
+                    "note": note,
+                    "created_at": in_date,   # 🔥 입고일 반영
+                })
+                ctx.ok()
+
+            except Exception as e:
+                ctx.fail(r_i, str(e))
+
+    # ===============================
+    # APPLY (재고 키별 합산 + 이력 일괄, 단일 트랜잭션)
+    # ===============================
+    try:
+        success = bulk_inbound(valid_rows, operator=operator, batch_id=batch_id)
+    except Exception as e:
+        raise RuntimeError(f"입고 반영 실패 (전체 취소): {e}")
+
+    return {
+        "success": success,
+        "fail": ctx.failed,
+        "batch_id": batch_id,
+    }
+
+
 @router.post("")
-async def excel_inbound(
+def excel_inbound(
     operator: str = Form(""),
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    reimport: int = Form(0),
 ):
     """
-    입고 엑셀 업로드
+    입고 엑셀 업로드 (백그라운드 작업 → job_id 즉시 반환, /api/jobs/{job_id} 로 진행 조회)
 
     ✅ 필수 컬럼
       - 수량
@@ -67,116 +143,16 @@ async def excel_inbound(
     📌 규칙
       - 수량 > 0 : 재고 증가 + 이력
       - 수량 = 0 : 재고 변화 없음 + 이력
-      - 수량 < 0 : 에러
+      - 수량 < 0 : 에러 (해당 행만 제외, 작업 오류 목록에 기록)
+      - 정상 행은 단일 트랜잭션으로 일괄 반영
+      - 이미 반영된 동일 파일(SHA-256): 재반영 없이 기존 작업 결과 반환 (reimport=1: 재반영)
     """
 
     if not file.filename.lower().endswith((".xlsx", ".xlsm", ".xltx", ".xltm")):
         raise HTTPException(status_code=400, detail="엑셀(.xlsx) 파일만 업로드 가능합니다.")
 
-    batch_id = datetime.now().strftime("%Y%m%d_%H%M%S_excel_inbound")
-
-    data = await file.read()
-    wb = openpyxl.load_workbook(filename=io.BytesIO(data), data_only=True)
-    ws = wb.active
-
-    # ===============================
-    # HEADER
-    # ===============================
-    header_row = next(ws.iter_rows(min_row=1, max_row=1, values_only=True))
-    headers = [h for h in header_row]
-    idx = build_col_index(headers)
-
-    # 🔥 필수 컬럼: 수량만
-    if "수량" not in idx:
-        raise HTTPException(status_code=400, detail="필수 컬럼 누락: 수량")
-
-    success = 0
-    fail = 0
-    errors = []
-
-    # ===============================
-    # ROW LOOP
-    # ===============================
-    for r_i, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-        if row is None or all(v is None or str(v).strip() == "" for v in row):
-            continue
-
-        try:
-            # ---------------------------
-            # 값 추출 (전부 선택)
-            # ---------------------------
-            warehouse = str(row[idx["창고"]] or "").strip() if "창고" in idx else ""
-            location = str(row[idx["로케이션"]] or "").strip() if "로케이션" in idx else ""
-            item_code = str(row[idx["품번"]] or "").strip() if "품번" in idx else ""
-
-            brand = str(row[idx["브랜드"]] or "").strip() if "브랜드" in idx else ""
-            item_name = str(row[idx["품명"]] or "").strip() if "품명" in idx else ""
-            lot = str(row[idx["LOT"]] or "").strip() if "LOT" in idx else ""
-            spec = str(row[idx["규격"]] or "").strip() if "규격" in idx else ""
-            note = str(row[idx["비고"]] or "").strip() if "비고" in idx else ""
-
-            qty_raw = row[idx["수량"]]
-
-            # 📅 입고일 (선택)
-            in_date = None
-            if "입고일" in idx:
-                in_date = _parse_excel_date(row[idx["입고일"]])
-
-            # ---------------------------
-            # 수량 처리
-            # ---------------------------
-            qty = _parse_qty(qty_raw)
-            if qty < 0:
-                raise ValueError("수량은 0 이상만 허용")
-
-            # ---------------------------
-            # INVENTORY
-            # ---------------------------
-            if qty > 0:
-                ok = upsert_inventory(
-                    warehouse=warehouse,
-                    location=location,
-                    brand=brand,
-                    item_code=item_code,
-                    item_name=item_name,
-                    lot=lot,
-                    spec=spec,
-                    qty_delta=qty,
-                    note=note,
-                )
-                if not ok:
-                    raise ValueError("재고 반영 실패")
-
-            # ---------------------------
-            # HISTORY (입고일 반영 🔥)
-            # ---------------------------
-            add_history(
-                "입고",
-                warehouse,
-                operator,
-                brand,
-                item_code,
-                item_name,
-                lot,
-                spec,
-                "",
-                location,
-                qty,
-                note,
-                batch_id=batch_id,
-                created_at=in_date,   # 🔥 핵심
-            )
-
-            success += 1
-
-        except Exception as e:
-            fail += 1
-            errors.append({"row": r_i, "error": str(e)})
-
-    return {
-        "ok": True,
-        "success": success,
-        "fail": fail,
-        "batch_id": batch_id,
-        "errors": errors[:50],
-    }
+    return submit_upload_job(
+        "excel_inbound", file, _process, operator,
+        batch_prefix=datetime.now().strftime("%Y%m%d_%H%M%S_excel_inbound"),
+        reimport=bool(reimport),
+    )
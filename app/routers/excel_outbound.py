@@ -1,11 +1,10 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-import openpyxl
-import io
 from datetime import datetime, date
 from decimal import Decimal, InvalidOperation
 
-from app.db import query_inventory, upsert_inventory, add_history
-from app.utils.excel_kor_columns import build_col_index
+from app.core.jobs import JobContext, submit_upload_job
+from app.db import OUTBOUND_POLICIES, bulk_outbound
+from app.utils.excel_reader import ExcelRowStream
 
 router = APIRouter(prefix="/api/excel/outbound", tags=["excel-outbound"])
 
@@ -47,13 +46,81 @@ def _parse_excel_date(v):
         raise ValueError("출고일 형식 오류 (YYYY-MM-DD)")
 
 
+def _process(ctx: JobContext, path: str, operator: str, policy: str, batch_id: str):
+    # 📄 read_only 스트리밍 (임시 파일, 전체 메모리 로드 없음)
+    with ExcelRowStream(path) as sheet:
+        idx = sheet.idx
+
+        # 🔥 필수 컬럼: 수량만
+        if "수량" not in idx:
+            raise ValueError("필수 컬럼 누락: 수량")
+
+        ctx.set_total(sheet.total)
+        valid_rows = []
+
+        # ===============================
+        # ROW LOOP (파싱 / 행별 검증만)
+        # ===============================
+        for r_i, row in sheet:
+            try:
+                # ---------------------------
+                # 값 추출 (전부 선택)
+                # ---------------------------
+                qty = _parse_qty(row.get("수량"))
+
+                # 📅 출고일 (선택)
+                out_date = None
+                if "출고일" in idx:
+                    out_date = _parse_excel_date(row.get("출고일"))
+
+                if qty < 0:
+                    raise ValueError("수량은 0 이상만 허용")
+
+                valid_rows.append({
+                    "rownum": r_i,
+                    "warehouse": str(row.get("창고") or "").strip(),
+                    "location": str(row.get("로케이션") or "").strip(),
+                    "brand": str(row.get("브랜드") or "").strip(),
+                    "item_code": str(row.get("품번") or "").strip(),
+                    "item_name": str(row.get("품명") or "").strip(),
+                    "lot": str(row.get("LOT") or "").strip(),
+                    "spec": str(row.get("규격") or "").strip(),
+                    "qty": qty,
+                    "note": str(row.get("비고") or "").strip(),
+                    "created_at": out_date,   # 🔥 출고일 반영
+                })
+                ctx.ok()
+
+            except Exception as e:
+                ctx.fail(r_i, str(e))
+
+    # ===============================
+    # ALLOCATE + APPLY (후보 재고 1회 조회, 단일 트랜잭션)
+    # - 재고 부족 행은 통째로 제외 (부분 차감 없음)
+    # ===============================
+    success, shortages = bulk_outbound(
+        valid_rows, operator=operator, batch_id=batch_id, policy=policy,
+    )
+    for r_i, err in shortages:
+        ctx.reject(r_i, err)
+
+    return {
+        "success": success,
+        "fail": ctx.failed,
+        "batch_id": batch_id,
+        "policy": policy,
+    }
+
+
 @router.post("")
-async def excel_outbound(
+def excel_outbound(
     operator: str = Form(""),
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    reimport: int = Form(0),
+    policy: str = Form("location"),
 ):
     """
-    출고 엑셀 업로드 (날짜 지정 지원)
+    출고 엑셀 업로드 (날짜 지정 지원, 백그라운드 작업 → job_id 즉시 반환)
 
     ✅ 필수 컬럼
       - 수량
@@ -72,7 +139,11 @@ async def excel_outbound(
     📌 규칙
       - 수량 > 0 : 재고 차감 + 이력
       - 수량 = 0 : 재고 변화 없음 + 이력
-      - 수량 < 0 : 에러
+      - 수량 < 0 : 에러 (작업 오류 목록에 기록)
+      - 값이 있는 창고/로케이션/브랜드/품번/LOT/규격이 정확히 일치하는 재고에서 차감 (품번 / 로케이션 / LOT / 규격 중 하나 필수)
+      - 할당 정책 policy: location(브랜드 → 품번 → 로케이션 순, 기본) / fifo(오래된 재고 먼저) / fewest(피킹 최소)
+      - 재고 부족 행: 해당 행 전체 제외 (부분 차감 없음), 정상 행은 단일 트랜잭션으로 일괄 반영
+      - 이미 반영된 동일 파일(SHA-256): 재반영 없이 기존 작업 결과 반환 (reimport=1: 재반영)
     """
 
     if not file.filename.lower().endswith((".xlsx", ".xlsm", ".xltx", ".xltm")):
@@ -81,152 +152,14 @@ async def excel_outbound(
             detail="엑셀(.xlsx) 파일만 업로드 가능합니다."
         )
 
-    batch_id = datetime.now().strftime("%Y%m%d_%H%M%S_excel_outbound")
-
-    data = await file.read()
-    wb = openpyxl.load_workbook(filename=io.BytesIO(data), data_only=True)
-    ws = wb.active
-
-    # ===============================
-    # HEADER
-    # ===============================
-    header_row = next(ws.iter_rows(min_row=1, max_row=1, values_only=True))
-    headers = [h for h in header_row]
-    idx = build_col_index(headers)
-
-    # 🔥 필수 컬럼: 수량만
-    if "수량" not in idx:
+    if policy not in OUTBOUND_POLICIES:
         raise HTTPException(
             status_code=400,
-            detail="필수 컬럼 누락: 수량"
+            detail=f"policy 는 {', '.join(OUTBOUND_POLICIES)} 중 하나입니다."
         )
 
-    success = 0
-    fail = 0
-    errors = []
-
-    # ===============================
-    # ROW LOOP
-    # ===============================
-    for r_i, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-        if row is None or all(v is None or str(v).strip() == "" for v in row):
-            continue
-
-        try:
-            # ---------------------------
-            # 값 추출 (전부 선택)
-            # ---------------------------
-            warehouse = str(row[idx["창고"]] or "").strip() if "창고" in idx else ""
-            location = str(row[idx["로케이션"]] or "").strip() if "로케이션" in idx else ""
-            brand = str(row[idx["브랜드"]] or "").strip() if "브랜드" in idx else ""
-            item_code = str(row[idx["품번"]] or "").strip() if "품번" in idx else ""
-            item_name = str(row[idx["품명"]] or "").strip() if "품명" in idx else ""
-            lot = str(row[idx["LOT"]] or "").strip() if "LOT" in idx else ""
-            spec = str(row[idx["규격"]] or "").strip() if "규격" in idx else ""
-            note = str(row[idx["비고"]] or "").strip() if "비고" in idx else ""
-
-            qty = _parse_qty(row[idx["수량"]])
-
-            # 📅 출고일 (선택)
-            out_date = None
-            if "출고일" in idx:
-                out_date = _parse_excel_date(row[idx["출고일"]])
-
-            if qty < 0:
-                raise ValueError("수량은 0 이상만 허용")
-
-            # ---------------------------
-            # INVENTORY (qty > 0)
-            # ---------------------------
-            if qty > 0:
-                rows = query_inventory(
-                    warehouse=warehouse or None,
-                    location=location or None,
-                    brand=brand or None,
-                    item_code=item_code or None,
-                    lot=lot or None,
-                    spec=spec or None,
-                )
-
-                if not rows:
-                    raise ValueError("출고 가능한 재고가 없습니다.")
-
-                remain = qty
-
-                for r in rows:
-                    if remain <= 0:
-                        break
-
-                    take = min(float(r["qty"]), remain)
-
-                    ok = upsert_inventory(
-                        r["warehouse"],
-                        r["location"],
-                        r["brand"],
-                        r["item_code"],
-                        r["item_name"],
-                        r["lot"],
-                        r["spec"],
-                        -take,
-                        note,
-                    )
-                    if not ok:
-                        raise ValueError("재고 차감 실패")
-
-                    add_history(
-                        "출고",
-                        r["warehouse"],
-                        operator,
-                        r["brand"],
-                        r["item_code"],
-                        r["item_name"],
-                        r["lot"],
-                        r["spec"],
-                        r["location"],
-                        "",
-                        take,
-                        note,
-                        batch_id=batch_id,
-                        created_at=out_date,   # 🔥 출고일 반영
-                    )
-
-                    remain -= take
-
-                if remain > 0:
-                    raise ValueError("출고 수량이 재고보다 많습니다.")
-
-            else:
-                # qty == 0 → 이력만 기록
-                add_history(
-                    "출고",
-                    warehouse,
-                    operator,
-                    brand,
-                    item_code,
-                    item_name,
-                    lot,
-                    spec,
-                    location,
-                    "",
-                    0,
-                    note,
-                    batch_id=batch_id,
-                    created_at=out_date,
-                )
-
-            success += 1
-
-        except Exception as e:
-            fail += 1
-            errors.append({
-                "row": r_i,
-                "error": str(e),
-            })
-
-    return {
-        "ok": True,
-        "success": success,
-        "fail": fail,
-        "batch_id": batch_id,
-        "errors": errors[:50],
-    }
+    return submit_upload_job(
+        "excel_outbound", file, _process, operator, policy,
+        batch_prefix=datetime.now().strftime("%Y%m%d_%H%M%S_excel_outbound"),
+        reimport=bool(reimport),
+    )
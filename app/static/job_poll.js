@@ -0,0 +1,19 @@
+// 백그라운드 작업 진행 조회 (/api/jobs/{id})
+// pollJob(statusUrl, onUpdate) → 완료/실패 시 최종 job 객체
+async function pollJob(statusUrl, onUpdate, intervalMs = 1000) {
+  while (true) {
+    const res = await fetch(statusUrl);
+    const job = await res.json();
+    if (onUpdate) onUpdate(job);
+    if (!res.ok || job.status === "done" || job.status === "failed") return job;
+    await new Promise((r) => setTimeout(r, intervalMs));
+  }
+}
+
+function formatJob(job) {
+  const total = job.total ? ` / ${job.total}` : "";
+  const eta = job.eta_seconds != null ? ` (남은 시간 약 ${Math.ceil(job.eta_seconds)}초)` : "";
+  const head = `[${job.status}] 처리 ${job.processed}${total}행, 실패 ${job.failed}행${eta}`;
+  const body = job.status === "failed" ? job.error : job.result;
+  return head + "\n\n" + JSON.stringify({ result: body, errors: job.errors }, null, 2);
+}
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import csv
+import io
+from typing import Any, Iterable, Iterator, Mapping, Sequence
+
+from fastapi.responses import StreamingResponse
+
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+
+_BATCH_ROWS = 1000
+
+
+def iter_csv(
+    rows: Iterable[Mapping[str, Any]],
+    columns: Sequence[tuple[str, str]],
+) -> Iterator[bytes]:
+    """rows(dict 이터러블) -> UTF-8 CSV 바이트 청크 (BOM 포함, 엑셀 한글 호환).
+    columns: [(key, header), ...]
+
+    - _BATCH_ROWS 행마다 한 청크로 인코딩해 전달 → 행 수와 무관하게 메모리 일정
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    keys = [key for key, _ in columns]
+
+    buf.write("\ufeff")
+    writer.writerow([header for _, header in columns])
+
+    n = 0
+    for r in rows:
+        writer.writerow([r.get(key, "") for key in keys])
+        n += 1
+        if n % _BATCH_ROWS == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+
+    tail = buf.getvalue()
+    if tail:
+        yield tail.encode("utf-8")
+
+
+def csv_response(
+    rows: Iterable[Mapping[str, Any]],
+    columns: Sequence[tuple[str, str]],
+    *,
+    filename: str,
+) -> StreamingResponse:
+    return StreamingResponse(
+        iter_csv(rows, columns),
+        media_type=CSV_MEDIA_TYPE,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"'
+        },
+    )
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import base64
+import json
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+# =====================================================
+# 키셋 페이지네이션 커서
+# - 마지막 행의 정렬 키 값을 base64url(JSON) 토큰으로 전달
+# - 클라이언트는 next_cursor 를 그대로 cursor 파라미터로 되돌려 보냄
+# =====================================================
+
+INVENTORY_CURSOR_KEYS = ("brand", "item_code", "location", "lot", "spec", "id")
+HISTORY_CURSOR_KEYS = ("created_at", "id")
+ERP_VERIFY_CURSOR_KEYS = ("seq",)
+
+# 커서 값으로 허용하는 타입 (SQLite 바인딩 가능한 스칼라 + None)
+_CURSOR_TYPES = (str, int, float)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps(list(values), ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: Optional[str], size: int) -> Optional[List[Any]]:
+    """
+    빈 토큰: None (첫 페이지)
+    형식 오류 (개수 / 값 타입 불일치 포함): ValueError
+    """
+    token = (token or "").strip()
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw.decode("utf-8"))
+    except Exception:
+        raise ValueError("잘못된 커서입니다.")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("잘못된 커서입니다.")
+    if not all(v is None or isinstance(v, _CURSOR_TYPES) for v in values):
+        raise ValueError("잘못된 커서입니다.")
+    return values
+
+
+def next_cursor(rows: Sequence[Any], limit: int, keys: Sequence[str]) -> Optional[str]:
+    """
+    한 페이지가 가득 찼을 때만 다음 커서 반환 (마지막 페이지: None)
+    """
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor([last[k] for k in keys])
+
+
+def page_payload(rows: List[Dict[str, Any]], limit: int, keys: Sequence[str]) -> Dict[str, Any]:
+    return {"rows": rows, "next_cursor": next_cursor(rows, limit, keys)}
+
+
+def iter_pages(
+    fetch: Callable[[Optional[List[Any]], int], Sequence[Any]],
+    keys: Sequence[str],
+    page_size: int = 2000,
+) -> Iterator[Any]:
+    """
+    키셋 페이지 단위로 전체 결과 순회 (다운로드용)
+    fetch(after, limit) → 한 페이지 rows
+    - 페이지마다 짧은 조회 → 긴 읽기 트랜잭션 없이 메모리 일정
+    """
+    after: Optional[List[Any]] = None
+    while True:
+        rows = fetch(after, page_size)
+        yield from rows
+        if len(rows) < page_size:
+            return
+        last = rows[-1]
+        after = [last[k] for k in keys]
@@ -2,8 +2,15 @@
 from __future__ import annotations
 
 import io
-from typing import Any, Dict, List, Tuple
-import openpyxl
+import os
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from app.utils.excel_reader import ExcelRowStream, ExcelSource
+
+try:
+    import numpy as np
+except ImportError:  # 선택 의존성 → 없으면 순수 Python 엔진만 사용
+    np = None
 
 
 def _s(v: Any) -> str:
@@ -23,29 +30,18 @@ def _to_float(v: Any) -> float:
             return 0.0
 
 
-def parse_erp_excel_bytes(data: bytes) -> List[Dict[str, Any]]:
-    """
-    필수: 품번(또는 제품코드), 수량(또는 현재고)
-    선택: LOT, 규격
-    반환: [{item_code, lot, spec, qty}, ...]
-    """
-    wb = openpyxl.load_workbook(filename=io.BytesIO(data), data_only=True)
-    ws = wb.active
+_CODE_KEYS = ["품번", "제품코드", "상품코드", "품목코드", "ITEMCODE", "CODE", "ITEM_CODE"]
+_LOT_KEYS = ["LOT", "로트", "LOTNO", "LOT번호", "LOTNO."]
+_SPEC_KEYS = ["규격", "SPEC", "사이즈", "SIZE"]
+_QTY_KEYS = ["수량", "현재고", "재고", "QTY", "수량EA", "수량(EA)"]
 
-    header = None
-    for r in ws.iter_rows(min_row=1, max_row=1, values_only=True):
-        header = list(r)
-        break
-    if not header:
-        return []
 
+def _erp_col_index(header: List[Any]) -> Dict[str, int]:
+    """
+    ERP 헤더 → {item_code, lot, spec, qty: 컬럼 인덱스} (없는 컬럼은 제외)
+    """
     headers = {(_s(h).replace(" ", "")): idx for idx, h in enumerate(header) if _s(h)}
 
-    code_keys = ["품번", "제품코드", "상품코드", "품목코드", "ITEMCODE", "CODE", "ITEM_CODE"]
-    lot_keys = ["LOT", "로트", "LOTNO", "LOT번호", "LOTNO."]
-    spec_keys = ["규격", "SPEC", "사이즈", "SIZE"]
-    qty_keys = ["수량", "현재고", "재고", "QTY", "수량EA", "수량(EA)"]
-
     def pick(keys: List[str]):
         for k in keys:
             k2 = _s(k).replace(" ", "")
@@ -53,34 +49,54 @@ def parse_erp_excel_bytes(data: bytes) -> List[Dict[str, Any]]:
                 return headers[k2]
         return None
 
-    i_code = pick(code_keys)
-    i_lot = pick(lot_keys)
-    i_spec = pick(spec_keys)
-    i_qty = pick(qty_keys)
+    picked = {
+        "item_code": pick(_CODE_KEYS),
+        "lot": pick(_LOT_KEYS),
+        "spec": pick(_SPEC_KEYS),
+        "qty": pick(_QTY_KEYS),
+    }
+    return {k: i for k, i in picked.items() if i is not None}
 
-    if i_code is None or i_qty is None:
-        raise ValueError("엑셀 헤더에 '품번/제품코드' 또는 '수량/현재고' 컬럼이 없습니다.")
 
-    rows: List[Dict[str, Any]] = []
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        if not row:
-            continue
-        code = _s(row[i_code]) if i_code < len(row) else ""
-        if not code:
-            continue
+def parse_erp_excel(src: ExcelSource) -> List[Dict[str, Any]]:
+    """
+    필수: 품번(또는 제품코드), 수량(또는 현재고)
+    선택: LOT, 규격
+    반환: [{item_code, lot, spec, qty}, ...]
+
+    src: 파일 경로 또는 파일 객체(UploadFile.file) → read_only 스트리밍
+    """
+    with ExcelRowStream(src, header_map=_erp_col_index) as sheet:
+        if not sheet.headers:
+            return []
 
-        lot = _s(row[i_lot]) if (i_lot is not None and i_lot < len(row)) else ""
-        spec = _s(row[i_spec]) if (i_spec is not None and i_spec < len(row)) else ""
-        qty = _to_float(row[i_qty]) if i_qty < len(row) else 0.0
+        if "item_code" not in sheet.idx or "qty" not in sheet.idx:
+            raise ValueError("엑셀 헤더에 '품번/제품코드' 또는 '수량/현재고' 컬럼이 없습니다.")
 
-        if qty == 0:
-            continue
+        rows: List[Dict[str, Any]] = []
+        for _, row in sheet:
+            code = _s(row["item_code"])
+            if not code:
+                continue
+
+            qty = _to_float(row["qty"])
+            if qty == 0:
+                continue
 
-        rows.append({"item_code": code, "lot": lot, "spec": spec, "qty": qty})
+            rows.append({
+                "item_code": code,
+                "lot": _s(row.get("lot")),
+                "spec": _s(row.get("spec")),
+                "qty": qty,
+            })
 
     return rows
 
 
+def parse_erp_excel_bytes(data: bytes) -> List[Dict[str, Any]]:
+    return parse_erp_excel(io.BytesIO(data))
+
+
 def make_compare_key(item_code: str, lot: str, spec: str) -> Tuple[str, Tuple[str, ...]]:
     """
     1) 품번+LOT+규격
@@ -99,3 +115,327 @@ def make_compare_key(item_code: str, lot: str, spec: str) -> Tuple[str, Tuple[st
     if s:
         return "L2_SPEC", (c, s)
     return "L1", (c,)
+
+
+# =====================================================
+# ERP ↔ WMS 대조 엔진 (품번별 버킷)
+# - 행 목록을 1회 순회해 {품번: {비교단위: {키: 수량}}} 로 묶음
+# - 대조는 품번 버킷 안에서만 → O(행 수), 품번 × 전체 키 스캔 없음
+# =====================================================
+
+COMPARE_MODES = ("L3", "L2_LOT", "L2_SPEC", "L1")
+
+# {item_code: {mode: {key: qty}}}
+CompareBuckets = Dict[str, Dict[str, Dict[Tuple[str, ...], float]]]
+
+ROLLUP_NOTE = "관리단위(LOT/규격) 불일치로 품번 단위 합산 비교"
+
+# 결과 상태 → 저장용 kind (검증 결과 필터)
+STATUS_KINDS = {
+    "✅ 일치": "match",
+    "⚠️ 차이": "diff",
+    "❌ WMS 없음": "wms_missing",
+    "❌ ERP 없음": "erp_missing",
+}
+
+# 조회 / 다운로드 필터 → kind 목록 (None: 전체)
+VERIFY_FILTERS: Dict[str, Any] = {
+    "all": None,
+    "mismatch": ("diff", "wms_missing", "erp_missing"),
+    "diff": ("diff",),
+    "missing": ("wms_missing", "erp_missing"),
+}
+
+# 검증 결과 서버 보관 시간
+ERP_VERIFY_TTL_HOURS = float(os.getenv("ERP_VERIFY_TTL_HOURS", "24"))
+
+
+def row_kind(row: Dict[str, Any]) -> str:
+    return STATUS_KINDS.get(row["status"], "none")
+
+
+def bucket_compare_rows(rows: Iterable[Dict[str, Any]]) -> CompareBuckets:
+    """
+    [{item_code, lot, spec, qty}, ...] → 품번별 버킷
+    - 행 1개는 단위별로 1번씩 합산: L1 항상 / L2_LOT(LOT) / L2_SPEC(규격) / L3(LOT+규격)
+    """
+    buckets: CompareBuckets = {}
+    for r in rows:
+        code = _s(r.get("item_code"))
+        if not code:
+            continue
+        lot = _s(r.get("lot"))
+        spec = _s(r.get("spec"))
+        qty = float(r.get("qty") or 0)
+
+        b = buckets.get(code)
+        if b is None:
+            b = buckets[code] = {"L1": {(code,): 0.0}}
+        b["L1"][(code,)] += qty
+
+        if lot:
+            m = b.setdefault("L2_LOT", {})
+            m[(code, lot)] = m.get((code, lot), 0.0) + qty
+        if spec:
+            m = b.setdefault("L2_SPEC", {})
+            m[(code, spec)] = m.get((code, spec), 0.0) + qty
+        if lot and spec:
+            m = b.setdefault("L3", {})
+            m[(code, lot, spec)] = m.get((code, lot, spec), 0.0) + qty
+    return buckets
+
+
+def _choose_mode(e: Dict[str, Any], w: Dict[str, Any]) -> str:
+    """양쪽 모두 가진 가장 상세한 비교단위 (없으면 품번 단위)"""
+    for mode in ("L3", "L2_LOT", "L2_SPEC"):
+        if mode in e and mode in w:
+            return mode
+    return "L1"
+
+
+def _new_summary() -> Dict[str, int]:
+    return {"total": 0, "match": 0, "diff": 0, "wms_missing": 0, "erp_missing": 0, "rollup": 0}
+
+
+def _result_row(
+    summary: Dict[str, int], mode: str, code: str, lot: str, spec: str,
+    erp_qty: float, wms_qty: float, note: str,
+) -> Dict[str, Any]:
+    """결과 1행 + summary 집계 (엔진 공용)"""
+    diff = erp_qty - wms_qty
+
+    if erp_qty > 0 and wms_qty > 0:
+        if abs(diff) < 1e-9:
+            status = "✅ 일치"; summary["match"] += 1
+        else:
+            status = "⚠️ 차이"; summary["diff"] += 1
+    elif erp_qty > 0 and wms_qty == 0:
+        status = "❌ WMS 없음"; summary["wms_missing"] += 1
+    elif erp_qty == 0 and wms_qty > 0:
+        status = "❌ ERP 없음"; summary["erp_missing"] += 1
+    else:
+        status = "—"
+
+    if note:
+        summary["rollup"] += 1
+    summary["total"] += 1
+
+    return {
+        "status": status, "mode": mode, "item_code": code,
+        "lot": lot, "spec": spec,
+        "erp_qty": round(erp_qty, 3), "wms_qty": round(wms_qty, 3),
+        "diff": round(diff, 3), "note": note
+    }
+
+
+def compare_buckets(erp: CompareBuckets, wms: CompareBuckets) -> Dict[str, Any]:
+    """
+    품번별 버킷 대조 → {"summary": {...}, "rows": [...]}
+    - 품번 오름차순, 품번 안에서는 키 오름차순
+    """
+    summary = _new_summary()
+    out_rows: List[Dict[str, Any]] = []
+    empty: Dict[str, Dict[Tuple[str, ...], float]] = {}
+
+    for code in sorted(erp.keys() | wms.keys()):
+        e = erp.get(code, empty)
+        w = wms.get(code, empty)
+        mode = _choose_mode(e, w)
+
+        # 한쪽이라도 L1 외 단위가 있는데 L1 로 내려온 경우 = 합산 비교
+        did_rollup = mode == "L1" and bool(e) and bool(w) and (len(e) > 1 or len(w) > 1)
+        note = ROLLUP_NOTE if did_rollup else ""
+
+        e_map = e.get(mode, empty)
+        w_map = w.get(mode, empty)
+
+        for key in sorted(e_map.keys() | w_map.keys()):
+            lot = ""
+            spec = ""
+            if mode == "L3":
+                _, lot, spec = key
+            elif mode == "L2_LOT":
+                _, lot = key
+            elif mode == "L2_SPEC":
+                _, spec = key
+
+            out_rows.append(_result_row(
+                summary, mode, code, lot, spec,
+                float(e_map.get(key, 0.0)), float(w_map.get(key, 0.0)), note,
+            ))
+
+    return {"summary": summary, "rows": out_rows}
+
+
+# =====================================================
+# NumPy 엔진 (선택)
+# - (품번, LOT, 규격) 정수 코드화 → 단위별 bincount 합산 → 비교단위 / 정렬 일괄 계산
+# - 합산은 행 순서 그대로 누적 → 순수 Python 엔진과 결과 동일
+# - ERP_VERIFY_ENGINE: auto(기본, NumPy 있으면 사용) / numpy / python
+# =====================================================
+
+ERP_VERIFY_ENGINE = os.getenv("ERP_VERIFY_ENGINE", "auto").strip().lower()
+
+
+def _columns(rows: Iterable[Dict[str, Any]]) -> Tuple[List[str], List[str], List[str], List[float]]:
+    codes: List[str] = []
+    lots: List[str] = []
+    specs: List[str] = []
+    qtys: List[float] = []
+    for r in rows:
+        code = _s(r.get("item_code"))
+        if not code:
+            continue
+        codes.append(code)
+        lots.append(_s(r.get("lot")))
+        specs.append(_s(r.get("spec")))
+        qtys.append(float(r.get("qty") or 0))
+    return codes, lots, specs, qtys
+
+
+def _factorize(values: Iterable[Any], count: int):
+    """값 → 등장 순서 정수 코드 (ids, 고유값 목록)"""
+    index: Dict[Any, int] = {}
+    ids = np.fromiter((index.setdefault(v, len(index)) for v in values), dtype=np.int64, count=count)
+    return ids, list(index)
+
+
+def _ranks(values: Sequence[str]):
+    """고유값 목록 → 문자열 정렬 순위 (Python 정렬 기준, 순수 Python 엔진과 동일 순서)"""
+    order = sorted(range(len(values)), key=values.__getitem__)
+    rank = np.empty(len(values), dtype=np.int64)
+    rank[order] = np.arange(len(values))
+    return rank
+
+
+def compare_rows_numpy(erp_rows: Iterable[Dict[str, Any]], wms_rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """compare_buckets(bucket_compare_rows(erp), bucket_compare_rows(wms)) 와 같은 결과"""
+    return _compare_columns(_columns(erp_rows), _columns(wms_rows))
+
+
+def _compare_columns(e_cols, w_cols) -> Dict[str, Any]:
+    n_e = len(e_cols[0])
+    codes, lots, specs, qtys = (a + b for a, b in zip(e_cols, w_cols))
+    n = len(codes)
+    if n == 0:
+        return {"summary": _new_summary(), "rows": []}
+
+    qty = np.asarray(qtys, dtype=np.float64)
+    is_erp = np.zeros(n, dtype=bool)
+    is_erp[:n_e] = True
+
+    # 1) 정수 코드화: 행 → (품번, LOT, 규격) 그룹 → 품번 / LOT / 규격
+    g_of_row, g_keys = _factorize(zip(codes, lots, specs), n)
+    n_g = len(g_keys)
+    g_code, g_lot, g_spec = (list(c) for c in zip(*g_keys))
+    code_of_g, code_vals = _factorize(g_code, n_g)
+    lot_of_g, lot_vals = _factorize(g_lot, n_g)
+    spec_of_g, spec_vals = _factorize(g_spec, n_g)
+    has_lot = np.fromiter((v != "" for v in g_lot), dtype=bool, count=n_g)
+    has_spec = np.fromiter((v != "" for v in g_spec), dtype=bool, count=n_g)
+
+    # 빈 문자열도 정렬 순위 필요 (L1 / L2 키의 빈 LOT·규격)
+    lot_vals.append("")
+    spec_vals.append("")
+    empty_lot = len(lot_vals) - 1
+    empty_spec = len(spec_vals) - 1
+    code_rank, lot_rank, spec_rank = _ranks(code_vals), _ranks(lot_vals), _ranks(spec_vals)
+    n_codes = len(code_vals)
+    code_of_row = code_of_g[g_of_row]
+
+    # 2) 비교단위별 키 (그룹 → 키, 해당 단위 아니면 -1)
+    units = {}
+    for mode, valid in (
+        ("L3", has_lot & has_spec),
+        ("L2_LOT", has_lot),
+        ("L2_SPEC", has_spec),
+        ("L1", np.ones(n_g, dtype=bool)),
+    ):
+        lot_part = np.where(mode in ("L3", "L2_LOT"), lot_of_g, empty_lot)
+        spec_part = np.where(mode in ("L3", "L2_SPEC"), spec_of_g, empty_spec)
+        key_of_g = np.full(n_g, -1, dtype=np.int64)
+        sel = np.flatnonzero(valid)
+        key_ids, key_vals = _factorize(
+            zip(code_of_g[sel].tolist(), lot_part[sel].tolist(), spec_part[sel].tolist()), len(sel),
+        )
+        key_of_g[sel] = key_ids
+        n_keys = len(key_vals)
+
+        key_of_row = key_of_g[g_of_row]
+        in_unit = key_of_row >= 0
+        sums = {}
+        present = {}
+        for side, mask in (("erp", is_erp), ("wms", ~is_erp)):
+            m = in_unit & mask
+            sums[side] = np.bincount(key_of_row[m], weights=qty[m], minlength=n_keys)
+            present[side] = np.bincount(code_of_row[m], minlength=n_codes) > 0
+
+        key_arr = np.asarray(key_vals, dtype=np.int64).reshape(-1, 3)
+        units[mode] = (key_arr, sums, present)
+
+    # 3) 품번별 비교단위 선택 (양쪽 모두 가진 가장 상세한 단위)
+    mode_names = ("L3", "L2_LOT", "L2_SPEC", "L1")
+    both = [units[m][2]["erp"] & units[m][2]["wms"] for m in mode_names[:3]]
+    mode_of_code = np.select(both, [0, 1, 2], 3)
+
+    n_units_e = sum(units[m][2]["erp"].astype(np.int64) for m in mode_names)
+    n_units_w = sum(units[m][2]["wms"].astype(np.int64) for m in mode_names)
+    rollup = (mode_of_code == 3) & (n_units_e > 0) & (n_units_w > 0) & ((n_units_e > 1) | (n_units_w > 1))
+
+    # 4) 선택된 단위의 키만 모아 (품번, LOT, 규격) 순 정렬
+    parts = []
+    for mi, mode in enumerate(mode_names):
+        key_arr, sums, _ = units[mode]
+        sel = np.flatnonzero(mode_of_code[key_arr[:, 0]] == mi)
+        parts.append((np.full(len(sel), mi), key_arr[sel], sums["erp"][sel], sums["wms"][sel]))
+
+    mode_idx = np.concatenate([p[0] for p in parts])
+    keys = np.concatenate([p[1] for p in parts])
+    erp_q = np.concatenate([p[2] for p in parts])
+    wms_q = np.concatenate([p[3] for p in parts])
+    order = np.lexsort((spec_rank[keys[:, 2]], lot_rank[keys[:, 1]], code_rank[keys[:, 0]]))
+
+    summary = _new_summary()
+    out_rows: List[Dict[str, Any]] = []
+    for mi, (c, l, sp), e, w in zip(
+        mode_idx[order].tolist(), keys[order].tolist(), erp_q[order].tolist(), wms_q[order].tolist(),
+    ):
+        out_rows.append(_result_row(
+            summary, mode_names[mi], code_vals[c], lot_vals[l], spec_vals[sp],
+            e, w, ROLLUP_NOTE if rollup[c] else "",
+        ))
+
+    return {"summary": summary, "rows": out_rows}
+
+
+class CompareSide:
+    """
+    한쪽(WMS) 대조 입력 + 엔진별 전처리 결과 (최초 사용 시 계산 후 보관)
+    - 같은 객체를 재사용하면 반복 검증 시 집계 / 버킷 구성 생략
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.rows = rows
+        self._buckets: CompareBuckets | None = None
+        self._columns = None
+
+    @property
+    def buckets(self) -> CompareBuckets:
+        if self._buckets is None:
+            self._buckets = bucket_compare_rows(self.rows)
+        return self._buckets
+
+    @property
+    def columns(self):
+        if self._columns is None:
+            self._columns = _columns(self.rows)
+        return self._columns
+
+
+def compare_rows(erp_rows: Iterable[Dict[str, Any]], wms: CompareSide | Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """ERP 행 ↔ WMS 행 대조 (ERP_VERIFY_ENGINE 에 따라 NumPy / 순수 Python)"""
+    if not isinstance(wms, CompareSide):
+        wms = CompareSide(list(wms))
+    if np is not None and ERP_VERIFY_ENGINE != "python":
+        return _compare_columns(_columns(erp_rows), wms.columns)
+    return compare_buckets(bucket_compare_rows(erp_rows), wms.buckets)
@@ -1,38 +1,69 @@
 from __future__ import annotations
 
-from io import BytesIO
-from typing import Iterable, Mapping, Sequence, Any
+import tempfile
+from typing import Any, Iterable, Iterator, Mapping, Sequence
 
+from fastapi.responses import StreamingResponse
 from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
 
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
-def rows_to_xlsx_bytes(
+_CHUNK_SIZE = 64 * 1024
+
+
+def iter_xlsx(
     rows: Iterable[Mapping[str, Any]],
     columns: Sequence[tuple[str, str]],
     sheet_name: str = "Sheet1",
-) -> bytes:
-    """rows(list[dict]) -> xlsx bytes.
+) -> Iterator[bytes]:
+    """rows(dict 이터러블) -> xlsx 바이트 청크.
     columns: [(key, header), ...]
+
+    - write_only 워크북: 행을 바로 임시 파일로 기록 (셀 객체 누적 없음)
+    - 완성된 파일을 청크 단위로 전달 → 행 수와 무관하게 메모리 일정
+    - rows 는 제너레이터 그대로 전달 가능 (첫 청크 요청 시 끝까지 소비)
     """
-    wb = Workbook()
-    ws = wb.active
-    ws.title = sheet_name[:31]
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_name[:31])
 
     # header
-    for c, (_, header) in enumerate(columns, start=1):
-        ws.cell(row=1, column=c, value=header)
+    ws.append([header for _, header in columns])
 
     # body
-    for r_idx, r in enumerate(rows, start=2):
-        for c, (key, _) in enumerate(columns, start=1):
-            ws.cell(row=r_idx, column=c, value=r.get(key, ""))
-
-    # simple auto-width
-    for c in range(1, len(columns) + 1):
-        col_letter = get_column_letter(c)
-        ws.column_dimensions[col_letter].width = max(10, min(35, ws.column_dimensions[col_letter].width or 10))
-
-    bio = BytesIO()
-    wb.save(bio)
-    return bio.getvalue()
+    keys = [key for key, _ in columns]
+    for r in rows:
+        ws.append([r.get(key, "") for key in keys])
+
+    with tempfile.TemporaryFile() as tmp:
+        wb.save(tmp)
+        tmp.seek(0)
+        while True:
+            chunk = tmp.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def rows_to_xlsx_bytes(
+    rows: Iterable[Mapping[str, Any]],
+    columns: Sequence[tuple[str, str]],
+    sheet_name: str = "Sheet1",
+) -> bytes:
+    """rows(list[dict]) -> xlsx bytes. (소량 데이터용, 다운로드는 xlsx_response 사용)"""
+    return b"".join(iter_xlsx(rows, columns, sheet_name))
+
+
+def xlsx_response(
+    rows: Iterable[Mapping[str, Any]],
+    columns: Sequence[tuple[str, str]],
+    *,
+    filename: str,
+    sheet_name: str = "Sheet1",
+) -> StreamingResponse:
+    return StreamingResponse(
+        iter_xlsx(rows, columns, sheet_name),
+        media_type=XLSX_MEDIA_TYPE,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"'
+        },
+    )
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import openpyxl
+
+from app.utils.excel_kor_columns import build_col_index
+
+# =====================================================
+# 엑셀 스트리밍 리더 (read_only 모드)
+# - 업로드 파일은 UploadFile.file(SpooledTemporaryFile) 그대로 전달
+#   → await file.read() 로 전체를 메모리에 올리지 않음
+# - 시트는 행 단위로 읽고 버림 → 파일 크기와 무관하게 메모리 일정
+# =====================================================
+
+ExcelSource = Union[str, BinaryIO]
+
+
+def cell_str(v: Any) -> str:
+    return ("" if v is None else str(v)).strip()
+
+
+def _is_blank(row) -> bool:
+    return row is None or all(v is None or str(v).strip() == "" for v in row)
+
+
+@contextmanager
+def open_sheet(src: ExcelSource) -> Iterator[Any]:
+    """
+    첫 번째(활성) 시트를 read_only 로 열기
+    - 위치 기반(A/B/C…) 컬럼 파일용
+    """
+    if hasattr(src, "seek"):
+        src.seek(0)
+    wb = openpyxl.load_workbook(src, read_only=True, data_only=True)
+    try:
+        yield wb.active
+    finally:
+        wb.close()
+
+
+class ExcelRowStream:
+    """
+    헤더 기반 행 스트림
+
+        with ExcelRowStream(file.file) as sheet:
+            if "수량" not in sheet.idx: ...
+            for rownum, row in sheet:
+                row.get("품번")
+
+    - idx: header_map(헤더 리스트) 결과 {정규화 컬럼명: 컬럼 인덱스}
+    - row: {정규화 컬럼명: 원본 셀 값} (빈 행은 건너뜀)
+    - total: 시트 dimension 기준 데이터 행 수 추정 (없으면 None, 빈 행 포함)
+    """
+
+    def __init__(
+        self,
+        src: ExcelSource,
+        *,
+        header_map: Callable[[List[Any]], Dict[str, int]] = build_col_index,
+    ):
+        if hasattr(src, "seek"):
+            src.seek(0)
+        self._wb = openpyxl.load_workbook(src, read_only=True, data_only=True)
+        ws = self._wb.active
+        self._rows = ws.iter_rows(values_only=True)
+        self.total: Optional[int] = max(ws.max_row - 1, 0) if ws.max_row else None
+
+        header: Optional[tuple] = next(self._rows, None)
+        self.headers: List[Any] = list(header or [])
+        self.idx: Dict[str, int] = header_map(self.headers) if self.headers else {}
+
+    def __iter__(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        idx = self.idx
+        for rownum, row in enumerate(self._rows, start=2):
+            if _is_blank(row):
+                continue
+            n = len(row)
+            yield rownum, {k: (row[i] if i < n else None) for k, i in idx.items()}
+
+    def close(self) -> None:
+        self._wb.close()
+
+    def __enter__(self) -> "ExcelRowStream":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
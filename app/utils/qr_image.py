@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import qrcode
+
+from app.core.paths import DATA_DIR
+
+# =====================================================
+# QR 이미지 캐시 (라벨 미리보기 공용)
+# - 키: sha256(라벨 규격 + QR 내용) → 같은 라벨 재출력 시 재생성 없음
+# - 1차: 메모리 LRU (QR_CACHE_SIZE, 기본 10,000개)
+# - 2차: 디스크 DATA_DIR/qr_cache (QR_DISK_CACHE=1 일 때만)
+# =====================================================
+
+QR_CACHE_SIZE = int(os.getenv("QR_CACHE_SIZE", "10000"))
+QR_DISK_CACHE = os.getenv("QR_DISK_CACHE", "0").strip().lower() in {"1", "true", "yes", "y", "on"}
+QR_CACHE_DIR = DATA_DIR / "qr_cache"
+
+# 대량 라벨: 캐시 미적중 QR 을 프로세스 풀에서 병렬 생성
+# - QR_WORKERS: 워커 프로세스 수 (기본 CPU 수, 최대 8)
+# - QR_PARALLEL_MIN: 미적중 수가 이보다 적으면 요청 스레드에서 바로 생성
+QR_WORKERS = max(1, int(os.getenv("QR_WORKERS", str(min(os.cpu_count() or 1, 8)))))
+QR_PARALLEL_MIN = int(os.getenv("QR_PARALLEL_MIN", "64"))
+
+
+def render_qr_png(payload: str) -> bytes:
+    qr = qrcode.make(payload)
+    buffer = BytesIO()
+    qr.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class QrImageCache:
+    """payload + spec → base64 PNG (메모리 LRU + 선택적 디스크)"""
+
+    def __init__(self, max_size: int = QR_CACHE_SIZE, disk_dir: Optional[Path] = None):
+        self.max_size = max_size
+        self.disk_dir = disk_dir
+        self._items: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(payload: str, spec: str = "") -> str:
+        return hashlib.sha256(f"{spec}\0{payload}".encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.png"
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            b64 = self._items.get(key)
+            if b64 is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return b64
+
+        if self.disk_dir is not None:
+            path = self._disk_path(key)
+            if path.exists():
+                b64 = base64.b64encode(path.read_bytes()).decode()
+                with self._lock:
+                    self.disk_hits += 1
+                self._remember(key, b64)
+                return b64
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _remember(self, key: str, b64: str) -> None:
+        with self._lock:
+            self._items[key] = b64
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def put(self, key: str, png: bytes) -> str:
+        b64 = base64.b64encode(png).decode()
+        self._remember(key, b64)
+
+        if self.disk_dir is not None:
+            path = self._disk_path(key)
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(".tmp")
+                tmp.write_bytes(png)
+                tmp.replace(path)
+            except OSError:
+                pass   # 디스크 캐시는 보조 수단 → 실패해도 무시
+        return b64
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._items),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "disk": self.disk_dir is not None,
+            }
+
+
+qr_cache = QrImageCache(disk_dir=QR_CACHE_DIR if QR_DISK_CACHE else None)
+
+
+def qr_base64(payload: str, spec: str = "") -> str:
+    """QR 내용 → base64 PNG (캐시 우선)"""
+    key = QrImageCache.key(payload, spec)
+    b64 = qr_cache.get(key)
+    if b64 is None:
+        b64 = qr_cache.put(key, render_qr_png(payload))
+    return b64
+
+
+# 워커 수별 프로세스 풀 (보통 QR_WORKERS 하나)
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """워커 프로세스 풀 (워커 수별 최초 대량 요청 시 생성, spawn: 서버 스레드 상태 비공유)"""
+    with _pool_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return pool
+
+
+def _reset_pool(workers: int) -> None:
+    with _pool_lock:
+        pool = _pools.pop(workers, None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def render_qr_pngs(payloads: Sequence[str], workers: int = QR_WORKERS) -> List[bytes]:
+    """QR 여러 개 생성 (입력 순서 유지), workers 개 프로세스에 워커 수 × 4 청크로 분배"""
+    if workers <= 1 or len(payloads) < QR_PARALLEL_MIN:
+        return [render_qr_png(p) for p in payloads]
+    chunksize = max(1, len(payloads) // (workers * 4))
+    try:
+        return list(_get_pool(workers).map(render_qr_png, payloads, chunksize=chunksize))
+    except BrokenProcessPool:
+        _reset_pool(workers)   # 워커 비정상 종료 → 다음 요청에서 새 풀, 이번 요청은 직접 생성
+        return [render_qr_png(p) for p in payloads]
+
+
+def qr_base64_many(payloads: Sequence[str], spec: str = "") -> List[str]:
+    """
+    QR 내용 목록 → base64 PNG 목록 (입력 순서 유지)
+    - 캐시 적중은 그대로, 미적중(중복 제거)만 모아서 병렬 생성 후 캐시 저장
+    """
+    keys = [QrImageCache.key(p, spec) for p in payloads]
+    out: List[Optional[str]] = [qr_cache.get(k) for k in keys]
+
+    missing: Dict[str, str] = {}
+    for k, p, b64 in zip(keys, payloads, out):
+        if b64 is None:
+            missing.setdefault(k, p)
+
+    if missing:
+        pngs = render_qr_pngs(list(missing.values()))
+        rendered = {k: qr_cache.put(k, png) for k, png in zip(missing, pngs)}
+        out = [b64 if b64 is not None else rendered[k] for k, b64 in zip(keys, out)]
+
+    return out
@@ -0,0 +1,72 @@
+"""
+add_history 중복 체크 벤치마크 (이력 건수 증가에 따른 건당 비용)
+
+- no-index : idx_history_dedup 제거 (created_at 인덱스만 사용)
+- indexed  : idx_history_dedup seek
+
+이력을 size 건 미리 채운 뒤(최근 5초 이내 created_at 다수 포함) add_history 반복
+
+실행: python -m bench.bench_add_history [반복횟수]
+"""
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import app.db as db
+
+SIZES = (10_000, 100_000, 500_000)
+
+
+def _prefill(size: int) -> None:
+    now = datetime.now().isoformat(timespec="seconds")
+    rows = (
+        (
+            "입고", "MAIN", "bench", "BR", f"P{i % 5000:05d}", "품명", "LOT1", "S1",
+            "", f"A{i % 50:02d}-01", 1, "", None, now,
+        )
+        for i in range(size)
+    )
+    with db.db_conn() as conn:
+        conn.executemany(db._HISTORY_INSERT_SQL, rows)
+
+
+def _ops(n: int) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        db.add_history(
+            "출고", "MAIN", "bench", "BR", f"X{i:06d}", "품명", "LOT1", "S1",
+            "B01-01", "출고", 1,
+        )
+    return n / (time.perf_counter() - start)
+
+
+def _run(path: Path, size: int, indexed: bool, n: int) -> float:
+    db.DB_PATH = path
+    db.close_thread_db()
+    try:
+        db.init_db()
+        if not indexed:
+            with db.db_conn() as conn:
+                conn.execute("DROP INDEX idx_history_dedup")
+        _prefill(size)
+        return _ops(n)
+    finally:
+        db.close_thread_db()
+
+
+def main(n: int = 1000) -> None:
+    print(f"add_history x{n} (dedup 5s)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in SIZES:
+            before = _run(Path(tmp) / f"plain_{size}.db", size, False, n)
+            after = _run(Path(tmp) / f"dedup_{size}.db", size, True, n)
+            print(
+                f"  history {size:>8,}: no-index {before:9.1f} ops/sec"
+                f" | indexed {after:9.1f} ops/sec"
+            )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,74 @@
+"""
+커넥션 관리 벤치마크 (수기 입고 1건 = upsert_inventory + add_history + get_inventory_one)
+
+- legacy : 호출마다 connect/close, 기본 rollback journal
+- pooled : db_conn() 스레드별 재사용 커넥션 + WAL
+
+실행: python -m bench.bench_db_conn [반복횟수]
+"""
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import app.db as db
+
+
+@contextmanager
+def _legacy_conn():
+    conn = sqlite3.connect(str(db.DB_PATH))
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def _inbound_ops(n: int) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        loc = f"A{i % 50:02d}-01"
+        code = f"P{i % 500:05d}"
+        db.upsert_inventory("MAIN", loc, "BR", code, "품명", "LOT1", "S1", 1)
+        db.add_history(
+            "입고", "MAIN", "bench", "BR", code, "품명", "LOT1", "S1",
+            "입고", loc, 1, dedup_seconds=0,
+        )
+        db.get_inventory_one("MAIN", loc, "BR", code, "LOT1", "S1")
+    return n / (time.perf_counter() - start)
+
+
+def _run(path: Path, legacy: bool, n: int) -> float:
+    orig_conn = db.db_conn
+    db.DB_PATH = path
+    db.close_thread_db()
+    if legacy:
+        db.db_conn = _legacy_conn
+    try:
+        db.init_db()
+        return _inbound_ops(n)
+    finally:
+        db.db_conn = orig_conn
+        db.close_thread_db()
+
+
+def main(n: int = 2000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        before = _run(Path(tmp) / "legacy.db", True, n)
+        after = _run(Path(tmp) / "pooled.db", False, n)
+
+    print(f"inbound ops x{n}")
+    print(f"  legacy (connect/close, rollback journal): {before:10.1f} ops/sec")
+    print(f"  pooled (thread-local, WAL)              : {after:10.1f} ops/sec")
+    print(f"  speedup: x{after / before:.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,121 @@
+"""
+ERP 재고 검증 벤치마크 (합성 ERP 파일 행 기준)
+
+- legacy : 품번마다 단위별 전체 키 스캔 (기존 keys_for_code, O(품번 × 키))
+- bucket : 품번별 버킷 1회 구성 후 버킷 단위 대조 (bucket_compare_rows / compare_buckets)
+- numpy  : 정수 코드화 + bincount 일괄 집계 (compare_rows_numpy, NumPy 설치 시)
+
+legacy 는 느려서 앞쪽 일부 행(기본 10,000)만 측정, 같은 표본에서 결과 일치 확인
+실행: python -m bench.bench_erp_verify [ERP 행수] [legacy 표본 행수]
+"""
+import random
+import sys
+import time
+
+from app.utils import erp_verify
+from app.utils.erp_verify import bucket_compare_rows, compare_buckets
+
+_MODES = ("L3", "L2_LOT", "L2_SPEC", "L1")
+
+
+def _rows(n: int, seed: int):
+    rnd = random.Random(seed)
+    codes = max(1, n // 3)
+    rows = []
+    for i in range(n):
+        code = f"P{i % codes:06d}"
+        kind = i % codes % 4   # 품번마다 관리단위 고정 (LOT+규격 / LOT / 규격 / 없음)
+        rows.append({
+            "item_code": code,
+            "lot": f"L{rnd.randrange(3)}" if kind in (0, 1) else "",
+            "spec": f"S{rnd.randrange(2)}" if kind in (0, 2) else "",
+            "qty": float(rnd.randrange(0, 50)),
+        })
+    return rows
+
+
+def _legacy(erp_rows, wms_rows):
+    maps = {"erp": {k: {} for k in _MODES}, "wms": {k: {} for k in _MODES}}
+    present = {"erp": {}, "wms": {}}
+
+    for side, rows in (("erp", erp_rows), ("wms", wms_rows)):
+        m, p = maps[side], present[side]
+        for r in rows:
+            code, lot, spec, qty = r["item_code"], r["lot"], r["spec"], float(r["qty"])
+            m["L1"][(code,)] = m["L1"].get((code,), 0.0) + qty
+            p.setdefault(code, set()).add("L1")
+            if lot:
+                m["L2_LOT"][(code, lot)] = m["L2_LOT"].get((code, lot), 0.0) + qty
+                p[code].add("L2_LOT")
+            if spec:
+                m["L2_SPEC"][(code, spec)] = m["L2_SPEC"].get((code, spec), 0.0) + qty
+                p[code].add("L2_SPEC")
+            if lot and spec:
+                m["L3"][(code, lot, spec)] = m["L3"].get((code, lot, spec), 0.0) + qty
+                p[code].add("L3")
+
+    out = []
+    for code in sorted(present["erp"].keys() | present["wms"].keys()):
+        e = present["erp"].get(code, set())
+        w = present["wms"].get(code, set())
+        mode = next((k for k in _MODES[:3] if k in e and k in w), "L1")
+        keys = {k for k in maps["erp"][mode] if k[0] == code} | {k for k in maps["wms"][mode] if k[0] == code}
+        for key in sorted(keys):
+            erp_qty = maps["erp"][mode].get(key, 0.0)
+            wms_qty = maps["wms"][mode].get(key, 0.0)
+            out.append((mode, key, round(erp_qty, 3), round(wms_qty, 3)))
+    return out
+
+
+def _bucket(erp_rows, wms_rows):
+    return compare_buckets(bucket_compare_rows(erp_rows), bucket_compare_rows(wms_rows))
+
+
+def _split(mode, key):
+    if mode == "L3":
+        return key[1], key[2]
+    if mode == "L2_LOT":
+        return key[1], ""
+    if mode == "L2_SPEC":
+        return "", key[1]
+    return "", ""
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main(n: int = 100_000, sample: int = 10_000) -> None:
+    erp = _rows(n, seed=1)
+    wms = _rows(n, seed=2)
+
+    sample = min(sample, n)
+    legacy, t_legacy = _timed(_legacy, erp[:sample], wms[:sample])
+    small, t_small = _timed(_bucket, erp[:sample], wms[:sample])
+    got = [
+        (r["mode"], r["item_code"], r["lot"], r["spec"], r["erp_qty"], r["wms_qty"])
+        for r in small["rows"]
+    ]
+    want = [(mode, key[0], *_split(mode, key), e, w) for mode, key, e, w in legacy]
+    assert got == want, "legacy / bucket 결과 불일치"
+
+    result, t_full = _timed(_bucket, erp, wms)
+
+    print(f"erp verify (legacy sample {sample} rows, full {n} rows)")
+    print(f"  legacy  x{sample:<7d}: {t_legacy:8.3f} s")
+    print(f"  bucket  x{sample:<7d}: {t_small:8.3f} s  (x{t_legacy / t_small:.1f})")
+    print(f"  bucket  x{n:<7d}: {t_full:8.3f} s  ({len(result['rows'])} result rows)")
+
+    if erp_verify.np is None:
+        print("  numpy   : 미설치 (건너뜀)")
+        return
+    vec, t_vec = _timed(erp_verify.compare_rows_numpy, erp, wms)
+    assert vec == result, "bucket / numpy 결과 불일치"
+    print(f"  numpy   x{n:<7d}: {t_vec:8.3f} s  (x{t_full / t_vec:.2f} vs bucket)")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
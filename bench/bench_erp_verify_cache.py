@@ -0,0 +1,71 @@
+"""
+ERP 검증 WMS 집계 캐시 벤치마크
+
+- cold : 재고 변경 직후 (inventory 집계 스캔 + WMS 전처리)
+- warm : 재고 변경 없음 (inventory_version 동일 → 캐시 재사용)
+
+실행: python -m bench.bench_erp_verify_cache [재고 행수]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import app.db as db
+
+
+def _stock(n: int):
+    return [
+        {
+            "warehouse": "MAIN",
+            "location": f"R{i % 500:03d}-01",
+            "brand": "BR",
+            "item_code": f"P{i // 3:06d}",
+            "item_name": "품명",
+            "lot": f"L{i % 3}",
+            "spec": "600x600",
+            "qty": 10,
+            "note": "",
+            "created_at": None,
+        }
+        for i in range(n)
+    ]
+
+
+def _erp(n: int):
+    return [{"item_code": f"P{i:06d}", "lot": "", "spec": "", "qty": 30} for i in range(n // 3)]
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main(n: int = 100_000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "bench.db"
+        db.close_thread_db()
+        try:
+            db.init_db()
+            db.bulk_inbound(_stock(n), operator="bench")
+            erp = _erp(n)
+
+            cold, t_cold = _timed(db.get_inventory_compare_rows, erp)
+            warm, t_warm = _timed(db.get_inventory_compare_rows, erp)
+            assert warm == cold, "캐시 결과 불일치"
+
+            db.upsert_inventory("MAIN", "R000-01", "BR", "P000000", "품명", "L0", "600x600", 5, "")
+            after, t_after = _timed(db.get_inventory_compare_rows, erp)
+            assert after != cold, "재고 변경 후 캐시 무효화 안 됨"
+        finally:
+            db.close_thread_db()
+
+    print(f"erp verify x{len(erp)} ERP rows, {n} inventory rows")
+    print(f"  cold          : {t_cold:8.3f} s")
+    print(f"  warm (cached) : {t_warm:8.3f} s  (x{t_cold / t_warm:.2f})")
+    print(f"  after upsert  : {t_after:8.3f} s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
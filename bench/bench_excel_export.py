@@ -0,0 +1,87 @@
+"""
+이력 엑셀 다운로드 메모리 벤치마크 (tracemalloc 최대 사용량)
+
+- legacy    : 전체 rows 리스트 + 일반 Workbook 셀 단위 작성 + bytes 1개
+- streaming : 키셋 페이지 조회 → write_only Workbook → 청크 전달 (iter_xlsx)
+
+실행: python -m bench.bench_excel_export [이력 행 수]
+"""
+import sys
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+from pathlib import Path
+
+from openpyxl import Workbook
+
+import app.db as db
+from app.utils.cursor import HISTORY_CURSOR_KEYS, iter_pages
+from app.utils.excel_export import iter_xlsx
+
+COLUMNS = [
+    ("type", "구분"), ("warehouse", "창고"), ("operator", "작업자"), ("brand", "브랜드"),
+    ("item_code", "품번"), ("item_name", "품명"), ("lot", "LOT"), ("spec", "규격"),
+    ("from_location", "출발로케이션"), ("to_location", "도착로케이션"),
+    ("qty", "수량"), ("note", "비고"), ("created_at", "일시"),
+]
+
+
+def _legacy() -> int:
+    rows = [dict(r) for r in db.query_history(limit=10_000_000)]
+    wb = Workbook()
+    ws = wb.active
+    for c, (_, header) in enumerate(COLUMNS, start=1):
+        ws.cell(row=1, column=c, value=header)
+    for r_idx, r in enumerate(rows, start=2):
+        for c, (key, _) in enumerate(COLUMNS, start=1):
+            ws.cell(row=r_idx, column=c, value=r.get(key, ""))
+    bio = BytesIO()
+    wb.save(bio)
+    return len(bio.getvalue())
+
+
+def _streaming() -> int:
+    rows = iter_pages(
+        lambda after, size: [dict(r) for r in db.query_history(limit=size, after=after)],
+        HISTORY_CURSOR_KEYS,
+    )
+    return sum(len(chunk) for chunk in iter_xlsx(rows, COLUMNS, "이력"))
+
+
+def _measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return size, elapsed, peak / 1024 / 1024
+
+
+def main(n: int = 200_000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "export.db"
+        db.close_thread_db()
+        db.init_db()
+        rows = (
+            (
+                "입고", "MAIN", "bench", "BR", f"P{i:06d}", "품명", "LOT1", "1200x600",
+                "", f"A{i % 50:02d}-01", 1 + i % 9, "비고", None,
+                f"2026-01-{1 + i % 28:02d}T10:{i % 60:02d}:00",
+            )
+            for i in range(n)
+        )
+        with db.db_conn() as conn:
+            conn.executemany(db._HISTORY_INSERT_SQL, rows)
+
+        print(f"history xlsx export ({n:,} rows)")
+        for name, fn in (("legacy", _legacy), ("streaming", _streaming)):
+            size, elapsed, peak = _measure(fn)
+            print(f"  {name:9}: {elapsed:6.1f} s | peak {peak:8.1f} MB | {size / 1024 / 1024:5.1f} MB file")
+
+        db.close_thread_db()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,79 @@
+"""
+엑셀 입고 반영 벤치마크 (컨테이너 하차 20,000행 기준)
+
+- per-row : 행마다 upsert_inventory + add_history (행별 commit)
+- bulk    : bulk_inbound (키별 합산 + executemany, 단일 트랜잭션)
+
+목표: bulk 10,000 rows/sec 이상
+
+실행: python -m bench.bench_excel_inbound [행수]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import app.db as db
+
+
+def _rows(n: int):
+    return [
+        {
+            "warehouse": "MAIN",
+            "location": f"R{i % 200:03d}-01",
+            "brand": "BR",
+            "item_code": f"P{i % 3000:05d}",
+            "item_name": "품명",
+            "lot": f"L{i % 7}",
+            "spec": "600x600",
+            "qty": 1.5,
+            "note": "",
+            "created_at": None,
+        }
+        for i in range(n)
+    ]
+
+
+def _per_row(rows) -> None:
+    for r in rows:
+        db.upsert_inventory(
+            r["warehouse"], r["location"], r["brand"], r["item_code"],
+            r["item_name"], r["lot"], r["spec"], r["qty"], r["note"],
+        )
+        db.add_history(
+            "입고", r["warehouse"], "bench", r["brand"], r["item_code"],
+            r["item_name"], r["lot"], r["spec"], "", r["location"], r["qty"],
+            r["note"], batch_id="bench",
+        )
+
+
+def _bulk(rows) -> None:
+    db.bulk_inbound(rows, operator="bench", batch_id="bench")
+
+
+def _run(path: Path, fn, rows) -> float:
+    db.DB_PATH = path
+    db.close_thread_db()
+    try:
+        db.init_db()
+        start = time.perf_counter()
+        fn(rows)
+        return len(rows) / (time.perf_counter() - start)
+    finally:
+        db.close_thread_db()
+
+
+def main(n: int = 20000) -> None:
+    rows = _rows(n)
+    with tempfile.TemporaryDirectory() as tmp:
+        per_row = _run(Path(tmp) / "per_row.db", _per_row, rows)
+        bulk = _run(Path(tmp) / "bulk.db", _bulk, rows)
+
+    print(f"excel inbound x{n} rows")
+    print(f"  per-row commit : {per_row:10.1f} rows/sec")
+    print(f"  bulk_inbound   : {bulk:10.1f} rows/sec  (target >= 10000)")
+    print(f"  speedup: x{bulk / per_row:.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
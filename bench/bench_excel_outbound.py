@@ -0,0 +1,93 @@
+"""
+엑셀 출고 반영 벤치마크
+
+- per-row : 행마다 query_inventory(LIKE) → upsert_inventory / add_history (기존 방식)
+- bulk    : bulk_outbound (후보 재고 1회 조회 + 메모리 할당, 단일 트랜잭션)
+
+실행: python -m bench.bench_excel_outbound [출고 행수]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import app.db as db
+
+_CODES = 3000
+
+
+def _stock():
+    return [
+        {
+            "warehouse": "MAIN",
+            "location": f"R{i % 200:03d}-01",
+            "brand": "BR",
+            "item_code": f"P{i % _CODES:05d}",
+            "item_name": "품명",
+            "lot": f"L{i % 7}",
+            "spec": "600x600",
+            "qty": 50,
+            "note": "",
+            "created_at": None,
+        }
+        for i in range(_CODES * 5)
+    ]
+
+
+def _rows(n: int):
+    return [
+        {"rownum": i + 2, "item_code": f"P{i % _CODES:05d}", "qty": 3, "note": ""}
+        for i in range(n)
+    ]
+
+
+def _per_row(rows) -> None:
+    for r in rows:
+        remain = r["qty"]
+        for inv in db.query_inventory(item_code=r["item_code"]):
+            if remain <= 0:
+                break
+            take = min(float(inv["qty"]), remain)
+            db.upsert_inventory(
+                inv["warehouse"], inv["location"], inv["brand"], inv["item_code"],
+                inv["item_name"], inv["lot"], inv["spec"], -take, r["note"],
+            )
+            db.add_history(
+                "출고", inv["warehouse"], "bench", inv["brand"], inv["item_code"],
+                inv["item_name"], inv["lot"], inv["spec"], inv["location"], "",
+                take, r["note"], batch_id="bench",
+            )
+            remain -= take
+
+
+def _bulk(rows) -> None:
+    db.bulk_outbound(rows, operator="bench", batch_id="bench")
+
+
+def _run(path: Path, fn, rows) -> float:
+    db.DB_PATH = path
+    db.close_thread_db()
+    try:
+        db.init_db()
+        db.bulk_inbound(_stock(), operator="bench")
+        start = time.perf_counter()
+        fn(rows)
+        return len(rows) / (time.perf_counter() - start)
+    finally:
+        db.close_thread_db()
+
+
+def main(n: int = 5000) -> None:
+    rows = _rows(n)
+    with tempfile.TemporaryDirectory() as tmp:
+        per_row = _run(Path(tmp) / "per_row.db", _per_row, rows)
+        bulk = _run(Path(tmp) / "bulk.db", _bulk, rows)
+
+    print(f"excel outbound x{n} rows")
+    print(f"  per-row        : {per_row:10.1f} rows/sec")
+    print(f"  bulk_outbound  : {bulk:10.1f} rows/sec")
+    print(f"  speedup: x{bulk / per_row:.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,96 @@
+"""
+기준일 재고 벤치마크 + 결과 일치 검증
+
+- replay   : 전체 이력 재생 (_inventory_as_of_replay)
+- snapshot : 마감 스냅샷 + 이후 변동분 (query_inventory_as_of)
+
+1) days 일치 이력 생성 → 여러 기준일에서 두 결과 완전 일치 확인
+2) 스냅샷 생성 후 과거 일자 이력 추가(소급) → 무효화/재생성 후 다시 일치 확인
+3) 최근 기준일 반복 조회 시간 비교
+
+실행: python -m bench.bench_inventory_as_of [일수] [일당 이력 수]
+"""
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import app.db as db
+
+TYPES = ("입고", "입고", "출고", "이동", "롤백")
+
+
+def _history_rows(days: int, per_day: int, rnd: random.Random):
+    start = date.today() - timedelta(days=days)
+    for d in range(days + 1):
+        day = (start + timedelta(days=d)).isoformat()
+        for i in range(per_day):
+            t = rnd.choice(TYPES)
+            loc_a = f"A{rnd.randrange(10):02d}"
+            loc_b = f"B{rnd.randrange(10):02d}"
+            yield (
+                t, "W0", "bench", "BR0",
+                f"P{rnd.randrange(100):04d}", "품명", f"L{rnd.randrange(2)}", "S",
+                "" if t == "입고" else loc_a, loc_b if t != "출고" else "",
+                round(rnd.uniform(0.1, 20), 3), "", None,
+                f"{day}T{i % 24:02d}:{i % 60:02d}:00",
+            )
+
+
+def _check(dates) -> None:
+    with db.db_conn() as conn:
+        cur = conn.cursor()
+        for d in dates:
+            expected = db._inventory_as_of_replay(cur, d)
+            actual = db.query_inventory_as_of(as_of_date=d)
+            assert actual == expected, f"mismatch at {d}"
+
+
+def _time(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1000
+
+
+def main(days: int = 365, per_day: int = 500) -> None:
+    rnd = random.Random(7)
+    today = date.today()
+    dates = [(today - timedelta(days=k)).isoformat() for k in (days + 5, days // 2, 30, 7, 1, 0, -3)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "as_of.db"
+        db.close_thread_db()
+        db.init_db()
+        with db.db_conn() as conn:
+            conn.executemany(db._HISTORY_INSERT_SQL, _history_rows(days, per_day, rnd))
+
+        _check(dates)
+
+        # 소급 이력 → 이후 스냅샷 무효화
+        back = (today - timedelta(days=days // 2 + 3)).isoformat()
+        db.add_history(
+            "입고", "W0", "bench", "BR0", "P0001", "품명", "L0", "S",
+            "", "A00", 123.456, created_at=db.datetime.fromisoformat(f"{back}T10:00:00"),
+        )
+        _check(dates)
+        print(f"parity OK ({len(dates)} dates, incl. backdated insert)")
+
+        as_of = (today - timedelta(days=1)).isoformat()
+        with db.db_conn() as conn:
+            cur = conn.cursor()
+            replay = _time(lambda: db._inventory_as_of_replay(cur, as_of), 5)
+        snap = _time(lambda: db.query_inventory_as_of(as_of_date=as_of), 5)
+        db.close_thread_db()
+
+    print(f"inventory as-of ({days} days x {per_day} history rows)")
+    print(f"  replay   : {replay:9.1f} ms/query")
+    print(f"  snapshot : {snap:9.1f} ms/query")
+    print(f"  speedup: x{replay / snap:.1f}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,62 @@
+"""
+재고 통합 검색 벤치마크 (LIKE '%x%' 전체 스캔 vs FTS5 trigram)
+
+- like : 키 컬럼 전체 LIKE (FTS 미사용 시 경로)
+- fts  : query_inventory_smart (inventory_fts MATCH + bm25)
+
+실행: python -m bench.bench_inventory_search [재고 행 수]
+"""
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import app.db as db
+
+QUERIES = ("P012345", "A17-03", "LOT0042", "1200x", "P01 A05")
+
+
+def _rows(n: int):
+    now = datetime.now().isoformat(timespec="seconds")
+    for i in range(n):
+        yield (
+            "MAIN", f"A{i % 40:02d}-{i % 7:02d}-{i % 5:02d}", f"BR{i % 12}",
+            f"P{i:06d}", f"품명{i % 900}", f"LOT{i % 5000:04d}", f"{1200 + i % 30}x600",
+            1 + i % 9, "", now,
+        )
+
+
+def _time(fn, n: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1000
+
+
+def main(n: int = 500_000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "search.db"
+        db.close_thread_db()
+        db.init_db()
+        with db.db_conn() as conn:
+            conn.executemany("""
+                INSERT INTO inventory
+                (warehouse, location, brand, item_code, item_name, lot, spec, qty, note, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, _rows(n))
+
+        print(f"inventory search ({n:,} rows, limit 1000)")
+        for q in QUERIES:
+            fts = _time(lambda: db.query_inventory_smart(q=q, limit=1000))
+            db._schema_cols["inventory_fts"] = frozenset()  # LIKE 경로 강제
+            like = _time(lambda: db.query_inventory_smart(q=q, limit=1000))
+            db._schema_cols.clear()
+            hits = len(db.query_inventory_smart(q=q, limit=1000))
+            print(f"  {q!r:12} like {like:8.1f} ms | fts {fts:7.1f} ms | hits {hits}")
+
+        db.close_thread_db()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
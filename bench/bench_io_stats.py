@@ -0,0 +1,83 @@
+"""
+입·출고 통계 벤치마크 (history 원본 스캔 vs history_daily_rollup)
+
+- raw    : 기존 방식 (DATE()/strftime() 조건으로 history 전체 스캔)
+- rollup : query_io_group_stats / query_outbound_monthly_and_brand
+
+실행: python -m bench.bench_io_stats [일수] [일당 이력 수]
+"""
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+import app.db as db
+from bench.bench_inventory_as_of import _history_rows
+
+RAW_GROUP_SQL = """
+    SELECT
+        h.brand, h.item_code, h.item_name, h.spec,
+        SUM(CASE WHEN h.type IN ('IN','INBOUND','입고') THEN h.qty ELSE 0 END) AS in_qty,
+        SUM(CASE WHEN h.type IN ('OUT','OUTBOUND','출고','CS_OUT') THEN h.qty ELSE 0 END) AS out_qty
+    FROM history h
+    WHERE DATE(h.created_at) BETWEEN DATE(?) AND DATE(?)
+      AND h.type IN ('IN','INBOUND','입고','OUT','OUTBOUND','출고','CS_OUT')
+    GROUP BY h.brand, h.item_code, h.item_name, h.spec
+    ORDER BY out_qty DESC, in_qty DESC
+"""
+
+RAW_BRAND_SQL = """
+    SELECT brand, SUM(qty) AS total_qty
+    FROM history
+    WHERE type IN ('OUT', 'OUTBOUND', '출고', 'CS_OUT')
+      AND strftime('%Y', created_at) = ?
+      AND strftime('%m', created_at) = ?
+    GROUP BY brand
+    ORDER BY total_qty DESC
+"""
+
+
+def _time(fn, n: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1000
+
+
+def main(days: int = 365, per_day: int = 500) -> None:
+    today = date.today()
+    start = date(today.year, today.month, 1).isoformat()
+    end = today.isoformat()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "io_stats.db"
+        db.close_thread_db()
+        db.init_db()
+        with db.db_conn() as conn:
+            conn.executemany(
+                db._HISTORY_INSERT_SQL, _history_rows(days, per_day, random.Random(7))
+            )
+
+        with db.db_conn() as conn:
+            cur = conn.cursor()
+            raw_group = _time(lambda: cur.execute(RAW_GROUP_SQL, (start, end)).fetchall())
+            raw_brand = _time(lambda: cur.execute(
+                RAW_BRAND_SQL, (str(today.year), f"{today.month:02d}")
+            ).fetchall())
+
+        roll_group = _time(lambda: db.query_io_group_stats(start, end, group="item"))
+        roll_brand = _time(lambda: db.query_outbound_monthly_and_brand(
+            year=today.year, month=today.month
+        ))
+        db.close_thread_db()
+
+    print(f"io stats (this month, {days} days x {per_day} history rows)")
+    print(f"  group stats : raw {raw_group:8.1f} ms | rollup {roll_group:8.1f} ms")
+    print(f"  brand stats : raw {raw_brand:8.1f} ms | rollup {roll_brand:8.1f} ms")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
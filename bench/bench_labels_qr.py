@@ -0,0 +1,59 @@
+"""
+라벨 QR 대량 생성 벤치마크 (캐시 미적중 기준)
+
+- serial   : render_qr_png 순차 생성 (기존 방식)
+- parallel : render_qr_pngs 프로세스 풀 (워커 수 2 / 4 / ... / QR_WORKERS)
+
+실행: python -m bench.bench_labels_qr [라벨 수]
+"""
+import os
+import sys
+import time
+
+from app.utils import qr_image
+
+
+def _payloads(n: int):
+    return [f"PRODUCT:P{i:06d}|LOT:L{i % 97:02d}" for i in range(n)]
+
+
+def _serial(payloads) -> None:
+    for p in payloads:
+        qr_image.render_qr_png(p)
+
+
+def _rate(fn, payloads) -> float:
+    start = time.perf_counter()
+    fn(payloads)
+    return len(payloads) / (time.perf_counter() - start)
+
+
+def _pooled(workers: int, payloads) -> float:
+    pool = qr_image._get_pool(workers)
+    list(pool.map(int, range(workers * 4)))   # 워커 기동 비용 제외
+    try:
+        return _rate(lambda ps: qr_image.render_qr_pngs(ps, workers=workers), payloads)
+    finally:
+        qr_image._reset_pool(workers)
+
+
+def main(n: int = 2000) -> None:
+    payloads = _payloads(n)
+    qr_image.QR_PARALLEL_MIN = 0
+
+    serial = _rate(_serial, payloads)
+    print(f"label QR x{n} (cpu {os.cpu_count()})")
+    print(f"  serial          : {serial:10.1f} labels/sec")
+
+    workers = 2
+    while True:
+        workers = min(workers, qr_image.QR_WORKERS)
+        rate = _pooled(workers, payloads)
+        print(f"  pool x{workers:<2d}        : {rate:10.1f} labels/sec  (x{rate / serial:.2f})")
+        if workers >= qr_image.QR_WORKERS:
+            break
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,13 @@
+import pytest
+
+import app.db as db
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """테스트별 임시 SQLite DB (스키마 생성 후 반환, 종료 시 커넥션 정리)"""
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.db")
+    db.close_thread_db()
+    db.init_db()
+    yield db
+    db.close_thread_db()
@@ -0,0 +1,36 @@
+import pytest
+
+from app.utils.cursor import decode_cursor, encode_cursor
+
+
+def test_round_trip():
+    values = ["2026-01-01 00:00:00", 42, 1.5, None]
+    assert decode_cursor(encode_cursor(values), len(values)) == values
+
+
+def test_empty_token_is_first_page():
+    assert decode_cursor("", 2) is None
+    assert decode_cursor(None, 2) is None
+
+
+@pytest.mark.parametrize("token", [
+    "not-base64!!",
+    encode_cursor([1]),                 # 개수 불일치
+    encode_cursor([{"a": 1}, 1]),       # dict
+    encode_cursor([[1, 2], 1]),         # list
+])
+def test_malformed_cursor_raises_value_error(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token, 2)
+
+
+def test_api_returns_400_for_wrong_element_types(temp_db):
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    client = TestClient(app)
+    for url, size in [("/api/history", 2), ("/api/inventory", 6)]:
+        token = encode_cursor([{"a": 1}] + [1] * (size - 1))
+        assert client.get(url, params={"cursor": token}).status_code == 400
@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+from app.utils import erp_verify
+from app.utils.erp_verify import bucket_compare_rows, compare_buckets
+
+np = pytest.importorskip("numpy")
+
+
+def _python(erp, wms):
+    return compare_buckets(bucket_compare_rows(erp), bucket_compare_rows(wms))
+
+
+def _row(item_code, lot="", spec="", qty=1):
+    return {"item_code": item_code, "lot": lot, "spec": spec, "qty": qty}
+
+
+def _both(erp, wms):
+    expected = _python(erp, wms)
+    assert erp_verify.compare_rows_numpy(erp, wms) == expected
+    return expected
+
+
+def test_empty_lot_and_spec():
+    result = _both(
+        [_row("A", qty=3), _row("A", lot=" ", spec=None, qty=2), _row("B", lot="L1", qty=1)],
+        [_row("A", qty=5), _row("B", lot="L1", qty=1)],
+    )
+    by_code = {r["item_code"]: r for r in result["rows"]}
+    assert by_code["A"]["mode"] == "L1" and by_code["A"]["erp_qty"] == 5
+    assert by_code["B"]["mode"] == "L2_LOT" and by_code["B"]["lot"] == "L1"
+
+
+def test_rollup_on_and_off():
+    result = _both(
+        # A: ERP 는 LOT+규격, WMS 는 품번만 → 품번 합산 (롤업)
+        # B: 양쪽 모두 LOT+규격 → 롤업 아님
+        [_row("A", "L1", "S1", 4), _row("A", "L2", "S1", 6), _row("B", "L1", "S1", 2)],
+        [_row("A", qty=10), _row("B", "L1", "S1", 2)],
+    )
+    by_code = {r["item_code"]: r for r in result["rows"]}
+    assert by_code["A"]["note"] == erp_verify.ROLLUP_NOTE and by_code["A"]["mode"] == "L1"
+    assert by_code["B"]["note"] == "" and by_code["B"]["mode"] == "L3"
+    assert result["summary"]["rollup"] == 1
+
+
+def test_item_codes_on_one_side_only():
+    result = _both(
+        [_row("ERP_ONLY", "L1", "S1", 3), _row("BOTH", qty=1)],
+        [_row("WMS_ONLY", spec="S9", qty=7), _row("BOTH", qty=1)],
+    )
+    statuses = {r["item_code"]: r["status"] for r in result["rows"]}
+    assert statuses == {"BOTH": "✅ 일치", "ERP_ONLY": "❌ WMS 없음", "WMS_ONLY": "❌ ERP 없음"}
+
+
+def test_float_quantities_within_tolerance():
+    result = _both(
+        [_row("A", "L1", "S1", 0.1), _row("A", "L1", "S1", 0.2), _row("B", qty=1.0)],
+        [_row("A", "L1", "S1", 0.3), _row("B", qty=1.0005)],
+    )
+    by_code = {r["item_code"]: r for r in result["rows"]}
+    assert by_code["A"]["status"] == "✅ 일치"     # 0.1 + 0.2 ≠ 0.3 (오차 < 1e-9)
+    assert by_code["B"]["status"] == "⚠️ 차이"
+
+
+def test_empty_inputs():
+    assert _both([], []) == {"summary": erp_verify._new_summary(), "rows": []}
+    _both([_row("A", qty=1)], [])
+
+
+def test_random_parity():
+    rnd = random.Random(0)
+
+    def rows(n):
+        return [
+            _row(
+                rnd.choice(["A", "B", " C", "D", ""]),
+                rnd.choice(["", "L1", "L2", " ", None]),
+                rnd.choice(["", "S1", "S2"]),
+                rnd.choice([0, 1, 2.5, 0.1, 0.2, -1, None, 3]),
+            )
+            for _ in range(n)
+        ]
+
+    for _ in range(200):
+        _both(rows(rnd.randrange(30)), rows(rnd.randrange(30)))
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+
+def _add(db, **kw):
+    args = dict(
+        type="입고", warehouse="W", operator="tester", brand="BR",
+        item_code="P001", item_name="품명", lot="L1", spec="S1",
+        from_location="", to_location="R01", qty=5,
+    )
+    args.update(kw)
+    db.add_history(**args)
+
+
+def _count(db) -> int:
+    with db.db_conn() as conn:
+        return conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+
+def test_dedup_disabled_inserts_every_call(temp_db):
+    base = datetime(2026, 1, 1, 9, 0, 0)
+    _add(temp_db, dedup_seconds=0, created_at=base)
+    assert _count(temp_db) == 1
+    _add(temp_db, dedup_seconds=0, created_at=base)
+    assert _count(temp_db) == 2
+
+
+def test_negative_dedup_inserts_exactly_once_per_call(temp_db):
+    base = datetime(2026, 1, 1, 9, 0, 0)
+    _add(temp_db, dedup_seconds=-1, created_at=base)
+    assert _count(temp_db) == 1
+    _add(temp_db, dedup_seconds=-1, created_at=base)
+    assert _count(temp_db) == 2
+
+
+def test_duplicate_inside_window_is_suppressed(temp_db):
+    base = datetime(2026, 1, 1, 9, 0, 0)
+    _add(temp_db, dedup_seconds=5, created_at=base)
+    assert _count(temp_db) == 1
+
+    # 창 안의 같은 이력 → 무시
+    _add(temp_db, dedup_seconds=5, created_at=base + timedelta(seconds=3))
+    assert _count(temp_db) == 1
+
+    # 다른 수량 / 창 밖 → 기록
+    _add(temp_db, dedup_seconds=5, created_at=base + timedelta(seconds=3), qty=6)
+    assert _count(temp_db) == 2
+    _add(temp_db, dedup_seconds=5, created_at=base + timedelta(seconds=10))
+    assert _count(temp_db) == 3
+
+
+def test_dedup_check_uses_index(temp_db):
+    params = ("P001", "입고", "W", "L1", "S1", "", "R01", 5.0, "2026-01-01T09:00:00")
+    with temp_db.db_conn() as conn:
+        plan = " ".join(
+            r["detail"] for r in conn.execute("EXPLAIN QUERY PLAN " + temp_db._HISTORY_DEDUP_SQL, params)
+        )
+    assert "idx_history_dedup" in plan
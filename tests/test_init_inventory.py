@@ -0,0 +1,72 @@
+from openpyxl import Workbook
+import pytest
+
+from app.core.jobs import JobContext
+from app.routers.api_init_inventory import _commit_rows
+
+
+def _xlsx(tmp_path, rows):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["창고", "로케이션", "브랜드", "품번", "품명", "LOT", "규격", "수량", "비고"])
+    for r in rows:
+        ws.append(r)
+    path = tmp_path / "init.xlsx"
+    wb.save(path)
+    return str(path)
+
+
+def _ctx(db):
+    db.create_job("job-1", "init_commit")
+    return JobContext("job-1")
+
+
+def test_commit_rows_applies_in_one_batch(temp_db, tmp_path):
+    path = _xlsx(tmp_path, [
+        ["W", "R01", "BR", "P001", "품명", "L1", "S1", 3, ""],
+        ["W", "R01", "BR", "P001", "품명", "L1", "S1", 2, ""],   # 같은 키 → 합산
+        ["W", "R02", "BR", "P002", "품명", "", "", 4, "메모"],
+        ["W", "R03", "BR", "P003", "품명", "", "", 0, ""],       # 수량 오류
+    ])
+
+    result = _commit_rows(_ctx(temp_db), path, "tester", "INIT-TEST")
+
+    assert result["summary"] == {"total_rows": 2, "applied": 2, "failed": 0, "excel_errors": 1}
+    with temp_db.db_conn() as conn:
+        inv = {r["item_code"]: (r["qty"], r["note"]) for r in conn.execute("SELECT * FROM inventory")}
+        hist = [dict(r) for r in conn.execute("SELECT type, from_location, to_location, qty, note, batch_id FROM history ORDER BY id")]
+    assert inv == {"P001": (5.0, "초기재고"), "P002": (4.0, "메모")}
+    assert hist == [
+        {"type": "초기재고", "from_location": "INIT", "to_location": "R01", "qty": 5.0,
+         "note": "초기재고(엑셀 합산)", "batch_id": "INIT-TEST"},
+        {"type": "초기재고", "from_location": "INIT", "to_location": "R02", "qty": 4.0,
+         "note": "초기재고(엑셀 합산)", "batch_id": "INIT-TEST"},
+    ]
+
+
+def test_commit_rows_without_valid_rows_raises_plain_error(temp_db, tmp_path):
+    path = _xlsx(tmp_path, [["W", "R01", "BR", "P001", "품명", "", "", 0, ""]])
+
+    with pytest.raises(ValueError, match="반영할 정상 데이터가 없습니다"):
+        _commit_rows(_ctx(temp_db), path, "tester", "INIT-TEST")
+
+
+def test_preview_missing_qty_column_is_400(temp_db):
+    pytest.importorskip("httpx")
+    import io
+
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    wb = Workbook()
+    wb.active.append(["품번", "로케이션"])
+    buf = io.BytesIO()
+    wb.save(buf)
+
+    r = TestClient(app).post(
+        "/api/init/preview",
+        files={"file": ("init.xlsx", buf.getvalue())},
+    )
+    assert r.status_code == 400
+    assert "필수 컬럼 누락" in r.json()["detail"]
@@ -0,0 +1,35 @@
+import re
+
+import pytest
+
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+def _seed(db, n):
+    rows = [
+        {"warehouse": "W", "location": f"L{i:03d}", "brand": "B", "item_code": "IC1",
+         "item_name": "n", "lot": "", "spec": "", "qty": 1}
+        for i in range(n)
+    ]
+    db.bulk_inbound(rows, operator="t", batch_id="seed")
+
+
+def _walk(client, params):
+    seen, cursor = [], ""
+    while True:
+        r = client.get("/page/inventory", params={**params, "cursor": cursor})
+        assert r.status_code == 200
+        seen += re.findall(r"<td>(L\d+)</td>", r.text)
+        m = re.search(r'cursor=([A-Za-z0-9_\-]+)"', r.text)
+        if not m:
+            return seen
+        cursor = m.group(1)
+
+
+@pytest.mark.parametrize("params", [{"limit": 3}, {"q": "IC1", "limit": 3}])
+def test_inventory_page_follows_next_link_without_truncation(temp_db, params):
+    _seed(temp_db, 7)
+    assert _walk(TestClient(app), params) == [f"L{i:03d}" for i in range(7)]
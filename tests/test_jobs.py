@@ -0,0 +1,52 @@
+import io
+import os
+import sqlite3
+
+import pytest
+from fastapi import UploadFile
+
+import app.core.jobs as jobs
+
+
+def test_submit_upload_job_removes_spooled_file_when_claim_fails(temp_db, monkeypatch):
+    spooled = []
+    real_spool = jobs._spool_upload
+
+    def spool(file):
+        result = real_spool(file)
+        spooled.append(result[0])
+        return result
+
+    def locked(**kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(jobs, "_spool_upload", spool)
+    monkeypatch.setattr(jobs, "claim_upload", locked)
+
+    upload = UploadFile(io.BytesIO(b"xlsx-bytes"), filename="a.xlsx")
+    with pytest.raises(sqlite3.OperationalError):
+        jobs.submit_upload_job("excel_inbound", upload, lambda ctx, *a: {}, batch_prefix="t")
+
+    assert spooled and not os.path.exists(spooled[0])
+
+
+@pytest.mark.parametrize("module", ["excel_inbound", "excel_outbound"])
+def test_missing_qty_column_fails_job_with_plain_error(temp_db, tmp_path, module):
+    from importlib import import_module
+
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    wb.active.append(["품번", "로케이션"])
+    wb.active.append(["P001", "R01"])
+    path = str(tmp_path / "no_qty.xlsx")
+    wb.save(path)
+
+    process = import_module(f"app.routers.{module}")._process
+    args = ("tester", "location") if module == "excel_outbound" else ("tester",)
+
+    temp_db.create_job("job-1", module)
+    jobs._run("job-1", process, (path, *args, "BATCH"), {}, None)
+
+    job = temp_db.get_job("job-1")
+    assert (job["status"], job["error"]) == ("failed", "필수 컬럼 누락: 수량")
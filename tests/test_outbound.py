@@ -0,0 +1,73 @@
+def _seed(db):
+    rows = [
+        {"warehouse": "W", "location": loc, "brand": brand, "item_code": code,
+         "item_name": "n", "lot": lot, "spec": "S", "qty": 1}
+        for brand, code, loc, lot in [
+            ("B2", "IC1", "A-01", "L1"),
+            ("B1", "IC1", "Z-01", "L1"),
+            ("B1", "IC1", "A-01", "L2"),
+            ("B1", "IC2", "A-02", "L1"),
+        ]
+    ]
+    db.bulk_inbound(rows, operator="t", batch_id="seed")
+
+
+def _taken(db, batch_id):
+    with db.db_conn() as conn:
+        return [
+            (r["brand"], r["item_code"], r["from_location"], r["lot"])
+            for r in conn.execute(
+                "SELECT * FROM history WHERE batch_id = ? ORDER BY id", (batch_id,)
+            )
+        ]
+
+
+def test_default_policy_keeps_query_inventory_order(temp_db):
+    _seed(temp_db)
+    expected = [
+        (r["brand"], r["item_code"], r["location"], r["lot"])
+        for r in temp_db.query_inventory(item_code="IC1", match="exact", limit=10)
+    ]
+    ok, errors = temp_db.bulk_outbound(
+        [{"rownum": 2, "item_code": "IC1", "qty": 3}], operator="t", batch_id="out",
+    )
+    assert (ok, errors) == (1, [])
+    assert _taken(temp_db, "out") == expected == [
+        ("B1", "IC1", "A-01", "L2"),
+        ("B1", "IC1", "Z-01", "L1"),
+        ("B2", "IC1", "A-01", "L1"),
+    ]
+
+
+def test_lot_only_row_is_allocated(temp_db):
+    _seed(temp_db)
+    ok, errors = temp_db.bulk_outbound(
+        [{"rownum": 2, "lot": "L1", "qty": 2}], operator="t", batch_id="out",
+    )
+    assert (ok, errors) == (1, [])
+    assert _taken(temp_db, "out") == [
+        ("B1", "IC1", "Z-01", "L1"),
+        ("B1", "IC2", "A-02", "L1"),
+    ]
+
+
+def test_spec_only_row_shares_stock_with_item_code_rows(temp_db):
+    _seed(temp_db)
+    ok, errors = temp_db.bulk_outbound(
+        [
+            {"rownum": 2, "item_code": "IC1", "qty": 3},
+            {"rownum": 3, "spec": "S", "qty": 2},
+        ],
+        operator="t", batch_id="out",
+    )
+    assert ok == 1
+    assert errors == [(3, "출고 수량(2.0)이 재고(1.0)보다 많습니다.")]
+
+
+def test_row_without_any_key_is_rejected(temp_db):
+    _seed(temp_db)
+    ok, errors = temp_db.bulk_outbound(
+        [{"rownum": 2, "brand": "B1", "qty": 1}], operator="t", batch_id="out",
+    )
+    assert ok == 0
+    assert errors == [(2, "품번 / 로케이션 / LOT / 규격 중 하나가 필요합니다.")]